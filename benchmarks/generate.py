@@ -0,0 +1,162 @@
+"""
+Generate synthetic YAML configurations and matching schemas for
+benchmarking yamldoc.
+
+Usage:
+    python benchmarks/generate.py --width 20 --depth 3 -o config.yaml -s config.schema
+"""
+import argparse
+import random
+
+
+class Generator:
+    """
+    Builds a random but reproducible configuration and the schema that
+    describes it.
+    """
+
+    TYPES = ["string", "integer", "boolean", "number"]
+
+    def __init__(self, width=10, depth=2, comment_density=0.5, list_length=3, block_scalars=0.05,
+                 collections=0.05, seed=0):
+        """
+        Initialize the object.
+
+        Arguments:
+            width: Number of keys in every mapping.
+            depth: Number of levels of nested mappings below the top level.
+            comment_density: Fraction of keys preceded by #' comments.
+            list_length: Number of items in list values.
+            block_scalars: Fraction of values written as ">-" block scalars.
+            collections: Fraction of values written as "- {" collections of objects.
+            seed: Seed of the random number generator.
+        """
+        self.width = width
+        self.depth = depth
+        self.comment_density = comment_density
+        self.list_length = list_length
+        self.block_scalars = block_scalars
+        self.collections = collections
+        self.seed = seed
+
+    def params(self):
+        """
+        The parameters of the generator, for recording with results.
+        """
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "comment_density": self.comment_density,
+            "list_length": self.list_length,
+            "block_scalars": self.block_scalars,
+            "collections": self.collections,
+            "seed": self.seed,
+        }
+
+    def generate(self):
+        """
+        Returns:
+            Tuple of (yaml, schema) text.
+        """
+        self.random = random.Random(self.seed)
+        yaml = []
+        schema = [
+            '$schema: "http://json-schema.org/draft-04/schema#"',
+            "",
+            "_yamldoc_title: Synthetic configuration",
+            "",
+            "type: object",
+            "",
+            "properties:",
+        ]
+        self._mapping(yaml, schema, 0, 2, self.depth)
+        return "\n".join(yaml) + "\n", "\n".join(schema) + "\n"
+
+    def _comment(self, yaml, pad):
+        if self.random.random() < self.comment_density:
+            words = " ".join(self.random.choice(WORDS) for _ in range(self.random.randint(3, 12)))
+            yaml.append(f"{pad}#' {words.capitalize()}.")
+            if self.random.random() < 0.3:
+                yaml.append(f"{pad}#' ${self.random.choice(['string', 'integer', 'boolean'])} %{self.random.choice(['yes', 'no'])}")
+
+    def _mapping(self, yaml, schema, indent, schema_indent, depth):
+        pad = " " * indent
+        spad = " " * schema_indent
+        for i in range(self.width):
+            key = f"{self.random.choice(WORDS)}_{i}"
+            self._comment(yaml, pad)
+            schema.append(f"{spad}{key}:")
+            roll = self.random.random()
+
+            if depth > 0 and roll < 0.3:
+                yaml.append(f"{pad}{key}:")
+                schema.append(f"{spad}    type: object")
+                schema.append(f"{spad}    properties:")
+                self._mapping(yaml, schema, indent + 4, schema_indent + 8, depth - 1)
+            elif roll < 0.3 + self.block_scalars:
+                yaml.append(f"{pad}{key}: >-")
+                for _ in range(self.random.randint(1, 4)):
+                    yaml.append(f"{pad}    " + " ".join(self.random.choice(WORDS) for _ in range(8)))
+                schema.append(f"{spad}    type: string")
+            elif roll < 0.3 + self.block_scalars + self.collections:
+                yaml.append(f"{pad}{key}:")
+                for _ in range(max(1, self.list_length // 2)):
+                    yaml.append(f"{pad}  - {{")
+                    for j in range(3):
+                        yaml.append(f"{pad}    field_{j}: {self.random.randint(0, 100)},")
+                    yaml.append(f"{pad}  }}")
+                schema.append(f"{spad}    type: array")
+            elif roll < 0.45:
+                yaml.append(f"{pad}{key}:")
+                for _ in range(self.list_length):
+                    yaml.append(f"{pad}  - {self.random.choice(WORDS)}")
+                schema.append(f"{spad}    type: array")
+            else:
+                var_type = self.random.choice(self.TYPES)
+                yaml.append(f"{pad}{key}: {self._value(var_type)}")
+                schema.append(f"{spad}    type: {var_type}")
+                if var_type == "string" and self.random.random() < 0.1:
+                    schema.append(f"{spad}    enum: [{', '.join(self.random.sample(WORDS, 3))}]")
+
+    def _value(self, var_type):
+        if var_type == "integer":
+            return str(self.random.randint(0, 10000))
+        if var_type == "number":
+            return f"{self.random.random() * 100:.3f}"
+        if var_type == "boolean":
+            return self.random.choice(["true", "false"])
+        return '"' + self.random.choice(WORDS) + "/" + self.random.choice(WORDS) + '"'
+
+
+WORDS = """
+align sort index reads genome reference sample threads memory output input
+path prefix suffix quality filter trim adapter barcode lane run batch cluster
+queue partition account conda env image container script params extra log
+report summary metrics coverage depth variant caller model seed chunk size
+""".split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic YAML configuration and schema.')
+    parser.add_argument('-o', '--output', required=True, help='YAML file to write.')
+    parser.add_argument('-s', '--schema', default=None, help='Schema file to write.')
+    parser.add_argument('--width', type=int, default=10)
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--comment-density', type=float, default=0.5)
+    parser.add_argument('--list-length', type=int, default=3)
+    parser.add_argument('--block-scalars', type=float, default=0.05)
+    parser.add_argument('--collections', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    yaml, schema = Generator(args.width, args.depth, args.comment_density, args.list_length,
+                             args.block_scalars, args.collections, args.seed).generate()
+    with open(args.output, "w") as f:
+        f.write(yaml)
+    if args.schema is not None:
+        with open(args.schema, "w") as f:
+            f.write(schema)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Benchmark the phases of yamldoc on synthetic configurations.
+
+Each case is generated with benchmarks/generate.py, then parse_yaml,
+compile_schema, CompiledSchema.apply and rendering are timed separately
+and their peak memory is recorded with tracemalloc. Results are written
+as JSON so that runs from different commits can be compared.
+
+Usage:
+    python benchmarks/run.py -o results.json
+    python benchmarks/run.py --compare before.json after.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import yamldoc
+import yamldoc.entries
+import yamldoc.render
+import yamldoc.schema
+from generate import Generator
+
+# Named cases, from a small flat file to a wide and deep one.
+CASES = {
+    "flat": dict(width=200, depth=0),
+    "nested": dict(width=12, depth=3),
+    "wide": dict(width=40, depth=2, comment_density=0.9),
+    "lists": dict(width=30, depth=2, list_length=20, block_scalars=0.2, collections=0.2),
+}
+
+
+def phases(yaml_path, schema_path):
+    '''
+    The phases of documenting a file, each as a function of the result
+    of the previous ones.
+    '''
+    state = {}
+
+    def parse_yaml():
+        state["yaml"] = yamldoc.parse_yaml(yaml_path)
+
+    def compile_schema():
+        state["schema"] = yamldoc.schema.compile_schema(schema_path)
+
+    def apply_schema():
+        state["schema"].apply(state["yaml"])
+
+    def render():
+        yamldoc.render.render(state["yaml"], io.StringIO(), True)
+
+    return [("parse_yaml", parse_yaml), ("compile_schema", compile_schema),
+            ("apply_schema", apply_schema), ("render", render)]
+
+
+def measure(yaml_path, schema_path, repeat):
+    '''
+    Time every phase `repeat` times, then run them once more under
+    tracemalloc for their peak memory.
+    '''
+    times = {}
+    for _ in range(repeat):
+        for name, phase in phases(yaml_path, schema_path):
+            start = time.perf_counter()
+            phase()
+            times.setdefault(name, []).append(time.perf_counter() - start)
+
+    peaks = {}
+    for name, phase in phases(yaml_path, schema_path):
+        tracemalloc.start()
+        phase()
+        peaks[name] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        name: {
+            "min": min(values),
+            "median": statistics.median(values),
+            "peak_memory": peaks[name],
+        }
+        for name, values in times.items()
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(cases, scale, repeat):
+    results = {
+        "commit": commit(),
+        "yamldoc": yamldoc.__version__,
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cases": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in cases:
+            params = dict(CASES[name])
+            params["width"] = max(1, int(params["width"] * scale))
+            generator = Generator(**params)
+            yaml, schema = generator.generate()
+            yaml_path = os.path.join(tmp, name + ".yaml")
+            schema_path = os.path.join(tmp, name + ".schema")
+            with open(yaml_path, "w") as f:
+                f.write(yaml)
+            with open(schema_path, "w") as f:
+                f.write(schema)
+
+            results["cases"][name] = {
+                "params": generator.params(),
+                "lines": yaml.count("\n"),
+                "bytes": len(yaml.encode()),
+                "phases": measure(yaml_path, schema_path, repeat),
+            }
+            print(f"{name}: {results['cases'][name]['lines']} lines", file=sys.stderr)
+    return results
+
+
+def report(results):
+    print(f"commit {results['commit']}  python {results['python']}")
+    print(f"{'case':<10} {'phase':<16} {'median ms':>10} {'peak KiB':>10}")
+    for name, case in results["cases"].items():
+        for phase, values in case["phases"].items():
+            print(f"{name:<10} {phase:<16} {values['median'] * 1000:>10.2f} {values['peak_memory'] / 1024:>10.0f}")
+
+
+def compare(before, after):
+    print(f"{before['commit']} -> {after['commit']}")
+    print(f"{'case':<10} {'phase':<16} {'time':>8} {'memory':>8}")
+    for name, case in after["cases"].items():
+        old = before["cases"].get(name)
+        if old is None:
+            continue
+        for phase, values in case["phases"].items():
+            if phase not in old["phases"]:
+                continue
+            previous = old["phases"][phase]
+            time_ratio = values["median"] / previous["median"] if previous["median"] else float("nan")
+            memory_ratio = values["peak_memory"] / previous["peak_memory"] if previous["peak_memory"] else float("nan")
+            print(f"{name:<10} {phase:<16} {time_ratio:>7.2f}x {memory_ratio:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark yamldoc on synthetic configurations.')
+    parser.add_argument('-o', '--output', default=None, help='Write the results to this JSON file.')
+    parser.add_argument('-c', '--case', action='append', choices=sorted(CASES), help='Cases to run (default: all).')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply the width of every case.')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Number of timed runs of every phase.')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='Compare two result files.')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f, open(args.compare[1]) as g:
+            compare(json.load(f), json.load(g))
+        return
+
+    results = run(args.case or list(CASES), args.scale, args.repeat)
+    report(results)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,9 +14,15 @@ setup(
    author='Chris Cole, Rodrigo Dinis & Hugo Cunha',
    author_email='ccole@well.ox.ac.uk',
    packages=['yamldoc'],  #same as name
+   extras_require={
+        'sphinx': ['sphinx'],
+        'libyaml': ['pyyaml'],
+    },
    entry_points={
         'console_scripts': [
-            'yamldoc = yamldoc:cli',
+            'yamldoc = yamldoc.cli:cli',
+            'yamldoc-serve = yamldoc.serve:main',
+            'yamldoc-diff = yamldoc.diff:main',
         ],
     }
 )
@@ -1,5 +1,25 @@
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
 import unittest
 import yamldoc
+import yamldoc.batch
+import yamldoc.cache
+import yamldoc.diff
+import yamldoc.render
+import yamldoc.scanner
+import yamldoc.schema
+import yamldoc.serve
+import yamldoc.trace
+import yamldoc.validate
+import yamldoc.watch
 
 class TestYAMLs(unittest.TestCase):
     def test_basic(self):
@@ -32,6 +52,112 @@ class TestYAMLs(unittest.TestCase):
         self.assertEqual(entries[0].value, "https://github.com/Chris1221/yamldoc")
         self.assertEqual(entries[1].entries[0].value, "https://github.com/Chris1221/yamldoc")
 
+    def test_multi_level(self):
+        entries = yamldoc.parse_yaml("test/yaml/multi_level.yaml", char = "#'", debug = False)
+        self.assertEqual([e.isBase for e in entries], [False, True, False, False])
+        self.assertEqual(entries[0].value, "- a\n- b")
+        rules = entries[1]
+        self.assertEqual(rules.meta, "Rule settings.")
+        align = rules.entries[0]
+        self.assertEqual(align.name, "align")
+        self.assertEqual(align.entries[0].meta, "Number of threads.")
+        self.assertEqual(align.entries[1].entries[0].key, "extra")
+        self.assertEqual(align.entries[1].entries[0].meta, "Extra arguments.")
+        self.assertEqual(align.entries[2].value, ">-\nrun the\naligner")
+        self.assertEqual(rules.entries[1].key, "sort")
+        self.assertTrue(entries[2].is_commented)
+        self.assertEqual(entries[3].value, "1")
+
+    def test_compact_entries(self):
+        entries = yamldoc.parse_yaml("test/yaml/two_level.yaml")
+        self.assertFalse(hasattr(entries[0], "__dict__"))
+        self.assertFalse(hasattr(entries[1], "__dict__"))
+        self.assertEqual(entries[1].link, "[two](#two)")
+        self.assertEqual(entries[1].link_entry().key, "[two](#two)")
+        other = yamldoc.parse_yaml("test/yaml/two_level.yaml")
+        self.assertIs(entries[1].entries[0].key, other[1].entries[0].key)
+
+    def test_sources(self):
+        with open("test/yaml/multi_level.yaml", "rb") as f:
+            data = f.read().replace(b"Samples to process.", "Échantillons à traiter.".encode())
+        expected = yamldoc.render.render(yamldoc.parse_yaml(io.BytesIO(data)))
+        self.assertIn("Échantillons", expected)
+
+        for source in (data, memoryview(data), io.StringIO(data.decode())):
+            self.assertEqual(yamldoc.render.render(yamldoc.parse_yaml(source)), expected)
+
+        # Chunks ending inside a line or a multi-byte character.
+        chunk_size = yamldoc.scanner.CHUNK_SIZE
+        yamldoc.scanner.CHUNK_SIZE = 7
+        try:
+            self.assertEqual(yamldoc.render.render(yamldoc.parse_yaml(data)), expected)
+        finally:
+            yamldoc.scanner.CHUNK_SIZE = chunk_size
+
+        kinds = [kind for kind, _, _, _ in yamldoc.scanner.classify(["#' a", "# b", "- c", "d: e", "f", "  "])]
+        self.assertEqual(kinds, ["marker", "comment", "item", "key", "text"])
+
+    def test_parallel(self):
+        data = (b"a:\n  - x\n  #' About the list.\n  - y\n#' First.\nb: |\n  text\n#' Third.\n\n"
+                b"c:\n  d: 1\n# - commented item\n#' Fifth.\ne: 2\nf:\ng: 3\n")
+        offsets = yamldoc.scanner.boundaries(data, 4)
+        self.assertEqual([data[start:start + 5] for start in offsets[1:-1]], [b"#' Fi", b"#' Th", b"#' Fi"])
+        self.assertEqual((offsets[0], offsets[-1]), (0, len(data)))
+
+        min_size = yamldoc.parser.PARALLEL_MIN_SIZE
+        yamldoc.parser.PARALLEL_MIN_SIZE = 0
+        try:
+            for source in (data, "test/yaml/multi_level.yaml", "test/yaml/URLs.yaml"):
+                self.assertEqual(yamldoc.render.render(yamldoc.parse_yaml(source, jobs=3)),
+                                 yamldoc.render.render(yamldoc.parse_yaml(source)))
+        finally:
+            yamldoc.parser.PARALLEL_MIN_SIZE = min_size
+
+    @unittest.skipUnless(importlib.util.find_spec("yaml"), "PyYAML is not installed")
+    def test_backend(self):
+        for source in ("test/yaml/basic.yaml", "test/yaml/multi_level.yaml", "test/yaml/URLs.yaml",
+                       b"#' Rules.\n# rules:\n#   sort: true\nx: &x 1\ny: *x\nobjs:\n  - {\n    name: a,\n  }\n"):
+            self.assertEqual(yamldoc.render.render(yamldoc.parse_yaml(source, backend="libyaml")),
+                             yamldoc.render.render(yamldoc.parse_yaml(source)))
+
+        yaml = yamldoc.parse_yaml(b'a: value # note\n"b: c": 1\nd: [1,\n  2]\n', backend="libyaml")
+        self.assertEqual([(e.key, e.value, e.line) for e in yaml], [("a", "value", 1), ("b: c", "1", 2), ("d", "[1,\n2]", 3)])
+        # Input PyYAML rejects is read by the line parser.
+        rejected = b"a: 1\n# b: 2\n  c: 3\n"
+        self.assertEqual(yamldoc.render.render(yamldoc.parse_yaml(rejected, backend="libyaml")),
+                         yamldoc.render.render(yamldoc.parse_yaml(rejected)))
+
+    def test_backend_block_scalars(self):
+        # Comments inside block scalars are looked up per scalar, not
+        # across the whole file.
+        source = b"".join(b"#' Step %d.\nkey%d: >-\n  run step %d\n  #' inside\n  more\n" % (i, i, i) for i in range(5000))
+        timings = []
+        trees = []
+        for backend in ("python", "libyaml"):
+            start = time.perf_counter()
+            trees.append(yamldoc.parse_yaml(source, backend=backend))
+            timings.append(time.perf_counter() - start)
+        self.assertEqual([(e.key, e.value, e.meta) for e in trees[1]], [(e.key, e.value, e.meta) for e in trees[0]])
+        self.assertEqual(trees[1][7].meta, "Step 7.")
+        self.assertLess(timings[1], 5 * timings[0])
+
+    def test_anchors(self):
+        yaml = yamldoc.parse_yaml(b"#' Shared.\ndefaults: &defaults\n  threads: 4\n  memory: 8G\n"
+                                  b"prod:\n  <<: *defaults\n  memory: 16G\ncopy: *defaults\n")
+        defaults, prod, copy = yaml
+        self.assertEqual([(e.key, e.value, e.origin) for e in prod.entries],
+                         [("threads", "4", "defaults"), ("memory", "16G", None)])
+        self.assertIs(copy.entries, defaults.entries)
+        self.assertEqual((copy.origin, copy.meta), ("defaults", "Shared."))
+
+        laughs = "a0: &a0\n  x: 1\n" + "".join(
+            f"a{i}: &a{i}\n" + "".join(f"  k{j}: *a{i - 1}\n" for j in range(10)) for i in range(1, 10))
+        with self.assertRaises(ValueError):
+            yamldoc.parse_yaml(laughs.encode())
+        with self.assertRaises(ValueError):
+            yamldoc.parse_yaml(b"a: &a\n  x: 1\nb:\n  c: *a\n  d: *a\n", max_expansion=3)
+
+
 class TestSchemas(unittest.TestCase):
     def test_basic(self):
         yaml = yamldoc.parse_yaml("test/yaml/basic.yaml", debug = False)
@@ -48,6 +174,513 @@ class TestSchemas(unittest.TestCase):
         self.assertEqual(yaml[1].entries[0].key, "entry")
         self.assertEqual(len(yaml[1].entries[0].type), 2)
 
+    def test_paths(self):
+        yaml = yamldoc.parse_yaml("test/yaml/multi_level.yaml")
+        index = yamldoc.entries.index_paths(yaml)
+        self.assertEqual(index["rules.align.params.extra"][0].value, '"--foo"')
+        schema = {
+            "base": {"last": "integer"},
+            "rules.align": {"threads": "integer"},
+            "params": {"extra": "string"},
+        }
+        extras = {"base": {"last": {"enum": "[1, 2]"}}}
+        yamldoc.parser.add_type_metadata(schema, yaml, index=index)
+        yamldoc.parser.add_extra_metadata(extras, yaml, index=index)
+        self.assertEqual(index["last"][0].type, "integer")
+        self.assertEqual(index["last"][0].enum, "[1, 2]")
+        self.assertEqual(index["rules.align.threads"][0].type, "integer")
+        self.assertEqual(index["rules.align.params.extra"][0].type, "string")
+        self.assertIsNone(index["rules.sort"][0].type)
+    def test_compiled(self):
+        schema = yamldoc.schema.compile_schema("test/schema/multi_level.schema")
+        self.assertEqual(schema.specials["_yamldoc_title"], "Multi level example")
+        self.assertEqual(schema.types["rules.align.params.extra"], "string")
+        self.assertEqual(schema.types["last"], ("integer", "null"))
+        with self.assertRaises(AttributeError):
+            schema.types = {}
+
+        for _ in range(2):
+            yaml = yamldoc.parse_yaml("test/yaml/multi_level.yaml")
+            schema.apply(yaml)
+            self.assertEqual(yaml[0].type, "array")
+            self.assertEqual(yaml[1].entries[0].entries[0].type, "integer")
+            self.assertEqual(yaml[1].entries[0].entries[1].entries[0].type, "string")
+            self.assertEqual(yaml[1].entries[1].enum, ["true", "false"])
+            self.assertEqual(yaml[3].type, ["integer", "null"])
+            yaml[1].entries[1].enum.append("maybe")
+        self.assertEqual(schema.extras["rules.sort"]["enum"], ("true", "false"))
+
+    def test_references(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.mkdir(os.path.join(tmp, "common"))
+            with open(os.path.join(tmp, "common", "types.yaml"), "w") as f:
+                f.write("definitions:\n  threads:\n    type: integer\n"
+                        "  node:\n    type: object\n    properties:\n      name:\n        type: string\n"
+                        "      child:\n        $ref: '#/definitions/node'\n")
+            with open(os.path.join(tmp, "config.schema"), "w") as f:
+                f.write("properties:\n  threads:\n    $ref: common/types.yaml#/definitions/threads\n"
+                        "  tree:\n    $ref: common/types.yaml#/definitions/node\n"
+                        "  job:\n    allOf:\n      - $ref: '#/definitions/base'\n"
+                        "      - properties:\n          memory:\n            type: string\n"
+                        "  limit:\n    anyOf:\n      - type: integer\n      - type: 'null'\n"
+                        "definitions:\n  base:\n    properties:\n      name:\n        type: string\n")
+            with open(os.path.join(tmp, "loop.schema"), "w") as f:
+                f.write("properties:\n  a:\n    $ref: '#/definitions/b'\n"
+                        "definitions:\n  b:\n    $ref: '#/definitions/c'\n  c:\n    $ref: '#/definitions/b'\n")
+
+            schema = yamldoc.schema.compile_schema(os.path.join(tmp, "config.schema"))
+            self.assertEqual(dict(schema.types), {
+                "threads": "integer", "tree.name": "string",
+                "job.name": "string", "job.memory": "string", "limit": ("integer", "null"),
+            })
+            self.assertEqual([os.path.basename(path) for path in schema.files], ["types.yaml"])
+            fragment = schema.files[0]
+            self.assertIs(yamldoc.schema.fragment(fragment), yamldoc.schema.fragment(fragment))
+
+            with self.assertRaises(ValueError):
+                yamldoc.schema.compile_schema(os.path.join(tmp, "loop.schema"))
+
+    def test_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "two_level.json")
+            with open(path, "w") as f:
+                f.write('{"properties": {"flat": {"type": "string"}, "two": {"properties": {"entry": {"type": ["string", "number"]}}}}}')
+            self.assertEqual(
+                yamldoc.schema.compile_schema(path).types,
+                yamldoc.schema.compile_schema("test/schema/two_level.schema").types)
+
+
+class TestRender(unittest.TestCase):
+    def test_sinks(self):
+        yaml = yamldoc.parse_yaml("test/yaml/two_level.yaml")
+        markdown = yamldoc.render.render(yaml)
+        self.assertTrue(markdown.startswith("# Configuration Parameters Reference\n"))
+        self.assertIn("| `[two](#two)` | `` |", markdown)
+        self.assertIn("## `two`", markdown)
+
+        stream = io.StringIO()
+        yamldoc.render.render(yaml, stream)
+        self.assertEqual(stream.getvalue(), markdown)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.md")
+            yamldoc.render.render(yaml, path)
+            with open(path) as f:
+                self.assertEqual(f.read(), markdown)
+
+    def test_sorted_rows(self):
+        yaml = yamldoc.parse_yaml("test/yaml/basic.yaml")
+        markdown = yamldoc.render.render(yaml, schema=True)
+        self.assertLess(markdown.index("| fun |"), markdown.index("| meta |"))
+
+    def test_formats(self):
+        yaml = yamldoc.parse_yaml("test/yaml/multi_level.yaml")
+        yamldoc.schema.compile_schema("test/schema/multi_level.schema").apply(yaml)
+        outputs = {name: io.StringIO() for name in yamldoc.render.RENDERERS}
+        yamldoc.render.render_many(yaml, outputs, schema=True)
+        for name, out in outputs.items():
+            self.assertEqual(out.getvalue(), yamldoc.render.render(yaml, schema=True, format=name))
+
+        self.assertIn('<td>- a<br>- b</td>', outputs["html"].getvalue())
+        self.assertIn('<a href="#rules.align">align</a>', outputs["html"].getvalue())
+        self.assertIn("   :name: yamldoc-rules.align", outputs["rst"].getvalue())
+
+        document = json.loads(outputs["json"].getvalue())
+        self.assertEqual([section["path"] for section in document["sections"]], ["", "rules", "rules.align", "rules.align.params"])
+        samples = document["sections"][0]["entries"][-1]
+        self.assertEqual((samples["path"], samples["value"], samples["type"]), ("samples", "- a\n- b", "array"))
+
+    def test_directives(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "config.yaml")
+            with open(path, "w") as f:
+                f.write("#' Mail user@host. $integer %yes @threads: 8 @threads: 16\nthreads: 4\n"
+                        "#' Free text. %maybe $int\nother: 1\n")
+            yaml = yamldoc.parse_yaml(path)
+
+        threads, other = yaml
+        self.assertEqual(threads.description, "Mail user@host.")
+        self.assertEqual((threads.declared_type, threads.mandatory), ("integer", "yes"))
+        self.assertEqual(threads.examples, ("threads: 8", "threads: 16"))
+
+        markdown = yamldoc.render.render(yaml, schema=True)
+        self.assertEqual(markdown, yamldoc.render.render(yaml, schema=True))
+        self.assertIn("| threads | yes | integer | 4 | threads:&nbsp;8<br>threads:&nbsp;16 | Mail&nbsp;user@host. |", markdown)
+        self.assertIn("| other | invalid input | invalid variable type | 1 | other:&nbsp;1 | Free&nbsp;text. |", markdown)
+
+    def test_stream(self):
+        stream = b"#' First.\nname: one\n---\n#' Second.\nname: two\nmore:\n  deep: 1\n...\n---\n"
+        documents = list(yamldoc.parser.parse_documents(stream))
+        self.assertEqual([[entry.value for entry in yaml if not entry.isBase] for yaml in documents], [["one"], ["two"]])
+        self.assertEqual(len(yamldoc.parse_yaml(stream)), 3)
+
+        markdown = yamldoc.parser.document_stream(stream)
+        self.assertIn("# Configuration Parameters Reference (1)\n", markdown)
+        self.assertIn("\n---\n\n# Configuration Parameters Reference (2)\n", markdown)
+        self.assertIn("## `more`", markdown)
+
+        lines = yamldoc.parser.document_stream(stream, format="json").splitlines()
+        self.assertEqual([json.loads(line)["title"] for line in lines],
+                         ["Configuration Parameters Reference (1)", "Configuration Parameters Reference (2)"])
+
+
+    def test_markdown_pipes(self):
+        yaml = yamldoc.parse_yaml(b"#' Pipe a|b here.\ncmd: sort | uniq\n")
+        self.assertIn("| `cmd` | `sort&nbsp;\\|&nbsp;uniq` | Pipe&nbsp;a\\|b&nbsp;here. |", yamldoc.render.render(yaml))
+        schema = yamldoc.schema.compile_schema({"properties": {"cmd": {"type": "string"}}})
+        schema.apply(yaml)
+        row = yamldoc.render.MarkdownRenderer(True).row(yaml[0])
+        self.assertEqual(row.count("|") - row.count("\\|"), 7)
+
+    def test_pages(self):
+        yaml = yamldoc.parser.parse_yaml(b"index:\n  a: 1\nIndex:\n  b:\n    c: 2\n  index:\n    d: 3\n")
+        with tempfile.TemporaryDirectory() as tmp:
+            written = yamldoc.render.render_pages(yaml, tmp)
+            self.assertEqual([os.path.basename(path) for path in written], ["index.md", "index-1.md", "index-2.md"])
+            with open(written[0]) as f:
+                self.assertIn("`[Index](index-2.md)`", f.read())
+            with open(written[2]) as f:
+                page = f.read()
+            self.assertIn("`[b](#b)`", page)
+            self.assertIn("`[index](#index-1)`", page)
+
+        slugs = yamldoc.render.Slugs()
+        self.assertEqual([slugs.add(text) for text in ["a b", "A-b", "a-b-1", "a b", "?"]],
+                         ["a-b", "a-b-1", "a-b-1-1", "a-b-2", "section"])
+
+class TestDiff(unittest.TestCase):
+    def test_changes(self):
+        old = b"#' Threads.\nthreads: 4\nsection:\n  a: 1\n  b: 2\nkeep:\n  x: 1\ngone: 1\n"
+        new = b"#' Worker threads.\nthreads: 8\nkeep:\n  x: 1\nsection:\n  b: 2\n  a: 3\n  c: 4\n"
+        changes = yamldoc.diff.compare(old, new)
+        self.assertEqual([(c.kind, c.path, c.fields) for c in changes], [
+            ("modified", "threads", ("value", "comment")),
+            ("modified", "section.a", ("value",)),
+            ("added", "section.c", ()),
+            ("removed", "gone", ()),
+        ])
+        self.assertEqual(yamldoc.diff.compare(old, old), [])
+
+        markdown = yamldoc.diff.render(changes)
+        self.assertIn("| modified | `section.a` | value: 1 | value: 3 |", markdown)
+        report = json.loads(yamldoc.diff.render(changes, format="json"))
+        self.assertEqual(report["changes"][2]["after"]["value"], "4")
+
+        markdown = yamldoc.diff.render(yamldoc.diff.compare(b"a: 1\n", b"a: 1\nb: x | y\n"))
+        self.assertIn("| added | `b` |  | `x \\| y` |", markdown)
+
+
+class TestValidate(unittest.TestCase):
+    def test_violations(self):
+        yaml = (b"#' Threads. $integer %yes\nthreads: four\n#' Mode. %yes\n# mode: fast\n"
+                b"level: 7\nname: 5\nrules:\n  sort: true\n")
+        schema = yamldoc.schema.compile_schema({"properties": {
+            "level": {"type": "integer", "enum": [1, 2, 3]},
+            "name": {"type": "string"},
+            "rules": {"type": "object", "properties": {"sort": {"type": "boolean"}}},
+        }})
+        violations = yamldoc.validate.validate(yamldoc.parse_yaml(yaml), schema)
+        self.assertEqual([str(v) for v in violations], [
+            "line 2: threads: expected integer, found string",
+            "line 4: mode: mandatory value is commented out",
+            "line 5: level: 7 is not one of 1, 2, 3",
+            "line 6: name: expected string, found integer",
+        ])
+        self.assertIs(yamldoc.validate.validator(schema), yamldoc.validate.validator(schema))
+
+        out = io.StringIO()
+        with self.assertRaises(yamldoc.validate.ValidationError) as raised:
+            yamldoc.parser.document(yaml, out, schema_path=schema, validate=True)
+        self.assertEqual(len(raised.exception.violations), 4)
+        self.assertIn("| threads | yes | integer | four |", out.getvalue())
+
+        for y, s in [("basic", "basic"), ("multi_level", "multi_level")]:
+            yamldoc.parser.document(f"test/yaml/{y}.yaml", schema_path=f"test/schema/{s}.schema", validate=True)
+
+    def test_special_floats(self):
+        yaml = yamldoc.parse_yaml(b"x: .inf\ny: -.INF\nz: .NaN\n")
+        schema = yamldoc.schema.compile_schema({"properties": {
+            "x": {"type": "number", "enum": [".inf", 1]},
+            "y": {"type": "number", "enum": [float("-inf")]},
+            "z": {"type": "number", "enum": [1]},
+        }})
+        self.assertEqual([str(v) for v in yamldoc.validate.validate(yaml, schema)], ["line 3: z: .NaN is not one of 1"])
+
+    def test_mapping_enum(self):
+        yaml = yamldoc.parse_yaml(b"mode:\n  x: 1\n")
+        schema = yamldoc.schema.compile_schema({"properties": {"mode": {"type": "string", "enum": ["a", "b"]}}})
+        schema.apply(yaml)
+        self.assertEqual([str(v) for v in yamldoc.validate.validate(yaml, schema)],
+                         ["line 1: mode: expected string, found object"])
+
+
+class TestBatch(unittest.TestCase):
+    def test_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "configs")
+            os.makedirs(os.path.join(src, "nested"))
+            for name in ["basic.yaml", "two_level.yaml"]:
+                with open(os.path.join("test/yaml", name)) as f, open(os.path.join(src, "nested", name), "w") as g:
+                    g.write(f.read())
+            with open(os.path.join(src, "broken.yaml"), "wb") as f:
+                f.write(b"key: \xff\xfe\n")
+
+            out = os.path.join(tmp, "docs")
+            for jobs in [1, 2]:
+                results = yamldoc.batch.run([src], out, jobs=jobs)
+                outputs = [os.path.relpath(o, out) for _, o, _ in results]
+                self.assertEqual(outputs, ["broken.md", os.path.join("nested", "basic.md"), os.path.join("nested", "two_level.md")])
+                self.assertIsNotNone(results[0][2])
+                self.assertIsNone(results[1][2])
+                with open(results[1][1]) as f:
+                    self.assertEqual(f.read(), yamldoc.parser.document("test/yaml/basic.yaml"))
+
+    def test_usage_errors(self):
+        for args in (["test/yaml"], ["test/yaml/basic.yaml", "-s", "missing.schema"],
+                     ["test/yaml", "-o", "unused", "-s", "missing.schema"]):
+            result = subprocess.run([sys.executable, "-c", "from yamldoc.cli import cli; cli()"] + args,
+                                    capture_output=True, text=True)
+            self.assertEqual(result.returncode, 2)
+            self.assertIn("error:", result.stderr)
+            self.assertNotIn("Traceback", result.stderr)
+        self.assertFalse(os.path.exists("unused"))
+
+    def test_collisions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ["a/config.yaml", "b/config.yaml", "a/config.yml"]:
+                os.makedirs(os.path.dirname(os.path.join(tmp, name)), exist_ok=True)
+                with open(os.path.join(tmp, name), "w") as f:
+                    f.write(f"name: {name}\n")
+            out = os.path.join(tmp, "docs")
+            results = yamldoc.batch.run([os.path.join(tmp, "a/config.yaml"), os.path.join(tmp, "*/config.y*ml")], out, jobs=1)
+            self.assertEqual([error is None for _, _, error in results], [True, False, False])
+            self.assertIn("config.md is already written for", results[1][2])
+            with open(os.path.join(out, "config.md")) as f:
+                self.assertIn("a/config.yaml", f.read())
+
+    def test_search_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            yamldoc.batch.run(["test/yaml"], tmp, jobs=1, formats=["markdown", "index"])
+            with open(os.path.join(tmp, yamldoc.batch.MANIFEST)) as f:
+                shards = json.load(f)["shards"]
+            self.assertEqual(shards[2], {"source": "test/yaml/multi_level.yaml", "shard": "multi_level.index.json",
+                                         "page": "multi_level.md"})
+            with open(os.path.join(tmp, "multi_level.index.json")) as f:
+                index = json.load(f)
+            self.assertEqual([index["entries"][i][0] for i in index["terms"]["threads"]], ["rules.align.threads"])
+            self.assertEqual(len(index["terms"]["align"]), 5)
+
+            # Shards of unchanged files are not written again.
+            os.utime(os.path.join(tmp, "multi_level.index.json"), (0, 0))
+            yamldoc.batch.run(["test/yaml"], tmp, jobs=1, formats=["markdown", "index"])
+            self.assertEqual(os.stat(os.path.join(tmp, "multi_level.index.json")).st_mtime, 0)
+
+class TestCache(unittest.TestCase):
+    def test_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = yamldoc.cache.Cache(tmp)
+            first = cache.parse_yaml("test/yaml/two_level.yaml")
+            second = cache.parse_yaml("test/yaml/two_level.yaml")
+            self.assertIsNot(first, second)
+            self.assertEqual(second[1].entries[0].key, "entry")
+            self.assertEqual(
+                cache.compile_schema("test/schema/two_level.schema"),
+                yamldoc.schema.compile_schema("test/schema/two_level.schema"))
+            self.assertNotEqual(cache.key("yaml", b"a: 1", "#'"), cache.key("yaml", b"a: 1", "#"))
+            self.assertEqual(
+                yamldoc.parser.document("test/yaml/two_level.yaml", schema_path="test/schema/two_level.schema", cache=cache),
+                yamldoc.parser.document("test/yaml/two_level.yaml", schema_path="test/schema/two_level.schema"))
+
+            with open("test/yaml/basic.yaml", "rb") as f:
+                self.assertEqual(len(cache.parse_yaml(f)), len(yamldoc.parse_yaml("test/yaml/basic.yaml")))
+            self.assertEqual(cache.parse_yaml("test/yaml/basic.yaml")[0].key, yamldoc.parse_yaml("test/yaml/basic.yaml")[0].key)
+
+    def test_evict(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = yamldoc.cache.Cache(tmp)
+            for i in range(4):
+                cache.put(cache.key("test", str(i).encode()), list(range(1000)))
+                stamp = time.time() - 100 + i
+                os.utime(cache.path(cache.key("test", str(i).encode())), (stamp, stamp))
+            size = os.path.getsize(cache.path(cache.key("test", b"0")))
+            cache.max_size = 2 * size
+            self.assertEqual(cache.evict(), 2)
+            self.assertIsNone(cache.get(cache.key("test", b"0")))
+            self.assertIsNotNone(cache.get(cache.key("test", b"3")))
+            self.assertEqual(cache.clear(), 2)
+
+class TestWatch(unittest.TestCase):
+    def test_incremental(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "config.yaml")
+            with open("test/yaml/multi_level.yaml") as f:
+                text = f.read()
+            with open(path, "w") as f:
+                f.write(text)
+
+            out = os.path.join(tmp, "docs")
+            watcher = yamldoc.watch.Watcher([path], out)
+            self.assertEqual(watcher.poll(), {path: 3})
+            self.assertEqual(watcher.poll(), {})
+
+            with open(path, "w") as f:
+                f.write(text.replace("extra: \"--foo\"", "extra: \"--bar\""))
+            os.utime(path, ns=(0, 0))
+            self.assertEqual(watcher.poll(), {path: 1})
+            with open(os.path.join(out, "config.md")) as f:
+                self.assertEqual(f.read(), yamldoc.parser.document(path))
+
+    def test_schema_errors(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            schema = os.path.join(tmp, "config.schema")
+            with open("test/schema/multi_level.schema") as f:
+                text = f.read()
+            with open(schema, "w") as f:
+                f.write(text)
+
+            watcher = yamldoc.watch.Watcher(["test/yaml/multi_level.yaml"], tmp, schema_path=schema)
+            self.assertEqual(len(watcher.poll()), 1)
+            os.remove(schema)
+            errors = io.StringIO()
+            with contextlib.redirect_stderr(errors):
+                self.assertEqual(watcher.poll(), {})
+            self.assertIn("FileNotFoundError", errors.getvalue())
+
+            with open(schema, "w") as f:
+                f.write(text)
+            self.assertEqual(len(watcher.poll()), 1)
+
+class TestTrace(unittest.TestCase):
+    def test_phases(self):
+        finished = []
+        with yamldoc.trace.Tracer(memory=True, hooks=[finished.append]) as tracer:
+            yamldoc.parser.document("test/yaml/multi_level.yaml", schema_path="test/schema/multi_level.schema")
+        self.assertIsNone(yamldoc.trace.current())
+        self.assertEqual([s.stack for s in finished], [("parse", "read"), ("parse",), ("schema_compile",), ("annotate",), ("render",)])
+        self.assertTrue(all(s.peak_memory > 0 for s in finished))
+        self.assertEqual(tracer.counters["depth_0"], 4)
+        self.assertGreater(tracer.counters["entries"], tracer.counters["depth_0"])
+        self.assertEqual(tracer.to_json()["spans"][0]["name"], "read")
+        self.assertEqual([line.split()[0] for line in tracer.collapsed()], ["parse;read", "parse", "schema_compile", "annotate", "render"])
+
+class TestStartup(unittest.TestCase):
+    # Seconds the command line may take to document a small file, on top
+    # of starting Python itself.
+    BUDGET = 0.25
+
+    def run_python(self, code):
+        best = None
+        for _ in range(3):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return result.stdout, best
+
+    def test_cold_start(self):
+        code = ("import sys, yamldoc; sys.argv = ['yamldoc', 'test/yaml/basic.yaml']; yamldoc.cli(); "
+                "print(' '.join(sorted(sys.modules)))")
+        output, elapsed = self.run_python(code)
+        python, baseline = self.run_python("import sys; print(' '.join(sorted(sys.modules)))")
+        self.assertIn("# Configuration Parameters Reference", output)
+
+        # Modules Python itself loaded, e.g. from .pth files, do not count.
+        loaded = set(output.splitlines()[-1].split()) - set(python.split())
+        for module in ["pdb", "shutil", "tracemalloc", "concurrent.futures", "yaml", "asyncio",
+                       "yamldoc.schema", "yamldoc.batch", "yamldoc.cache", "yamldoc.validate"]:
+            self.assertNotIn(module, loaded)
+        self.assertLess(elapsed - baseline, self.BUDGET)
+
+    def test_exports(self):
+        code = "import yamldoc.cli, yamldoc.parser, yamldoc; print(yamldoc.cli.__module__, yamldoc.main.__module__)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.split(), ["yamldoc.cli", "yamldoc.parser"])
+
+class TestServe(unittest.TestCase):
+    def test_render(self):
+        async def request(port, body):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /render HTTP/1.1\r\nConnection: close\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+            response = await reader.read()
+            writer.close()
+            head, _, payload = response.partition(b"\r\n\r\n")
+            return head.split()[1], payload.decode()
+
+        async def run():
+            async with yamldoc.serve.RenderService(workers=0) as service:
+                server = await service.start_server(port=0)
+                port = server.sockets[0].getsockname()[1]
+                body = b'{"yaml_path": "test/yaml/multi_level.yaml", "schema_path": "test/schema/multi_level.schema"}'
+                first, second = await asyncio.gather(request(port, body), request(port, body))
+                error = await request(port, b'{"schema_path": "test/schema/multi_level.schema"}')
+                index = await request(port, b'{"yaml_path": "test/yaml/multi_level.yaml", "format": "index"}')
+                server.close()
+                await server.wait_closed()
+                return service, first, second, error, index
+
+        service, first, second, error, index = asyncio.run(run())
+        expected = yamldoc.parser.document("test/yaml/multi_level.yaml", schema_path="test/schema/multi_level.schema")
+        self.assertEqual(first, (b"200", expected))
+        self.assertEqual(second, first)
+        self.assertEqual((service.misses, service.hits), (2, 1))
+        self.assertEqual(error[0], b"400")
+        self.assertEqual(index[0], b"200")
+        self.assertIn("threads", json.loads(index[1])["terms"])
+
+
+    def test_schema_references(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            fragment = os.path.join(tmp, "threads.schema")
+            with open(fragment, "w") as f:
+                f.write("type: integer\n")
+            schema = b"properties:\n  threads:\n    $ref: threads.schema\n"
+
+            async def run():
+                async with yamldoc.serve.RenderService(workers=0, schema_root=tmp) as service:
+                    first = await service.render(b"threads: 4\n", schema)
+                    with open(fragment, "w") as f:
+                        f.write("type: string\n")
+                    os.utime(fragment, ns=(0, 0))
+                    second = await service.render(b"threads: 4\n", schema)
+                    return service, first, second
+
+            service, first, second = asyncio.run(run())
+            self.assertIn("| integer |", first)
+            self.assertIn("| string |", second)
+            self.assertEqual((service.misses, service.hits), (2, 0))
+
+
+@unittest.skipUnless(importlib.util.find_spec("sphinx"), "sphinx is not installed")
+class TestSphinx(unittest.TestCase):
+    def build(self, source, out):
+        from sphinx.application import Sphinx
+        app = Sphinx(source, source, out, os.path.join(out, ".doctrees"), "html", status=None, warning=io.StringIO())
+        app.build()
+        return app
+
+    def test_directive(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "source")
+            os.mkdir(source)
+            with open("test/yaml/multi_level.yaml") as f, open(os.path.join(tmp, "config.yaml"), "w") as g:
+                g.write(f.read())
+            with open(os.path.join(source, "conf.py"), "w") as f:
+                f.write('extensions = ["yamldoc.sphinxext"]\n')
+            with open(os.path.join(source, "index.rst"), "w") as f:
+                f.write("Parameters\n==========\n\n.. yamldoc:: ../config.yaml\n")
+
+            out = os.path.join(tmp, "html")
+            app = self.build(source, out)
+            self.assertEqual(app._warncount, 0)
+            with open(os.path.join(out, "index.html")) as f:
+                html = f.read()
+            self.assertIn('href="#yamldoc-0-rules-align"', html)
+            self.assertIn("Samples to process.", html)
+
+            app = self.build(source, out)
+            self.assertEqual(len(app.env.yamldoc_cache), 1)
+            self.assertEqual({str(path) for path in app.env.dependencies["index"]}, {os.path.join(tmp, "config.yaml")})
+
 
 if __name__ == '__main__':
     unittest.main()
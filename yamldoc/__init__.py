@@ -1,5 +1,43 @@
 __version__ = "0.1.2"
 
-from .parser import parse_yaml, main
-from .cli import cli
-from .entries import *
+import importlib
+import sys
+import types
+
+# Names and submodules are imported on first use, so that a run of the
+# command line only loads the modules it needs.
+_EXPORTS = {"parse_yaml": "parser", "main": "parser", "cli": "cli"}
+_SUBMODULES = frozenset(["batch", "cache", "diff", "entries", "events", "parser", "render", "scanner", "schema",
+                         "serve", "trace", "validate", "watch"])
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module("." + _EXPORTS[name], __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module("." + name, __name__)
+    elif not name.startswith("_"):
+        # Everything from yamldoc.entries, e.g. yamldoc.Entry.
+        value = getattr(importlib.import_module(".entries", __name__), name, None)
+        if value is None:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+class _Package(types.ModuleType):
+    """
+    The yamldoc package. Importing a submodule binds it on its package,
+    which would hide yamldoc.cli, the function, behind yamldoc.cli, the
+    module; the exported function is kept instead.
+    """
+
+    def __setattr__(self, name, value):
+        if name in _EXPORTS and isinstance(value, types.ModuleType) and value.__name__ == f"{__name__}.{_EXPORTS[name]}":
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
@@ -0,0 +1,248 @@
+import concurrent.futures
+import glob
+import io
+import json
+import os
+
+import yamldoc.parser
+import yamldoc.render
+import yamldoc.schema
+
+# File name patterns picked up when walking a directory.
+EXTENSIONS = (".yaml", ".yml")
+
+# File listing the shards of the search index, written to the output
+# directory when the "index" format is among the outputs.
+MANIFEST = "search-index.json"
+
+
+def walk(directory):
+    '''
+    Recursively find the YAML files below a directory, skipping hidden
+    files and directories.
+
+    Arguments:
+        directory: Directory to search.
+
+    Returns:
+        Sorted list of paths relative to the directory.
+    '''
+    found = []
+    pending = [""]
+    while pending:
+        relative = pending.pop()
+        with os.scandir(os.path.join(directory, relative)) as it:
+            for item in it:
+                if item.name.startswith("."):
+                    continue
+                path = os.path.join(relative, item.name)
+                if item.is_dir():
+                    pending.append(path)
+                elif item.name.endswith(EXTENSIONS):
+                    found.append(path)
+    return sorted(found)
+
+
+def find_files(inputs, out_dir, extension=".md"):
+    '''
+    Expand files, directories and glob patterns into the files to document
+    and the markdown file each one is written to.
+
+    Files found inside a directory keep their path relative to it, so
+    the outputs mirror the input tree. Files given directly or through
+    a glob are named after their own file name.
+
+    Arguments:
+        inputs: List of files, directories or glob patterns.
+        out_dir: Directory the markdown files are written to.
+        extension: Extension of the output files.
+
+    Returns:
+        List of (input, output) path pairs, in a stable order.
+    '''
+    pairs = {}
+
+    def add(path, name):
+        key = os.path.realpath(path)
+        if key not in pairs:
+            pairs[key] = (path, os.path.join(out_dir, os.path.splitext(name)[0] + extension))
+
+    for item in inputs:
+        if os.path.isdir(item):
+            for relative in walk(item):
+                add(os.path.join(item, relative), relative)
+        elif glob.has_magic(item):
+            for path in sorted(glob.glob(item, recursive=True)):
+                if os.path.isfile(path):
+                    add(path, os.path.basename(path))
+        else:
+            add(item, os.path.basename(item))
+
+    return list(pairs.values())
+
+
+def _document(task):
+    '''
+    Document a single file inside a worker process.
+
+    Returns:
+        None on success, otherwise the error message for the file.
+    '''
+    yaml_path, outputs, char, schema_path, cache, stream, validate, backend, split = task
+    # The index shard is only rewritten when it changed, so that an
+    # incremental build of the site picks up the shards of changed files.
+    shard = outputs.get("index")
+    if shard is not None:
+        outputs = dict(outputs, index=io.StringIO())
+    error = None
+    try:
+        for out_path in outputs.values():
+            if isinstance(out_path, str):
+                os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        if split:
+            yamldoc.parser.document(yaml_path, outputs["markdown"], char, False, schema_path, cache=cache, validate=validate,
+                                    backend=backend, split=True)
+        elif stream:
+            yamldoc.parser.document_stream(yaml_path, outputs, char, False, schema_path, validate=validate, backend=backend)
+        else:
+            yamldoc.parser.document(yaml_path, outputs, char, False, schema_path, cache=cache, validate=validate,
+                                    backend=backend)
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+    if shard is not None and outputs["index"].tell():
+        os.makedirs(os.path.dirname(shard) or ".", exist_ok=True)
+        replace(shard, outputs["index"].getvalue())
+    return error
+
+
+def replace(path, text):
+    '''
+    Write a file unless it already holds the same text, leaving its
+    modification time alone.
+
+    Returns:
+        True when the file was written.
+    '''
+    try:
+        with open(path) as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    with open(path, "w") as f:
+        f.write(text)
+    return True
+
+
+def write_manifest(out_dir, documented):
+    '''
+    Write the list of the search index shards to MANIFEST in the output
+    directory. A page loads it, then the shards it needs.
+
+    Arguments:
+        out_dir: Directory the outputs are written to.
+        documented: List of (input, outputs) pairs, where outputs maps
+            the formats written to their paths and includes "index".
+    '''
+    shards = []
+    for yaml_path, outputs in documented:
+        if not os.path.exists(outputs["index"]):
+            continue
+        pages = [path for format, path in outputs.items() if format != "index"]
+        shards.append({
+            "source": yaml_path.replace(os.sep, "/"),
+            "shard": os.path.relpath(outputs["index"], out_dir).replace(os.sep, "/"),
+            "page": os.path.relpath(pages[0], out_dir).replace(os.sep, "/") if pages else None,
+        })
+    os.makedirs(out_dir, exist_ok=True)
+    replace(os.path.join(out_dir, MANIFEST), json.dumps({"shards": shards}, ensure_ascii=False, indent=1) + "\n")
+
+
+def run(inputs, out_dir, char="#'", schema_path=None, jobs=None, cache=None, formats=("markdown",), stream=False,
+        validate=False, backend="python", split=False):
+    '''
+    Document every YAML file found in the inputs, each to its own
+    markdown file, across a pool of worker processes.
+
+    A file that fails to parse or render does not stop the others; its
+    error is reported instead. So is a file that would be written to the
+    same output as one before it.
+
+    Arguments:
+        inputs: List of files, directories or glob patterns.
+        out_dir: Directory the markdown files are written to.
+        char: Special character to identify comments to be included in YAMLDOC documentation.
+        schema_path: Path to a schema file applied to every input, or
+            a schema compiled with yamldoc.schema.compile_schema.
+        jobs: Number of worker processes. Defaults to the number of CPUs,
+            and 1 documents the files in this process.
+        cache: (Optional) A yamldoc.cache.Cache shared by the workers.
+        formats: Output formats written for every file, from one walk
+            of its tree. The outputs differ by their extension. With
+            "index", the shards of the search index are listed in
+            MANIFEST.
+        stream: Document every file as a stream of YAML documents with
+            yamldoc.parser.document_stream. The cache is not used.
+        validate: Report files whose values do not conform to the schema
+            or their comments as failed, once their outputs are written.
+        backend: How the YAML is read, one of yamldoc.parser.BACKENDS.
+        split: Write the markdown of every file as a directory of pages,
+            named after the file, with yamldoc.render.render_pages.
+
+    Returns:
+        List of (input, output, error) tuples, where error is None for
+        files that were documented and output is the file of the first
+        format, or the directory of pages with split.
+    '''
+    if split and (list(formats) != ["markdown"] or stream):
+        raise ValueError("only single markdown documents can be split into pages")
+    extensions = [yamldoc.render.renderer(format).extension for format in formats]
+    pairs = find_files(inputs, out_dir, extensions[0])
+
+    # Compile the schema once for every file.
+    if schema_path is not None and not isinstance(schema_path, yamldoc.schema.CompiledSchema):
+        if cache is not None:
+            schema_path = cache.compile_schema(schema_path)
+        else:
+            schema_path = yamldoc.schema.compile_schema(schema_path)
+
+    tasks = []
+    documented = []
+    # Inputs of the same name in different places, or differing only by
+    # their extension, would be written to the same output. The first
+    # one in order is documented and the others are reported.
+    errors = [None] * len(pairs)
+    claimed = {}
+    for i, (yaml_path, out_path) in enumerate(pairs):
+        first = claimed.setdefault(out_path, i)
+        if first != i:
+            errors[i] = f'ValueError: {out_path} is already written for {pairs[first][0]}'
+            continue
+        base = out_path[:-len(extensions[0])]
+        if split:
+            pairs[i] = (yaml_path, base)
+            outputs = {"markdown": base}
+        else:
+            outputs = {format: base + extension for format, extension in zip(formats, extensions)}
+        tasks.append((yaml_path, outputs, char, schema_path, cache, stream, validate, backend, split))
+        documented.append((yaml_path, outputs))
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    if jobs == 1 or len(tasks) < 2:
+        results = list(map(_document, tasks))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            chunksize = max(1, len(tasks) // (jobs * 4))
+            results = list(pool.map(_document, tasks, chunksize=chunksize))
+    pending = iter(results)
+    errors = [error if error is not None else next(pending) for error in errors]
+
+    if "index" in formats:
+        write_manifest(out_dir, documented)
+
+    if cache is not None:
+        cache.evict()
+
+    return [(yaml_path, out_path, error) for (yaml_path, out_path), error in zip(pairs, errors)]
@@ -0,0 +1,202 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+import zlib
+
+import yamldoc
+import yamldoc.parser
+import yamldoc.scanner
+import yamldoc.schema
+import yamldoc.trace
+
+# Bumped whenever the layout of the cached trees changes, so that
+# entries written by an incompatible version are never loaded.
+FORMAT = 9
+
+
+def default_directory():
+    '''
+    Directory used for the cache when none is given: yamldoc under
+    $XDG_CACHE_HOME, or ~/.cache when that is not set.
+    '''
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "yamldoc")
+
+
+class Cache:
+    """
+    A persistent, content addressed store of parse results.
+
+    Entries are keyed by a hash of the file contents, the parse options
+    and the yamldoc version, so they never go stale: a changed input
+    simply hashes to a new key. Old entries are removed by evict(),
+    least recently used first.
+    """
+
+    def __init__(self, directory=None, max_size=256 * 1024 * 1024, max_age=30 * 24 * 60 * 60):
+        """
+        Initialize the object.
+
+        Arguments:
+            directory: Where the entries are stored. Defaults to default_directory().
+            max_size: Total size in bytes the cache is trimmed to.
+            max_age: Entries not used for this many seconds are removed.
+        """
+        self.directory = directory or default_directory()
+        self.max_size = max_size
+        self.max_age = max_age
+
+    def __repr__(self):
+        """
+        Returns a print representation.
+        """
+        return f'yamldoc cache at {self.directory}'
+
+    def key(self, kind, data, *options):
+        """
+        Hash the contents of an input along with everything that changes
+        how it is parsed.
+
+        Arguments:
+            kind: Name of the parse, e.g. "yaml" or "schema".
+            data: Contents of the input as bytes.
+            options: Parse options, converted with repr().
+        """
+        digest = hashlib.sha256()
+        digest.update(repr((FORMAT, yamldoc.__version__, kind) + options).encode())
+        digest.update(b"\0")
+        digest.update(data)
+        return digest.hexdigest()
+
+    def path(self, key):
+        """
+        Location of the entry for a key.
+        """
+        return os.path.join(self.directory, key[:2], key[2:] + ".pickle.z")
+
+    def get(self, key):
+        """
+        Load an entry, or None if it is not cached. A hit marks the entry
+        as recently used.
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # A truncated or otherwise unreadable entry is a miss.
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        """
+        Store an entry. The file is written under a temporary name and
+        moved in place, so concurrent readers never see a partial entry.
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            self._remove(tmp)
+            raise
+
+    def parse_yaml(self, file_path, char="#'", debug=False, jobs=None, backend="python"):
+        """
+        Cached version of yamldoc.parser.parse_yaml.
+        """
+        with yamldoc.scanner.Source(file_path) as source:
+            key = self.key("yaml", source.buffer, char, backend)
+            if hasattr(file_path, "read"):
+                # The stream has been read for the key; parse what was read.
+                file_path = source.buffer
+        value = self.get(key)
+        if value is None:
+            value = yamldoc.parser.parse_yaml(file_path, char, debug, jobs=jobs, backend=backend)
+            self.put(key, value)
+        elif debug:
+            yamldoc.trace.debug(f"Cache hit for {file_path}")
+        return value
+
+    def compile_schema(self, path_to_file, debug=False):
+        """
+        Cached version of yamldoc.schema.compile_schema.
+
+        The files the schema refers to with $ref are stored with it, by
+        modification time and size, and it is compiled again when any
+        of them changed.
+        """
+        with open(path_to_file, "rb") as f:
+            key = self.key("schema", f.read(), os.path.abspath(path_to_file))
+        value = self.get(key)
+        if value is not None and value[1] == yamldoc.schema.file_stats(value[0].files):
+            if debug: yamldoc.trace.debug(f"Cache hit for {path_to_file}")
+            return value[0]
+        schema = yamldoc.schema.compile_schema(path_to_file, debug)
+        self.put(key, (schema, yamldoc.schema.file_stats(schema.files)))
+        return schema
+
+    def evict(self):
+        """
+        Remove entries unused for longer than max_age, then the least
+        recently used ones until the cache fits in max_size.
+
+        Returns:
+            Number of entries removed.
+        """
+        entries = []
+        try:
+            shards = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return 0
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            with os.scandir(shard.path) as it:
+                for item in it:
+                    if item.name.endswith(".pickle.z"):
+                        stat = item.stat()
+                        entries.append((stat.st_mtime, stat.st_size, item.path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - self.max_age
+        removed = 0
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        max_size, max_age = self.max_size, self.max_age
+        self.max_size, self.max_age = -1, -1
+        try:
+            return self.evict()
+        finally:
+            self.max_size, self.max_age = max_size, max_age
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
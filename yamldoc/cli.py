@@ -1,14 +1,128 @@
 import yamldoc
+import yamldoc.parser
+import yamldoc.render
+import yamldoc.trace
 import argparse
+import os
+import sys
+
+# yamldoc.batch, yamldoc.cache, yamldoc.schema, yamldoc.watch and
+# yamldoc.validate are loaded by the package when a run uses them, as
+# tools call yamldoc on one file at a time many times over.
+
+class HelpFormatter(argparse.HelpFormatter):
+    """
+    The argparse help formatter, looking up the width of the terminal
+    without importing shutil. argparse creates a formatter for every
+    option added, long before any help text is printed.
+    """
+
+    def __init__(self, prog, indent_increment=2, max_help_position=24, width=None):
+        if width is None:
+            try:
+                width = int(os.environ.get("COLUMNS") or os.get_terminal_size(sys.__stdout__.fileno()).columns)
+            except (ValueError, OSError, AttributeError):
+                width = 80
+            width -= 2
+        super().__init__(prog, indent_increment, max_help_position, width)
 
 def cli():
     ''' Example of taking inputs for megazord bin'''
-    parser = argparse.ArgumentParser(prog='YAML Documentation Engine')
-    parser.add_argument('file',  help='YAML file.')
+    parser = argparse.ArgumentParser(prog='YAML Documentation Engine', formatter_class=HelpFormatter)
+    parser.add_argument('file', nargs='+', help='YAML file. With --output, any number of files, directories or glob patterns.')
     parser.add_argument('-c', '--char', default = "#'", help='Metadata character prefix.')
     parser.add_argument('-d', '--debug', action = 'store_true', help='Show debug information.')
     parser.add_argument('-s', '--schema', default = None, help = "(Optional) Schema file describing variable types.")
+    parser.add_argument('-o', '--output', default = None, help = "(Optional) Directory to write one markdown file per input to.")
+    parser.add_argument('--cache', nargs = '?', const = '', default = None, metavar = 'DIR', help = "(Optional) Reuse parse results of unchanged files from an on-disk cache, by default in ~/.cache/yamldoc.")
+    parser.add_argument('-w', '--watch', action = 'store_true', help = "Keep running and update the outputs of --output whenever the inputs change.")
+    parser.add_argument('-j', '--jobs', type = int, default = None, help = "Number of worker processes used with --output, where it defaults to the number of CPUs. Without --output, a file of 8 MB or more is parsed by this many processes; by default it is parsed in this process.")
+    parser.add_argument('-f', '--format', action = 'append', choices = sorted(yamldoc.render.RENDERERS), help = "Output format, markdown by default. Give it several times with --output to write several formats at once.")
+    parser.add_argument('--split', action = 'store_true', help = "With --output, write every file as a directory holding an index page and one markdown page per top level section, rather than as a single document.")
+    parser.add_argument('--stream', action = 'store_true', help = "Read the input as a stream of YAML documents separated by ---, and render every document as soon as it is parsed.")
+    parser.add_argument('--validate', action = 'store_true', help = "Check the values against the schema, their \"$\" types and \"%%yes\" mandatory markers, and exit with status 1 when some do not conform.")
+    parser.add_argument('--backend', default = 'python', choices = yamldoc.parser.BACKENDS, help = "How YAML is read: with the built in line parser, or with PyYAML (libyaml), which reads quoting, flow collections and multi-line values exactly. Needs PyYAML installed.")
+    parser.add_argument('--profile', default = None, metavar = 'FILE', help = "(Optional) Write the time spent in each phase to FILE, as JSON if it ends in .json and as collapsed stacks otherwise. Work done in --jobs worker processes is not included.")
+    parser.add_argument('--profile-memory', action = 'store_true', help = "Also record the peak memory of every phase with --profile.")
 
     args = parser.parse_args()
 
-    yamldoc.main(args.file, args.char, args.debug, args.schema)
+    if args.profile is None:
+        status = run(parser, args)
+    else:
+        with yamldoc.trace.Tracer(memory = args.profile_memory) as tracer:
+            status = run(parser, args)
+        tracer.write(args.profile)
+
+    if status:
+        sys.exit(status)
+
+def run(parser, args):
+    ''' Run the command line with parsed arguments, returning the exit status.'''
+    formats = args.format or ["markdown"]
+    cache = None
+    if args.cache is not None:
+        cache = yamldoc.cache.Cache(args.cache or None)
+
+    if args.watch:
+        if args.output is None:
+            parser.error("--watch requires --output.")
+        if formats != ["markdown"] or args.stream or args.split:
+            parser.error("--watch only writes single markdown documents.")
+        if args.validate or args.backend != "python":
+            parser.error("--validate and --backend cannot be used with --watch.")
+        yamldoc.watch.Watcher(args.file, args.output, args.char, args.schema, debug=args.debug).run()
+        return 0
+
+    if args.split and (formats != ["markdown"] or args.stream):
+        parser.error("--split only splits single markdown documents.")
+
+    if args.output is None:
+        if args.split:
+            parser.error("--split requires --output.")
+        if len(args.file) > 1:
+            parser.error("documenting more than one file requires --output.")
+        if os.path.isdir(args.file[0]):
+            parser.error("documenting a directory requires --output.")
+        if len(formats) > 1:
+            parser.error("writing more than one format requires --output.")
+
+    # Compile the schema once, before any file is documented, so that a
+    # missing or broken schema is reported rather than failing every file.
+    schema = args.schema
+    if schema is not None:
+        try:
+            if cache is not None:
+                schema = cache.compile_schema(schema, args.debug)
+            else:
+                schema = yamldoc.schema.compile_schema(schema, args.debug)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read the schema {args.schema}: {e}")
+
+    if args.output is None:
+        status = 0
+        try:
+            if args.stream:
+                yamldoc.parser.document_stream(args.file[0], sys.stdout, args.char, args.debug, schema, format=formats[0],
+                                               validate=args.validate, backend=args.backend)
+            else:
+                yamldoc.parser.document(args.file[0], sys.stdout, args.char, args.debug, schema, cache=cache, format=formats[0],
+                                        jobs=args.jobs, validate=args.validate, backend=args.backend)
+        except yamldoc.validate.ValidationError as e:
+            sys.stdout.flush()
+            print(f'yamldoc: {e}', file=sys.stderr)
+            status = 1
+        if cache is not None:
+            cache.evict()
+        return status
+
+    failed = 0
+    for yaml_path, out_path, error in yamldoc.batch.run(args.file, args.output, args.char, schema, args.jobs, cache, formats, args.stream,
+                                                          args.validate, args.backend, args.split):
+        if error is not None:
+            failed += 1
+            print(f'yamldoc: {yaml_path}: {error}', file=sys.stderr)
+        elif args.debug:
+            yamldoc.trace.debug(f'{yaml_path} -> {out_path}')
+
+    return 1 if failed else 0
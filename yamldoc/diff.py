@@ -0,0 +1,315 @@
+'''
+Structural comparison of two versions of a YAML file.
+
+Every section and every list of entries is hashed once, from the
+hashes of its children, so identical sub-trees are recognized by comparing two
+digests and are never walked. Comparing two large files costs time in
+proportion to what changed, after a single pass to hash them.
+
+Usage:
+    yamldoc-diff old/config.yaml config.yaml
+    yamldoc-diff old/config.yaml config.yaml -s config.schema -f json
+'''
+import argparse
+import hashlib
+import io
+import json
+import sys
+
+import yamldoc.parser
+import yamldoc.render
+import yamldoc.schema
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"
+
+# The attributes compared between two versions of an entry, with the
+# names they are reported under.
+FIELDS = (("value", "value"), ("type", "type"), ("meta", "comment"), ("is_commented", "commented"))
+SECTION_FIELDS = (("type", "type"), ("meta", "comment"), ("is_commented", "commented"))
+
+
+class Change:
+    """
+    One difference between two versions of a YAML file.
+    """
+
+    __slots__ = ("kind", "path", "old", "new", "fields")
+
+    def __init__(self, kind, path, old=None, new=None, fields=()):
+        """
+        Initialize the object.
+
+        Arguments:
+            kind: ADDED, REMOVED or MODIFIED.
+            path: Dotted path of the entry.
+            old: The Entry or MetaEntry before, None when added.
+            new: The Entry or MetaEntry after, None when removed.
+            fields: Names of the attributes that changed, see FIELDS.
+        """
+        self.kind = kind
+        self.path = path
+        self.old = old
+        self.new = new
+        self.fields = fields
+
+    def __repr__(self):
+        """
+        Returns a print representation.
+        """
+        if self.fields:
+            return f'YAML change [{self.kind} {self.path}: {", ".join(self.fields)}]'
+        return f'YAML change [{self.kind} {self.path}]'
+
+
+class Hasher:
+    """
+    Digests of entries and lists of entries, computed once each. Lists
+    shared through aliases are hashed only the first time.
+    """
+
+    def __init__(self):
+        """
+        Initialize the object.
+        """
+        # Keyed by id, holding on to the objects so ids are not reused.
+        self._values = {}
+        self._lists = {}
+
+    def __repr__(self):
+        """
+        Returns a print representation.
+        """
+        return f'yamldoc hasher of {len(self._lists)} lists of entries'
+
+    def value(self, value):
+        '''
+        The digest of an Entry, or of a MetaEntry and all its children.
+        Entries stand for themselves with the tuple of their attributes,
+        which is cheaper than hashing each of them.
+        '''
+        if not value.isBase:
+            return (value.key,) + _fields(value, FIELDS)
+        known = self._values.get(id(value))
+        if known is not None:
+            return known[1]
+        digest = hashlib.blake2b(repr((value.name,) + _fields(value, SECTION_FIELDS)).encode(), digest_size=16)
+        digest.update(self.entries(value.entries))
+        digest = digest.digest()
+        self._values[id(value)] = (value, digest)
+        return digest
+
+    def entries(self, entries):
+        '''
+        The digest of a list of entries, in order.
+        '''
+        known = self._lists.get(id(entries))
+        if known is not None:
+            return known[1]
+        digest = hashlib.blake2b(repr([self.value(value) for value in entries]).encode(), digest_size=16).digest()
+        self._lists[id(entries)] = (entries, digest)
+        return digest
+
+
+def diff(old, new, hasher=None):
+    '''
+    Compare two parsed YAML trees.
+
+    Entries are matched by their key within each level, so reordering
+    keys is not a change. Keys repeated in a collection of objects are
+    matched in order.
+
+    Arguments:
+        old: List of yaml representations from parse_yaml, before.
+        new: List of yaml representations from parse_yaml, after.
+        hasher: (Optional) A Hasher to reuse digests of earlier comparisons.
+
+    Returns:
+        List of Change, in the order of the new tree, with removed
+        entries after the entries of their level.
+    '''
+    if hasher is None:
+        hasher = Hasher()
+    changes = []
+    _diff_entries(hasher, "", old, new, changes)
+    return changes
+
+
+def _diff_entries(hasher, prefix, old, new, changes):
+    if old is new or hasher.entries(old) == hasher.entries(new):
+        return
+
+    before = {}
+    for value in old:
+        before.setdefault(_name(value), []).append(value)
+
+    for value in new:
+        name = _name(value)
+        path = prefix + name
+        candidates = before.get(name)
+        if not candidates:
+            changes.append(Change(ADDED, path, new=value))
+            continue
+        previous = candidates.pop(0)
+        if hasher.value(previous) == hasher.value(value):
+            continue
+        if previous.isBase != value.isBase:
+            changes.append(Change(REMOVED, path, old=previous))
+            changes.append(Change(ADDED, path, new=value))
+            continue
+        fields = SECTION_FIELDS if value.isBase else FIELDS
+        changed = tuple(label for attribute, label in fields
+                        if getattr(previous, attribute) != getattr(value, attribute))
+        if changed:
+            changes.append(Change(MODIFIED, path, previous, value, changed))
+        if value.isBase:
+            _diff_entries(hasher, path + ".", previous.entries, value.entries, changes)
+
+    for name, candidates in before.items():
+        for value in candidates:
+            changes.append(Change(REMOVED, prefix + name, old=value))
+
+
+def compare(old_path, new_path, char="#'", debug=False, schema_path=None):
+    '''
+    Parse two versions of a YAML file and compare them.
+
+    Arguments:
+        old_path: Path to the YAML file before, or its contents as bytes.
+        new_path: Path to the YAML file after, or its contents as bytes.
+        char: Special character to identify comments to be included in YAMLDOC documentation.
+        debug: Print debug information
+        schema_path: (Optional) Path to a schema, or a compiled schema,
+            applied to both versions so that type changes are reported.
+
+    Returns:
+        List of Change.
+    '''
+    old = yamldoc.parser.parse_yaml(old_path, char, debug)
+    new = yamldoc.parser.parse_yaml(new_path, char, debug)
+    if schema_path is not None:
+        schema = schema_path
+        if not isinstance(schema, yamldoc.schema.CompiledSchema):
+            schema = yamldoc.schema.compile_schema(schema_path, debug)
+        schema.apply(old, debug)
+        schema.apply(new, debug)
+    return diff(old, new)
+
+
+def render(changes, out=None, format="markdown", title="Changes"):
+    '''
+    Write a report of changes as a markdown table or as JSON.
+
+    Arguments:
+        changes: List of Change from diff or compare.
+        out: A text stream or a path to write to. When not given,
+            the report is returned instead.
+        format: "markdown" or "json".
+        title: Title of the markdown report.
+
+    Returns:
+        The report when out is not given, otherwise nothing.
+    '''
+    if format == "markdown":
+        report = _markdown(changes, title)
+    elif format == "json":
+        report = _json(changes)
+    else:
+        raise ValueError(f"Unknown report format: {format}")
+
+    if out is None:
+        return report
+    if isinstance(out, str):
+        with open(out, "w") as stream:
+            stream.write(report)
+    else:
+        out.write(report)
+
+
+def _markdown(changes, title):
+    out = io.StringIO()
+    out.write(f"# {title}\n\n")
+    if not changes:
+        out.write("No changes.\n")
+        return out.getvalue()
+    out.write("| Change | Parameter | Before | After |\n")
+    out.write("| :-: | :-- | :-- | :-- |\n")
+    for change in changes:
+        if change.kind == MODIFIED:
+            fields = [attribute for attribute, label in FIELDS + SECTION_FIELDS if label in change.fields]
+            before = _cell(change.old, dict.fromkeys(fields))
+            after = _cell(change.new, dict.fromkeys(fields))
+        else:
+            before = _cell(change.old)
+            after = _cell(change.new)
+        path, before, after = (yamldoc.render._markdown_escape(cell) for cell in (change.path, before, after))
+        out.write(f"| {change.kind} | `{path}` | {before} | {after} |\n")
+    return out.getvalue()
+
+
+def _cell(value, attributes=None):
+    if value is None:
+        return ""
+    if attributes is None:
+        if value.isBase:
+            return f"{len(value.entries)} entries"
+        return f"`{yamldoc.render._markdown_lines(value.value)}`" if value.value else ""
+    labels = dict(FIELDS + SECTION_FIELDS)
+    lines = []
+    for attribute in attributes:
+        text = getattr(value, attribute)
+        if isinstance(text, list):
+            text = ", ".join(text)
+        lines.append(f"{labels[attribute]}: {text}")
+    return yamldoc.render._markdown_lines("\n".join(lines))
+
+
+def _json(changes):
+    renderer = yamldoc.render.JSONRenderer(True)
+    report = []
+    for change in changes:
+        item = {"change": change.kind, "path": change.path}
+        prefix = change.path[:len(change.path) - len(_name(change.new or change.old))]
+        if change.old is not None:
+            item["before"] = renderer.entry(change.old, prefix)
+        if change.new is not None:
+            item["after"] = renderer.entry(change.new, prefix)
+        if change.fields:
+            item["fields"] = list(change.fields)
+        report.append(item)
+    return json.dumps({"changes": report}, ensure_ascii=False) + "\n"
+
+
+def _name(value):
+    return value.name if value.isBase else value.key
+
+
+def _fields(value, fields):
+    values = []
+    for attribute, _ in fields:
+        field = getattr(value, attribute)
+        values.append(tuple(field) if isinstance(field, list) else field)
+    return tuple(values)
+
+
+def main():
+    ''' Compare two versions of a YAML file from the command line.'''
+    parser = argparse.ArgumentParser(prog='yamldoc-diff', description='Report the parameters that changed between two versions of a YAML file.')
+    parser.add_argument('old', help = 'YAML file before.')
+    parser.add_argument('new', help = 'YAML file after.')
+    parser.add_argument('-c', '--char', default = "#'", help = 'Metadata character prefix.')
+    parser.add_argument('-d', '--debug', action = 'store_true', help = 'Show debug information.')
+    parser.add_argument('-s', '--schema', default = None, help = "(Optional) Schema file applied to both versions, to report type changes.")
+    parser.add_argument('-f', '--format', default = 'markdown', choices = ['markdown', 'json'], help = "Format of the report.")
+    parser.add_argument('--exit-code', action = 'store_true', help = "Exit with status 1 when there are changes.")
+    args = parser.parse_args()
+
+    changes = compare(args.old, args.new, args.char, args.debug, args.schema)
+    render(changes, sys.stdout, args.format)
+    if args.exit_code and changes:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
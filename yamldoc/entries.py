@@ -1,5 +1,116 @@
+import functools
 import re
-import textwrap
+import sys
+
+import yamldoc.render
+
+NON_LETTERS = re.compile('[^A-Za-z]+')
+
+# Directives in the comments of an entry: "$type", "%yes" or "%no", and
+# "@example", which runs until the next "@". They start a word, so "a@b"
+# or "5$" in the text are left alone.
+DIRECTIVE = re.compile(r'(?<!\S)(?:\$(?P<type>\S+)|%(?P<mandatory>\S+)|@(?P<example>.*?)(?=\s@|$))')
+
+# Values accepted by the "$" and "%" directives.
+DECLARED_TYPES = frozenset(["byte", "boolean", "string", "integer", "long", "double", "char", "float", "short"])
+MANDATORY = frozenset(["yes", "no"])
+
+# Slots of an Entry only set by a schema, see yamldoc.schema.EXTRAS.
+EXTRAS = ("enum", "plain_text")
+
+
+@functools.lru_cache(maxsize=4096)
+def directives(meta):
+    """
+    Split the comments of an entry into free text and directives. The
+    result is cached, as generated files repeat the same comments.
+
+    Arguments:
+        meta: Comments derived from YAML file.
+
+    Returns:
+        Tuple of (description, declared type, mandatory flag, examples).
+        The type and flag are None when not given; examples is a tuple.
+    """
+    declared_type = None
+    mandatory = None
+    examples = []
+    text = []
+    position = 0
+    for match in DIRECTIVE.finditer(meta):
+        text.append(meta[position:match.start()])
+        position = match.end()
+        if match.group("type") is not None:
+            if declared_type is None:
+                declared_type = sys.intern(match.group("type"))
+        elif match.group("mandatory") is not None:
+            if mandatory is None:
+                mandatory = sys.intern(match.group("mandatory"))
+        else:
+            examples.append(match.group("example").strip())
+    text.append(meta[position:])
+
+    if position == 0:
+        return meta, None, None, ()
+    description = sys.intern(" ".join(piece.strip() for piece in text if piece.strip()))
+    return description, declared_type, mandatory, tuple(examples)
+
+
+def sort_key(entry):
+    """
+    Key used to order the rows of a table: the letters of the name of
+    the entry, ignoring case.
+
+    Arguments:
+        entry: An Entry or MetaEntry.
+    """
+    name = entry.name if entry.isBase else entry.key
+    return NON_LETTERS.sub('', name).lower()
+
+
+def meta_entries(yaml):
+    """
+    Walk a parsed YAML tree and yield every MetaEntry in document order,
+    parents before their children.
+
+    Arguments:
+        yaml: List of yaml representations from parse_yaml.
+    """
+    stack = [iter(yaml)]
+    while stack:
+        for value in stack[-1]:
+            if value.isBase:
+                yield value
+                stack.append(iter(value.entries))
+                break
+        else:
+            stack.pop()
+
+
+def index_paths(yaml):
+    """
+    Index a parsed YAML tree by the full path of each key, with the names
+    of the enclosing keys joined by dots (e.g. "two.entry").
+
+    Arguments:
+        yaml: List of yaml representations from parse_yaml.
+
+    Returns:
+        Dictionary from path to the list of entries with that path.
+        Keys repeated inside a collection of objects share a path.
+    """
+    index = {}
+    stack = [("", yaml)]
+    while stack:
+        prefix, entries = stack.pop()
+        for value in entries:
+            if value.isBase:
+                path = prefix + value.name
+                stack.append((path + ".", value.entries))
+            else:
+                path = prefix + value.key
+            index.setdefault(path, []).append(value)
+    return index
 
 
 class MetaEntry:
@@ -8,19 +119,31 @@ class MetaEntry:
     hierarchical keys and values. 
     """
 
-    def __init__(self, name, meta):
+    __slots__ = ("name", "meta", "description", "entries", "has_schema", "type", "is_commented", "origin", "line")
+
+    isBase = True
+
+    def __init__(self, name, meta, is_commented=False, line=None):
         """ 
         Initialize the object.
 
         Arguments:
             name: Name of the value.
             meta: Comments derived from YAML file.
+            is_commented: Whether the key was commented out in the YAML file.
+            line: (Optional) Number of the line of the key in the YAML file.
         """
         self.name = name
         self.meta = meta
-        self.isBase = True
+        self.description = directives(meta)[0]
         self.entries = []
         self.has_schema = False
+        self.type = None
+        self.is_commented = is_commented
+        # Name of the anchor the entries were taken from, if any. Its
+        # entries are shared with the anchor rather than copied.
+        self.origin = None
+        self.line = line
 
     def __repr__(self):
         """
@@ -31,58 +154,83 @@ class MetaEntry:
         else:
             return f'YAML Meta Object with {len(self.entries)} entries [{self.name}]'
 
-    def to_markdown(self, schema=False):
-        """ 
-        Prints the contents of the object in markdown.
+    def __reduce__(self):
+        return (_meta_entry, (self.name, self.meta, self.is_commented, self.entries, self.type, self.has_schema,
+                              self.origin, self.line))
 
-        Argumenets:
-            schema: Print with four columns instead of three.
+    @property
+    def link(self):
         """
-        if schema:
-
-            if "%" in self.meta:
-                self.meta = self.meta.replace(self.meta[self.meta.find("%"):].split()[0], "")
-            if "$" in self.meta:
-                self.meta = self.meta.replace(self.meta[self.meta.find("$"):].split()[0], "")
-            if "@" in self.meta:
-                self.meta = self.meta.replace(self.meta[self.meta.find("@"):].split()[0], "")
-            output = f'## {self.name}\n\n{self.meta}\n\n'
-            output += "### Member variables:\n\n"
-
-            output += "| Parameter | Mandatory | Type | Default | Example | Information |\n"
-            output += "| :-: | :-: | :-: | :-: | :-: | :-- |\n"
+        Markdown link to this object's section.
+        """
+        return f'[{self.name}](#{self.name})'
 
-            entries = []
+    def link_entry(self, target=None):
+        """
+        Returns an Entry linking to this object's section, used as its
+        row in the table of the parent.
 
-            for entry in self.entries:
-                entries.append(entry.to_markdown(schema) + "\n")
+        Arguments:
+            target: (Optional) Where the link points to, by default the
+                anchor named after the object.
+        """
+        link = self.link if target is None else f'[{self.name}]({target})'
+        entry = Entry(link, "", self.meta, self.is_commented)
+        entry.type = self.type
+        return entry
 
-            for entry in sorted(entries, key=lambda x: re.sub('[^A-Za-z]+', '', x).lower()):
-                output += entry
-            output += "\n\n"
+    def information(self, schema=False):
+        """
+        The comments describing the object, without the "%", "$" and "@"
+        directives when rendering with a schema.
 
-            return output
+        Arguments:
+            schema: Remove the directives.
+        """
+        return self.description if schema else self.meta
 
-        else:
-            output = f'## `{self.name}`\n\n{self.meta}\n\n'
-            output += "### Member variables:\n\n"
+    def cells(self, schema=False):
+        """
+        The text of each column of the row of this object in the table
+        of its parent, see Entry.cells.
+        """
+        entry = Entry(self.name, "", self.meta, self.is_commented)
+        entry.type = self.type
+        return entry.cells(schema)
 
-            output += "| Key | Value | Information |\n"
-            output += "| :-: | :-: | :-- |\n"
+    def to_markdown(self, schema=False):
+        """ 
+        Prints the contents of the object in markdown.
 
-            for entry in self.entries:
-                output += entry.to_markdown()
+        Argumenets:
+            schema: Print with four columns instead of three.
+        """
+        return "".join(self.iter_markdown(schema))
 
-            output += "\n\n"
+    def iter_markdown(self, schema=False):
+        """
+        Yields the markdown for the object piece by piece, so that it
+        can be written to a stream without building the whole section.
 
-            return output
+        Arguments:
+            schema: Print with four columns instead of three.
+        """
+        markdown = yamldoc.render.MarkdownRenderer(schema)
+        return markdown.iter_section(self, yamldoc.render.rows(self.entries, schema))
 
 
 class Entry:
     """
     Container for a single YAML key value pairing and associated metadata."""
 
-    def __init__(self, key, value, meta, is_commented):
+    # Extras from the schema (see yamldoc.schema.EXTRAS) are only set
+    # on entries that have them.
+    __slots__ = ("key", "value", "meta", "description", "declared_type", "mandatory", "examples", "type",
+                 "is_commented", "has_schema", "origin", "line", "enum", "plain_text")
+
+    isBase = False
+
+    def __init__(self, key, value, meta, is_commented=False, line=None):
         """
         Initialize the object
 
@@ -90,76 +238,102 @@ class Entry:
            key: Name of the value
            value: Given value.
            meta: Any associated comments or meta data.
+           is_commented: Whether the key was commented out in the YAML file.
+           line: (Optional) Number of the line of the key in the YAML file.
         """
         self.key = key
         self.value = value
         self.meta = meta
-        self.isBase = False
+        self.description, self.declared_type, self.mandatory, self.examples = directives(meta)
         self.type = None
-        self.mandatory = None
-        self.example = "Mandatory is not specified"
         self.is_commented = is_commented
+        self.has_schema = False
+        # Name of the anchor the value was taken from, if any.
+        self.origin = None
+        self.line = line
 
     def __repr__(self):
         """
         Gives a print representation for the class.
         """
         if self.type is not None:
-            return f'YAML Entry [{self.key}: {self.value}]\n\t Meta: {self.meta}\n\t Type: {self.type}\n\t Mandatory: {self.mandatory}\n\t Example: {self.example}'
+            return f'YAML Entry [{self.key}: {self.value}]\n\t Meta: {self.meta}\n\t Type: {self.type}\n\t Mandatory: {self.mandatory}\n\t Examples: {self.examples}'
         else:
             return f'YAML Entry [{self.key}: {self.value}]\n\t Meta: {self.meta}'
 
-    def to_markdown(self, schema=False):
+    def __reduce__(self):
+        # Only what cannot be derived from the comments again, which
+        # keeps the pickles of large trees small.
+        extras = {key: getattr(self, key) for key in EXTRAS if hasattr(self, key)}
+        return (_entry, (self.key, self.value, self.meta, self.is_commented, self.type, self.has_schema, self.origin,
+                         self.line, extras or None))
+
+    def cells(self, schema=False):
         """
-        Prints the entry as markdown.
+        The text of each column of the row of this entry, before any
+        any formatting. Lines within a cell are separated by newlines.
 
         Arguments:
-            schema: Print with four columns instead of three.
+            schema: Return the six schema columns instead of three.
+
+        Returns:
+            Tuple of (key, value, information), or (key, mandatory, type,
+            default, example, information) with schema.
         """
-        if schema:
-            m = self.meta
-            example = self.example
+        if not schema:
+            return self.key, self.value, self.meta
+
+        # A type declared in the comments wins over the schema.
+        if self.declared_type is not None:
+            vartype = self.declared_type if self.declared_type in DECLARED_TYPES else "invalid variable type"
+        elif isinstance(self.type, list):
+            vartype = ", ".join(self.type)
+        elif self.type is not None:
             vartype = self.type
+        else:
+            vartype = "Unknown"
+
+        if self.mandatory is None:
+            mandatory = ""
+        elif self.mandatory in MANDATORY:
             mandatory = self.mandatory
-            meta_info = m.split("$", 1)[0]
-            m = m.replace(meta_info, "")
-            if "$" in m:
-                accepted_types = ["byte", "boolean", "string", "integer", "long", "double", "char", "float", "short"]
-                if m[m.find("$") + 1:].split()[0] in accepted_types:
-                    vartype = m[m.find("$") + 1:].split()[0]
-                    m = m.replace(m[m.find("$"):].split()[0], "")
-                else:
-                    vartype = "invalid variable type"
-                    m = m.replace(m[m.find("$"):].split()[0], "")
-            else:
-                vartype = "Unknown"
-            if "%" in m:
-                accepted_types = ["yes", "no"]
-                if m[m.find("%") + 1:].split()[0] in accepted_types:
-                    mandatory = m[m.find("%") + 1:].split()[0]
-                else:
-                    mandatory = "invalid input"
-                m = m.replace(m[m.find("%"):].split()[0], "")
-            else:
-                mandatory = ""
+        else:
+            mandatory = "invalid input"
 
-            if "@" in m:
-                example = m.split("@", 1)[1]
-                example = example.replace("@", "<br>")
-                example = example.replace("<br>", "", 0)
+        if self.examples:
+            example = "\n".join(self.examples)
+        else:
+            example = self.key + ": " + self.value
 
-                m = m.replace(m.split("@", 1)[1], "")
-                m = m.replace("@", "")
+        default = "" if self.is_commented else self.value
 
-            else:
-                example = self.key + ": " + self.value
+        return self.key, mandatory, vartype, default, example, self.description
 
-            if self.is_commented is True:
-                default = ""
-            elif self.is_commented is False:
-                default = self.value
+    def to_markdown(self, schema=False):
+        """
+        Prints the entry as markdown.
 
-            return f'| {self.key} | {mandatory} | {vartype} | {default} | {example.replace(" ", "&nbsp;")} | {meta_info.replace(" ", "&nbsp;")} |'
-        else:
-            m = '<br />'.join(textwrap.wrap(self.meta, width=50))
-            return f'| `{self.key}` | `{self.value.replace(" ", "&nbsp;")}` | {m.replace(" ", "&nbsp;")} |'
+        Arguments:
+            schema: Print with four columns instead of three.
+        """
+        return yamldoc.render.MarkdownRenderer(schema).row(self)
+
+
+def _meta_entry(name, meta, is_commented, entries, type, has_schema, origin, line):
+    meta_entry = MetaEntry(name, meta, is_commented, line)
+    meta_entry.entries = entries
+    meta_entry.type = type
+    meta_entry.has_schema = has_schema
+    meta_entry.origin = origin
+    return meta_entry
+
+
+def _entry(key, value, meta, is_commented, type, has_schema, origin, line, extras):
+    entry = Entry(key, value, meta, is_commented, line)
+    entry.type = type
+    entry.has_schema = has_schema
+    entry.origin = origin
+    if extras:
+        for name, extra in extras.items():
+            setattr(entry, name, extra)
+    return entry
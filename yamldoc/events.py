@@ -0,0 +1,356 @@
+'''
+An optional backend of yamldoc.parser.parse_yaml built on the event API
+of PyYAML, using libyaml when PyYAML was built with it.
+
+PyYAML finds the keys, values, nesting and line of everything, so
+quoting, flow collections and scalars spanning several lines are read
+as YAML reads them. A side scan of the lines finds what YAML skips as
+comments: the yamldoc comments, attached to the key below them by line
+number, and the keys that were commented out, which are uncommented
+before the text is handed to PyYAML and marked as commented in the
+tree.
+
+Values keep the text they have in the file, as with the line parser,
+so both build the same MetaEntry and Entry trees for plain configs.
+Files PyYAML rejects, e.g. because a commented out key does not fit
+where it stands, are left to the line parser.
+'''
+import sys
+
+import yamldoc.entries
+import yamldoc.parser
+import yamldoc.trace
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+if yaml is not None:
+    LOADER = yaml.CSafeLoader if yaml.__with_libyaml__ else yaml.SafeLoader
+
+
+def available():
+    '''
+    Whether PyYAML is installed.
+    '''
+    return yaml is not None
+
+
+def documents(source, char="#'", debug=False, max_expansion=None):
+    '''
+    Parse every document of a YAML input with PyYAML.
+
+    Arguments:
+        source: A yamldoc.scanner.Source.
+        char: A character string used to identify yamldoc blocks.
+        debug: Print debug information
+        max_expansion: (Optional) Largest number of entries aliases and
+            merge keys may add to a document, see yamldoc.parser.parse_yaml.
+
+    Returns:
+        List of the lists of YAML blocks of every document, or None when
+        PyYAML is not installed or rejects the input.
+    '''
+    if yaml is None:
+        if debug: yamldoc.trace.debug("PyYAML is not installed, using the line parser.")
+        return None
+
+    if max_expansion is None:
+        max_expansion = yamldoc.parser.MAX_EXPANSION
+    original = str(source.buffer, source.encoding).split("\n")
+    lines, commented, markers = _side_scan(original, char)
+    builder = _Builder(lines, original, commented, markers, debug, max_expansion)
+    tracer = yamldoc.trace.current()
+    md = []
+    loader = LOADER("\n".join(lines))
+    try:
+        # Reading the events straight from the loader halves the cost of
+        # going through yaml.parse.
+        events = iter(loader.get_event, None)
+        for event in events:
+            if not isinstance(event, yaml.DocumentStartEvent):
+                continue
+            # yamldoc comments above a "---" do not describe the next document.
+            if event.explicit:
+                builder.skip_comments(event.start_mark.line)
+            document = builder.document(events)
+            if document is None:
+                continue
+            md.append(document)
+            if tracer is not None:
+                tracer.count("documents")
+                yamldoc.parser.count_entries(document, tracer)
+    except yaml.YAMLError as e:
+        if debug: yamldoc.trace.debug(f"PyYAML cannot read the input, using the line parser: {e}")
+        return None
+    finally:
+        loader.dispose()
+    return md
+
+
+def _side_scan(original, char):
+    '''
+    Find the yamldoc comments and the keys that were commented out.
+
+    Returns:
+        Tuple of (the lines with commented out keys uncommented, the
+        numbers of those lines, a list of (number, text) of the yamldoc
+        comments). Line numbers count from 0.
+    '''
+    lines = original
+    commented = set()
+    markers = []
+    # The first line of a run of commented out lines, so that they keep
+    # their indentation relative to each other.
+    run = None
+    for number, line in enumerate(original):
+        text = line.strip()
+        if not text:
+            continue
+        if text.startswith(char):
+            markers.append((number, text[len(char):].strip()))
+            continue
+        if text[0] != "#":
+            run = None
+            continue
+        after = line.lstrip()[1:]
+        if not yamldoc.parser.COMMENTED_ENTRY.match(after.strip()):
+            continue
+        column = len(line) - len(line.lstrip())
+        spaces = len(after) - len(after.lstrip(" "))
+        if run is None:
+            run = spaces
+        if lines is original:
+            lines = list(original)
+        lines[number] = " " * max(0, column + spaces - run) + after[spaces:]
+        commented.add(number)
+    return lines, commented, markers
+
+
+class _Builder:
+    """
+    Builds the trees of the documents of a stream of PyYAML events.
+    """
+
+    def __init__(self, lines, original, commented, markers, debug, max_expansion):
+        self.lines = lines
+        self.original = original
+        self.commented = commented
+        self.markers = markers
+        self.debug = debug
+        self.max_expansion = max_expansion
+        self.events = None
+        # The next yamldoc comment, and those inside block scalars.
+        self.position = 0
+        self.dropped = set()
+
+    def document(self, events):
+        '''
+        Build the tree of one document, from the event after its start.
+        Returns None for an empty document.
+        '''
+        self.events = events
+        # Anchors, aliases and merge keys work as with the line parser.
+        self.anchors = yamldoc.parser._Anchors(lambda: self.open, self.max_expansion, self.debug)
+        self.open = []
+
+        md = []
+        event = next(events)
+        if isinstance(event, yaml.MappingStartEvent) and not event.flow_style:
+            self.open = [md]
+            self.mapping(md)
+        else:
+            self.skip(event)
+            if isinstance(event, yaml.ScalarEvent) and not event.value and event.style is None:
+                return None
+        self.anchors.close()
+        return md
+
+    def skip_comments(self, line):
+        '''
+        Drop the yamldoc comments above a line.
+        '''
+        while self.position < len(self.markers) and self.markers[self.position][0] < line:
+            self.position += 1
+
+    def meta(self, line):
+        '''
+        The yamldoc comments above the key on a line, since the last key.
+        '''
+        parts = []
+        markers = self.markers
+        while self.position < len(markers) and markers[self.position][0] < line:
+            number, text = markers[self.position]
+            if number not in self.dropped:
+                parts.append(text)
+            self.position += 1
+        # Generated configs repeat the same comments over and over.
+        return sys.intern(" ".join(parts))
+
+    def mapping(self, entries):
+        '''
+        Add the keys of a mapping to a list of entries, up to its end.
+        '''
+        events = self.events
+        while True:
+            event = next(events)
+            if isinstance(event, yaml.MappingEndEvent):
+                return
+            if not isinstance(event, yaml.ScalarEvent):
+                # Keys that are themselves collections are not documented.
+                self.skip(event)
+                self.skip(next(events))
+                continue
+
+            key = sys.intern(event.value)
+            line = event.start_mark.line
+            is_commented = line in self.commented
+            value = next(events)
+            if key == "<<" and isinstance(value, (yaml.AliasEvent, yaml.SequenceStartEvent)):
+                self.meta(line)
+                names = self.aliases(value)
+                if not is_commented:
+                    self.anchors.merge(entries, names)
+                continue
+            entries.append(self.value(key, value, self.meta(line), is_commented, line + 1))
+
+    def value(self, key, event, meta, is_commented, number):
+        '''
+        The Entry or MetaEntry of a key, from the first event of its value.
+        '''
+        if isinstance(event, yaml.AliasEvent):
+            name = event.anchor
+            if name in self.anchors.anchors:
+                if self.debug: yamldoc.trace.debug("Found an alias : " + name)
+                return self.anchors.inherit(key, self.anchors.anchors[name], meta, is_commented, name, number)
+            return yamldoc.entries.Entry(key, "*" + name, meta, is_commented, number)
+
+        # Keys that were commented out do not define anchors.
+        anchor = None if is_commented else event.anchor
+        if isinstance(event, yaml.MappingStartEvent) and not event.flow_style:
+            entry = yamldoc.entries.MetaEntry(key, meta, is_commented, number)
+            self.anchors.register(anchor, entry)
+            self.open.append(entry.entries)
+            self.mapping(entry.entries)
+            self.open.pop()
+            if self.debug: yamldoc.trace.debug("Found a meta entry.")
+            return entry
+
+        start = event.start_mark
+        block = False
+        if isinstance(event, yaml.ScalarEvent):
+            end = event.end_mark
+            block = event.style in ("|", ">")
+        elif isinstance(event, yaml.SequenceStartEvent) and not event.flow_style:
+            first = next(self.events)
+            if self.objects(first):
+                entry = yamldoc.entries.MetaEntry(key, meta, is_commented, number)
+                self.anchors.register(anchor, entry)
+                self.open.append(entry.entries)
+                self.collection(entry.entries, first)
+                self.open.pop()
+                if self.debug: yamldoc.trace.debug("FOUND A COLLECTION OF OBJECTS")
+                return entry
+            end = self.skip(first, 1)
+        else:
+            end = self.skip(event)
+
+        text = self.text(start, end, block, event.anchor is not None or event.tag is not None)
+        entry = yamldoc.entries.Entry(key, text, meta, is_commented, number)
+        self.anchors.register(anchor, entry)
+        if self.debug: yamldoc.trace.debug("Found an entry.")
+        return entry
+
+    def objects(self, event):
+        '''
+        Whether a list starting with an event is a collection of objects
+        written as "- {" on a line of its own, which the line parser
+        documents as a section.
+        '''
+        if not isinstance(event, yaml.MappingStartEvent) or not event.flow_style:
+            return False
+        return self.lines[event.start_mark.line].strip().lstrip("- ").rstrip() == "{"
+
+    def collection(self, entries, event):
+        '''
+        Add the keys of every object of a collection to a list of entries,
+        from the event of its first object to the end of the list.
+        '''
+        while not isinstance(event, yaml.SequenceEndEvent):
+            if isinstance(event, yaml.MappingStartEvent):
+                self.mapping(entries)
+            else:
+                self.skip(event)
+            event = next(self.events)
+
+    def text(self, start, end, block, properties):
+        '''
+        The text of a value in the file, one stripped line after another.
+        Comments are left out, except in block scalars, which are taken
+        from the original lines along with the yamldoc comments in them.
+        '''
+        lines = self.original if block else self.lines
+        if start.line == end.line:
+            parts = [lines[start.line][start.column:end.column]]
+        else:
+            parts = [lines[start.line][start.column:]]
+            parts.extend(lines[start.line + 1:end.line])
+            if end.line < len(lines):
+                parts.append(lines[end.line][:end.column])
+        if block:
+            last = end.line if end.column else end.line - 1
+            # The yamldoc comments inside the scalar are part of it. Only
+            # the markers up to its last line are looked at.
+            markers = self.markers
+            i = self.position
+            while i < len(markers) and markers[i][0] <= last:
+                if markers[i][0] > start.line:
+                    self.dropped.add(markers[i][0])
+                i += 1
+
+        texts = []
+        for part in parts:
+            part = part.strip()
+            if part and (block or part[0] != "#"):
+                texts.append(part)
+        text = "\n".join(texts)
+
+        # Drop the anchor and tag in front of the value.
+        while properties and text[:1] in ("&", "!"):
+            parts = text.split(None, 1)
+            text = parts[1] if len(parts) > 1 else ""
+        return text
+
+    def skip(self, event, depth=0):
+        '''
+        Skip a value from its first event, or the rest of a collection
+        at the given depth.
+
+        Returns:
+            The end mark of the value.
+        '''
+        while True:
+            if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+                depth += 1
+            elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                depth -= 1
+            if depth <= 0:
+                return event.end_mark
+            event = next(self.events)
+
+    def aliases(self, event):
+        '''
+        The anchor names of a merge key, from the first event of its value.
+        '''
+        if isinstance(event, yaml.AliasEvent):
+            return [event.anchor]
+        names = []
+        for event in self.events:
+            if isinstance(event, yaml.SequenceEndEvent):
+                return names
+            if isinstance(event, yaml.AliasEvent):
+                names.append(event.anchor)
+            else:
+                self.skip(event)
+        return names
@@ -1,399 +1,591 @@
+import contextlib
+import io
+import os
 import re
-from itertools import cycle
+import sys
 
 import yamldoc.entries
-from datetime import date
-import pdb
+import yamldoc.render
+import yamldoc.scanner
+import yamldoc.trace
 
+# yamldoc.schema, yamldoc.validate and yamldoc.events are loaded by the
+# package on first use, and concurrent.futures only to parse in parallel,
+# so that documenting a single file from the command line starts quickly.
 
-def parse_yaml(file_path, char="#'", debug=False):
+
+# A line that was commented out with a plain "#" but still looks like
+# a key value pairing or a list item. Anything else is a free comment
+# and is not documented.
+COMMENTED_ENTRY = re.compile(r'^(-(\s|$)|[^\s#:][^\s:]*:(\s|$))')
+
+# Block scalar indicators such as ">-", "|" or "|+2".
+BLOCK_SCALAR = re.compile(r'^[|>][-+0-9]*$')
+
+# Largest number of entries aliases and merge keys may add to one
+# document once expanded. Aliases of aliases grow exponentially, so a
+# few lines of YAML could otherwise stand for billions of entries.
+MAX_EXPANSION = 1_000_000
+
+# Inputs smaller than this are always parsed in one process, as starting
+# workers and sending the trees back would cost more than it saves.
+PARALLEL_MIN_SIZE = 8 << 20
+
+# An alias or merge key, which may refer to an anchor in another part
+# of a file parsed in parallel.
+ALIAS = re.compile(rb':[ \t]+\*|<<:')
+
+# Ways of reading YAML: the line parser of this module, and the event
+# API of PyYAML in yamldoc.events, which needs PyYAML installed.
+BACKENDS = ("python", "libyaml")
+
+
+class _Frame:
+    """
+    One level of the indentation stack used by parse_yaml.
+    """
+
+    def __init__(self, indent, container, collection=False):
+        self.indent = indent
+        self.container = container
+        self.collection = collection
+
+
+class _Anchors:
+    """
+    The anchors of one document and the entries their aliases and merge
+    keys add, for both backends. The number of entries added is counted
+    against a limit, with the expanded size of every list of entries
+    aliased measured once, so a fragment used many times stays cheap.
+    """
+
+    def __init__(self, containers, max_expansion=MAX_EXPANSION, debug=False):
+        """
+        Initialize the object.
+
+        Arguments:
+            containers: Function returning the lists of entries, or the
+                MetaEntries, still being filled, to catch an alias used
+                inside its own anchor.
+            max_expansion: Largest number of entries aliases may add.
+            debug: Print debug information
+        """
+        self.containers = containers
+        self.max_expansion = max_expansion
+        self.debug = debug
+        # Anchored values by name.
+        self.anchors = {}
+        self.expansion = 0
+        self.sizes = {}
+        # Mappings with merge keys, and the entries the merges added.
+        self.merged = []
+        self.inherited = set()
+
+    def __repr__(self):
+        """
+        Returns a print representation.
+        """
+        return f'yamldoc anchors [{", ".join(self.anchors)}]'
+
+    def register(self, anchor, value):
+        '''
+        Remember the value of an anchor, if any.
+        '''
+        if anchor:
+            self.anchors[anchor] = value
+            if self.debug: yamldoc.trace.debug("Found an anchor : " + anchor)
+
+    def size(self, entries):
+        '''
+        The number of entries in a list, counting those of its sections.
+        '''
+        n = self.sizes.get(id(entries))
+        if n is None:
+            n = len(entries)
+            for value in entries:
+                if value.isBase:
+                    n += self.size(value.entries)
+            self.sizes[id(entries)] = n
+        return n
+
+    def expand(self, name, n):
+        '''
+        Count n entries added by an alias of an anchor.
+
+        Raises:
+            ValueError: When the alias is inside its own anchor, or the
+                aliases of the document add more than max_expansion entries.
+        '''
+        anchored = self.anchors[name]
+        if anchored.isBase and any(container is anchored or container is anchored.entries
+                                   for container in self.containers()):
+            raise ValueError(f"alias *{name} is used inside its own anchor")
+        self.expansion += n
+        if self.expansion > self.max_expansion:
+            raise ValueError(f"aliases expand to more than {self.max_expansion} entries")
+
+    def inherit(self, key, value, meta, is_commented, origin, line):
+        '''
+        A copy of an anchored value under another key. The entries of a
+        mapping are shared, not copied.
+        '''
+        if value.isBase:
+            self.expand(origin, 1 + self.size(value.entries))
+            entry = yamldoc.entries.MetaEntry(key, meta or value.meta, is_commented, line)
+            entry.entries = value.entries
+        else:
+            self.expand(origin, 1)
+            entry = yamldoc.entries.Entry(key, value.value, meta or value.meta, is_commented, line)
+        entry.origin = origin
+        return entry
+
+    def merge(self, entries, names):
+        '''
+        Add the entries of the mappings anchored under names to a list of
+        entries, for a merge key.
+        '''
+        for name in names:
+            anchor = self.anchors.get(name)
+            if anchor is None or not anchor.isBase:
+                continue
+            for anchored in anchor.entries:
+                key = anchored.name if anchored.isBase else anchored.key
+                entry = self.inherit(key, anchored, "", anchored.is_commented, name, anchored.line)
+                entries.append(entry)
+                self.inherited.add(id(entry))
+        self.merged.append(entries)
+        if self.debug: yamldoc.trace.debug("Merged " + ", ".join(names))
+
+    def close(self):
+        '''
+        Remove the merged entries that their mapping overrides, once the
+        document has been read.
+        '''
+        _drop_overridden(self.merged, self.inherited)
+
+
+def parse_yaml(file_path, char="#'", debug=False, max_expansion=MAX_EXPANSION, jobs=None, backend="python"):
     """
     Parse a YAML file and return a list of YAML classes.
 
+    The file is memory mapped and read in a single pass over lines
+    classified by yamldoc.scanner. Each mapping that contains other
+    keys becomes a MetaEntry holding its children, to any depth, and
+    every other key becomes an Entry. The documents of a stream
+    separated by "---" are read into one list; see parse_documents to
+    read them one at a time.
+
+    Anchors (&name) are resolved within their document. An alias
+    (*name) of a mapping shares the entries of the anchor rather than
+    copying them, and a merge key (<<: *name) adds the keys of the
+    anchor that the mapping does not set itself. Values taken from an
+    anchor record its name as their origin.
+
+    With jobs, a large file is split between top level keys and the
+    parts are parsed by as many processes at once. The result is the
+    same as parsing it in one go. Files with aliases are parsed in one
+    process, since an alias may refer to an anchor in any part.
+
+    The "libyaml" backend reads the file with PyYAML instead, see
+    yamldoc.events, and falls back to the line parser when PyYAML is
+    not installed or rejects the file.
+
     Arguments:
-        file_path: Path to the YAML file.
+        file_path: Path to the YAML file, or its contents as bytes, a
+            memoryview or a text or binary stream.
         char: A character string used to identify yamldoc blocks.
         debug: Print debug information
-        indent_level: level of indentation
-        is_base: to know which table to use
+        max_expansion: Largest number of entries aliases and merge keys
+            may add to a document, counting shared entries every time
+            they are used. A ValueError is raised beyond it.
+        jobs: (Optional) Number of processes used to parse a file of at
+            least PARALLEL_MIN_SIZE bytes.
+        backend: One of BACKENDS.
 
     Return:
         List of YAML blocks.
     """
+    with yamldoc.trace.span("read"):
+        source = yamldoc.scanner.Source(file_path)
+
+    with source:
+        if backend != "python":
+            documents = _backend_documents(source, char, debug, max_expansion, backend)
+            if documents is not None:
+                return [value for document in documents for value in document]
+
+        if jobs is not None and jobs > 1 and len(source.buffer) >= PARALLEL_MIN_SIZE:
+            md = _parse_parallel(source, file_path, char, debug, max_expansion, jobs)
+            if md is not None:
+                return md
+
+        md = []
+        for document in _documents(source.lines(char), char, debug, max_expansion):
+            md.extend(document)
+    return md
+
+
+def _parse_parallel(source, file_path, char, debug, max_expansion, jobs):
+    '''
+    Parse the parts of a large input in a process pool and join the
+    trees in order. Returns None when the input cannot be split.
+    '''
+    buffer = source.buffer
+    if ALIAS.search(buffer):
+        if debug: yamldoc.trace.debug("Aliases found, parsing in one process.")
+        return None
+    # More parts than processes, as top level sections differ in size.
+    offsets = yamldoc.scanner.boundaries(buffer, jobs * 4, char)
+    if len(offsets) < 3:
+        return None
+
+    tracer = yamldoc.trace.current()
+    path = os.fspath(file_path) if isinstance(file_path, (str, os.PathLike)) else None
+    tasks = []
+    first_line = 1
+    for start, end in zip(offsets, offsets[1:]):
+        # Workers read their own part of a file rather than receive it.
+        data = None if path is not None else bytes(buffer[start:end])
+        tasks.append((path, start, end, first_line, data, char, debug, max_expansion, tracer is not None))
+        first_line += buffer[start:end].count(b"\n")
+    if debug: yamldoc.trace.debug(f"Parsing {len(tasks)} parts in {jobs} processes.")
+    import concurrent.futures
+
+    md = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+        for index, (entries, trailing, counters) in enumerate(pool.map(_parse_part, tasks)):
+            # Comments carried over to the first key of the next part.
+            if trailing and index < len(tasks) - 1:
+                if debug: yamldoc.trace.debug("Comments span two parts, parsing in one process.")
+                pool.shutdown(cancel_futures=True)
+                return None
+            md.extend(entries)
+            for name, value in counters.items():
+                tracer.count(name, value)
+    return md
+
+
+def _parse_part(task):
+    '''
+    Parse one part of a file in a worker process.
+
+    Returns:
+        Tuple of (list of YAML blocks, yamldoc comments left at the end,
+        counters recorded while parsing).
+    '''
+    path, start, end, first_line, data, char, debug, max_expansion, profile = task
+    if data is None:
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+
+    md = []
+    trailing = []
+    with yamldoc.trace.Tracer() if profile else contextlib.nullcontext() as tracer:
+        for document in _documents(yamldoc.scanner.Source(data).lines(char, first_line), char, debug, max_expansion, trailing):
+            md.extend(document)
+    return md, trailing, tracer.counters if profile else {}
+
+
+def _backend_documents(source, char, debug, max_expansion, backend):
+    '''
+    Parse every document with another backend than the line parser.
+    Returns None when the line parser should be used instead.
+    '''
+    if backend != "libyaml":
+        raise ValueError(f"Unknown backend: {backend}")
+    return yamldoc.events.documents(source, char, debug, max_expansion)
+
+
+def parse_documents(file_path, char="#'", debug=False, max_expansion=MAX_EXPANSION, backend="python"):
+    """
+    Parse a stream of YAML documents separated by "---", yielding each
+    one as soon as it has been read. Only the document being parsed is
+    held in memory.
+
+    Arguments:
+        file_path: Path to the YAML file, or its contents as bytes, a
+            memoryview or a text or binary stream.
+        char: A character string used to identify yamldoc blocks.
+        debug: Print debug information
+        max_expansion: Largest number of entries aliases may add to a
+            document, see parse_yaml.
+        backend: One of BACKENDS. PyYAML reads the whole input before
+            the first document is yielded.
+
+    Yields:
+        List of YAML blocks of each document.
+    """
+    with yamldoc.trace.span("read"):
+        source = yamldoc.scanner.Source(file_path)
+
+    with source:
+        if backend != "python":
+            documents = _backend_documents(source, char, debug, max_expansion, backend)
+            if documents is not None:
+                yield from documents
+                return
+        yield from _documents(source.lines(char), char, debug, max_expansion)
+
+
+def _documents(lines, char, debug, max_expansion=MAX_EXPANSION, trailing=None):
+    '''
+    Split classified lines into documents and parse each of them.
+    Separators with nothing before them do not make a document.
+
+    The yamldoc comments left at the end of the input, with no key to
+    describe, are added to trailing when given.
+    '''
+    tracer = yamldoc.trace.current()
+    separator = True
+    while separator:
+        md, separator, count, comments = _parse_document(lines, char, debug, max_expansion)
+        if trailing is not None and not separator:
+            trailing.extend(comments)
+        if count == 0:
+            continue
+        if tracer is not None:
+            tracer.count("documents")
+            tracer.count("lines", count)
+            count_entries(md, tracer)
+        yield md
+
+
+def _parse_document(lines, char, debug, max_expansion=MAX_EXPANSION):
+    '''
+    Parse classified lines up to the end of the current document.
+
+    Arguments:
+        lines: Iterator of (kind, indent, text) from yamldoc.scanner.
+        char: A character string used to identify yamldoc blocks.
+        debug: Print debug information
+        max_expansion: Largest number of entries aliases may add.
+
+    Returns:
+        Tuple of (list of YAML blocks, whether a separator ended the
+        document, number of lines read before it, the yamldoc comments
+        after the last key).
+    '''
     # YAML files have key value pairings separated by
     # newlines. The most straightforward kind of things to parse will be
     # keyvalue pairs preceded by comments with the Doxygen marker #'
 
-    meta = "<br></br>"
     md = []
-    values = "<br></br>"
-    block_values = ""
-    first_level = None
-    second_level = None
-    object_var = None
-    block_var = None
-    test_var = None
-    is_commented = False
-
-    with open(file_path) as yaml:
-        yaml_lines = [l for l in yaml.readlines() if l.rstrip()]
-        last_line = yaml_lines[-1]
-
-        if last_line.startswith("#") and not last_line.startswith(char):
-            last_line = "".join(yaml_lines[-1].split("#", 1))
-            is_commented = True
+    stack = [_Frame(-1, md)]
+    comments = []
+
+    # A key with no value on its own line. What it is depends on the
+    # next line: a nested mapping, a list or simply an empty value.
+    pending = None
+    # Open list (key, entry, indent, lines) and block scalar states.
+    sequence = None
+    block = None
+
+    def take_meta():
+        # Generated configs repeat the same comments over and over.
+        meta = sys.intern(" ".join(comments))
+        comments.clear()
+        return meta
+
+    def add(container, entry):
+        if isinstance(container, list):
+            container.append(entry)
         else:
-            is_commented = False
-
-        for l in range(len(yaml_lines) -1):
-
-            line = yaml_lines[l]
-            if line.startswith("#") and not line.startswith(char):
-                line = "".join(yaml_lines[l].split("#", 1))
-                is_commented = True
-            else:
-                is_commented = False
-
-            next_line = yaml_lines[l + 1]
-            if next_line.startswith("#") and not next_line.startswith(char):
-                next_line = "".join(yaml_lines[l + 1].split("#", 1))
-
-            indent_level = count_indent(line)
-            if debug:
-                print(line.rstrip())
-                print(indent_level)
-            if line.lstrip(" ").startswith("-") and first_level is None and second_level is None:
-                if count_indent(next_line) == 0:
-                    md.append(first_level)
-                    md.append(second_level)
-                    first_level = None
-                    second_level = None
-                    if debug: print("@\tBACK TO 0")
-                line.lstrip(" ")
-
-            if object_var is None and next_line.lstrip(" ").startswith("- {"):
-                key = line.lstrip().rstrip().split(":", 1)[0]
-                value = ""
-                if first_level is None:
-                    md.append(yamldoc.entries.Entry("[" + key + "](#" + key + ")", value, meta.lstrip(), is_commented))
-                    object_var = yamldoc.entries.MetaEntry(key, meta)
-                    if debug: print("@\tFOUND A COLLECTION OF OBJECTS AT BASE LEVEL")
-                if first_level is not None and second_level is None:
-                    first_level.entries.append(yamldoc.entries.Entry("[" + key + "](#" + key + ")", value, meta.lstrip(), is_commented))
-                    object_var = yamldoc.entries.MetaEntry(key, meta)
-                    if debug: print("@\tFOUND A COLLECTION OF OBJECTS AT FIRST LEVEL")
-                if second_level is not None:
-                    second_level.entries.append(yamldoc.entries.Entry("[" + key + "](#" + key + ")", value, meta.lstrip(), is_commented))
-                    object_var = yamldoc.entries.MetaEntry(key, meta)
-                if debug: print("@\tFOUND A COLLECTION OF OBJECTS")
-                meta = ""
+            container.entries.append(entry)
+
+    def close_sequence():
+        entry, _, values = sequence
+        entry.value = "\n".join(values)
+        if debug: yamldoc.trace.debug("List values")
+
+    def close_block():
+        entry, _, values = block
+        entry.value = "\n".join([entry.value] + values)
+        if debug: yamldoc.trace.debug("Block values")
+
+    aliases = _Anchors(lambda: [frame.container for frame in stack], max_expansion, debug)
+    anchors = aliases.anchors
+    register = aliases.register
+
+    count = 0
+    separator = False
+    for kind, indent, stripped, number in lines:
+        if indent == 0 and (stripped in ("---", "...") or stripped.startswith("--- ")):
+            separator = True
+            break
+        count += 1
+
+        # Everything indented below a block scalar belongs to it,
+        # including lines that look like comments.
+        if block is not None:
+            if indent > block[1]:
+                block[2].append(stripped)
                 continue
+            close_block()
+            block = None
+
+        if kind == yamldoc.scanner.MARKER:
+            comments.append(stripped[len(char):].strip())
+            if debug: yamldoc.trace.debug("Found a comment : " + comments[-1])
+            continue
+
+        is_commented = False
+        if kind == yamldoc.scanner.COMMENT:
+            uncommented = stripped[1:]
+            stripped = uncommented.strip()
+            if not COMMENTED_ENTRY.match(stripped):
+                continue
+            indent += count_indent(uncommented)
+            # COMMENTED_ENTRY only matches list items and keys.
+            kind = yamldoc.scanner.ITEM if stripped[0] == "-" else yamldoc.scanner.KEY
+            is_commented = True
 
+        if stripped in ("---", "...") or stripped.startswith("%"):
+            continue
 
-            # Object/ Collection of objects logic
-            if object_var is not None:
-                if line.lstrip().startswith("- {"):
+        is_item = kind == yamldoc.scanner.ITEM
+
+        if sequence is not None:
+            if indent > sequence[1] or (indent == sequence[1] and is_item):
+                sequence[2].append(stripped)
+                continue
+            close_sequence()
+            sequence = None
+
+        if pending is not None:
+            key, meta, pending_commented, pending_indent, parent, anchor, line = pending
+            pending = None
+            if is_item and indent >= pending_indent:
+                if stripped.lstrip("- ").rstrip() == "{":
+                    meta_entry = yamldoc.entries.MetaEntry(key, meta, pending_commented, line)
+                    add(parent, meta_entry)
+                    register(anchor, meta_entry)
+                    stack.append(_Frame(pending_indent, meta_entry, collection=True))
+                    if debug: yamldoc.trace.debug("FOUND A COLLECTION OF OBJECTS")
                     continue
-                if line.lstrip(' ').startswith(char):
-                    meta = meta + line.lstrip().lstrip(char).rstrip() + " <br></br>"
-                    if debug:
-                        print("@\tFound a comment : " + meta)
-                else:
-                    if line.lstrip().startswith("}") and not next_line.lstrip(" -").startswith("{"):
-                        if debug: print("@\tEND OF OBJECT COLLECTION")
-                        # if count_indent(line) == 4:
-                        #     first_level.entries.append(object_var)
-                        #     object_var = None
-                        #     if debug: print("@\tEnd of object collection at first level.")
-                        #     continue
-                        # if count_indent(line) == 6:
-                        #     first_level.entries.append(object_var)
-                        #     object_var = None
-                        #     if debug: print("@\tEnd of object collection at first level.")
-                        #     continue
-                        # else:
-                        md.append(object_var)
-                        object_var = None
-                        if debug: print("@\tNot sure")
-                        continue
-
-                    if line.lstrip().startswith("}") and next_line.lstrip(" -").startswith("{"):
-                        if debug: print("@\tEND OF OBJECT")
-                        md.append(object_var)
-                        key = ""
-                        meta = ""
-                        object_var = yamldoc.entries.MetaEntry(key, meta)
-                        continue
-
-                    key, value = line.lstrip().rstrip().split(":", 1)
-
-                    object_var.entries.append(
-                        yamldoc.entries.Entry(key, value.lstrip(' '), meta.lstrip(), is_commented))
-                    if debug:
-                        print("@\tFOUND AN OBJECT ENTRY.")
-                    meta = ""
+                entry = yamldoc.entries.Entry(key, "", meta, pending_commented, line)
+                add(parent, entry)
+                register(anchor, entry)
+                sequence = (entry, pending_indent, [stripped])
                 continue
+            if indent > pending_indent:
+                meta_entry = yamldoc.entries.MetaEntry(key, meta, pending_commented, line)
+                add(parent, meta_entry)
+                register(anchor, meta_entry)
+                stack.append(_Frame(pending_indent, meta_entry))
+                if debug: yamldoc.trace.debug("Found a meta entry.")
+            else:
+                entry = yamldoc.entries.Entry(key, "", meta, pending_commented, line)
+                add(parent, entry)
+                register(anchor, entry)
+                if debug: yamldoc.trace.debug("Found an entry.")
+
+        top = stack[-1]
+        if top.collection and indent >= top.indent and (stripped.startswith("}") or stripped == "- {"):
+            continue
+
+        while stack[-1].indent >= indent:
+            stack.pop()
+        parent = stack[-1].container
+
+        if kind != yamldoc.scanner.KEY:
+            if debug: yamldoc.trace.debug("Line ignored.")
+            continue
+
+        key, value = stripped.split(":", 1)
+        # The same keys repeat across sections and files; share one copy.
+        key = sys.intern(key)
+        value = value.strip()
+        if stack[-1].collection:
+            value = value.rstrip(",")
+
+        anchor = None
+        if key == "<<" and value[:1] in ("*", "["):
+            take_meta()
+            if not is_commented:
+                names = [name.strip().lstrip("*") for name in value.strip("[]").split(",")]
+                aliases.merge(parent if isinstance(parent, list) else parent.entries, names)
+            continue
+        if value[:1] == "&":
+            anchor, _, value = value[1:].partition(" ")
+            value = value.strip()
+            # Keys that were commented out do not define anchors.
+            if is_commented:
+                anchor = None
+        elif value[:1] == "*" and value[1:] in anchors:
+            entry = aliases.inherit(key, anchors[value[1:]], take_meta(), is_commented, value[1:], number)
+            add(parent, entry)
+            if debug: yamldoc.trace.debug("Found an alias : " + value)
+            continue
+
+        if not value:
+            pending = (key, take_meta(), is_commented, indent, parent, anchor, number)
+            continue
+
+        entry = yamldoc.entries.Entry(key, value, take_meta(), is_commented, number)
+        add(parent, entry)
+        register(anchor, entry)
+        if BLOCK_SCALAR.match(value):
+            block = (entry, indent, [])
+        elif debug:
+            yamldoc.trace.debug("Found an entry.")
+
+    if block is not None:
+        close_block()
+    if sequence is not None:
+        close_sequence()
+    if pending is not None:
+        key, meta, pending_commented, _, parent, anchor, line = pending
+        entry = yamldoc.entries.Entry(key, "", meta, pending_commented, line)
+        add(parent, entry)
+        register(anchor, entry)
+
+    aliases.close()
+    return md, separator, count, comments
+
+
+def _drop_overridden(merged, inherited):
+    '''
+    Remove the merged entries that a mapping sets itself, or that an
+    earlier merge added: keys set by a mapping itself win over merged
+    ones, and earlier merges win over later ones.
 
-            if first_level is None:
-                if line.startswith(char):
-                    meta += line.lstrip(char).rstrip() + " <br></br>"
-                    if debug: print("@\tFound a comment : " + meta )
-
-                elif line.lstrip().startswith("-") and line.endswith("-\n"):
-                    if debug: print("@\tLine ignored.")
-                    continue
-                elif block_var is not None and line.lstrip().startswith("-"):
-                    block_values += "<br>  " + line.rstrip()
-                    if debug: print("@\tAdded string to values")
-                    if count_indent(next_line) != count_indent(line):
-                        md.append(yamldoc.entries.Entry(key, block_values, meta.lstrip(), is_commented))
-                        block_var = None
-                        block_values = ""
-                        meta = ""
+    Arguments:
+        merged: Lists of entries of the mappings with merge keys.
+        inherited: Ids of the entries the merges added.
+    '''
+    for entries in merged:
+        own = {value.name if value.isBase else value.key for value in entries if id(value) not in inherited}
+        seen = set()
+        kept = []
+        for value in entries:
+            name = value.name if value.isBase else value.key
+            if id(value) in inherited:
+                if name in own or name in seen:
                     continue
+                seen.add(name)
+            kept.append(value)
+        entries[:] = kept
 
-                else:
-                    try:
-                        key, value = line.lstrip().rstrip().split(":", 1)
-                    except ValueError:
-                        continue
-                    if not value.lstrip():
-                        if next_line.lstrip(" ").startswith("-"):
-                            try:
-                                index = 1
-                                while yaml_lines[l + index].lstrip("#").lstrip(" ").startswith("-"):
-                                    values += yaml_lines[l + index].lstrip("#").rstrip() + "<br>"
-                                    index = index + 1
-                                    if debug: print("@\tList values")
-                            except IndexError:
-                                pass
-
-                            md.append(yamldoc.entries.Entry(key, values, meta.lstrip(), is_commented))
-                            meta = ""
-                            values = "<br>"
-
-                        else:
-                            md.append(yamldoc.entries.Entry("[" + key + "](#" + key + ")", value, meta.lstrip(), is_commented))
-                            first_level = yamldoc.entries.MetaEntry(key, meta)
-                            if debug: print("@\tFound a meta entry.")
-                            meta = ""
-                            continue
-
-                    elif line.rstrip().endswith(">-"):
-                        key, value = line.rstrip().split(":", 1)
-                        block_values = " >-"
-                        block_var = yamldoc.entries.Entry(key, block_values, meta, is_commented)
-                        if debug: print("@\tENTROU em base")
-                        continue
-
-                    else:
-                        md.append(yamldoc.entries.Entry(key, value.lstrip(' '), meta.lstrip(), is_commented))
-                        if debug: print("@\tFound an entry.")
-                        meta = ""
-
-            if first_level is not None and second_level is None:
-                if first_level.isBase:
-                    if line.lstrip(' ').startswith(char):
-                        meta += line.lstrip(char).rstrip() + " <br></br>"
-                        if debug: print("@\tFound a comment :" + meta)
-
-                    elif line.lstrip(" ").startswith("-") and block_var is None:
-                        if count_indent(next_line) == 0:
-                            md.append(first_level)
-                            md.append(second_level)
-                            first_level = None
-                            second_level = None
-                            if debug: print("@\tBACK TO 0")
-                        else:
-                            if debug: print("@\tLine ignored.")
-                            continue
-                    elif block_var is not None and line.lstrip().startswith("-"):
-                        block_values += "<br>  " + line.rstrip()
-                        if debug: print("@\tAdded string to values")
-                        if count_indent(next_line) != count_indent(line):
-                            first_level.entries.append(yamldoc.entries.Entry(key, block_values, meta.lstrip(), is_commented))
-                            block_var = None
-                            block_values = ""
-                            meta = ""
-                        continue
-                    else:
-                        key, value = line.lstrip().rstrip().split(":", 1)
-                        if not value.lstrip():
-                            if second_level is None and not next_line.lstrip(" ").startswith("-"):
-                                first_level.entries.append(
-                                    yamldoc.entries.Entry("[" + key + "](#" + key + ")", value.lstrip(' '),
-                                                          meta.lstrip(), is_commented))
-                                second_level = yamldoc.entries.MetaEntry(key, meta)
-                                if debug: print("@\tFound a 2ND LEVEL meta entry.")
-                                meta = ""
-                                continue
-
-                            elif next_line.lstrip(" ").startswith("-") and (":" in line):
-                                try:
-                                    index = 1
-                                    while yaml_lines[l + index].lstrip("#").lstrip(" ").startswith("-"):
-                                        values += yaml_lines[l + index].lstrip("#").rstrip() + "<br>"
-                                        index = index + 1
-                                        if debug: print("@\tList values")
-                                except IndexError:
-                                    pass
-
-                                first_level.entries.append(yamldoc.entries.Entry(key, values, meta.lstrip(), is_commented))
-                                values = "<br>"
-                                meta = ""
-
-                            else:
-                                md.append(second_level)
-                                second_level = None
-                                first_level.entries.append(
-                                    yamldoc.entries.Entry("[" + key + "](#" + key + ")", value.lstrip(' '),
-                                                          meta.lstrip(), is_commented))
-                                second_level = yamldoc.entries.MetaEntry(key, meta)
-                                if debug: print("@\tFound ANOTHER 2ND LEVEL meta entry.")
-
-                        if line.rstrip().endswith(">-"):
-                            key, value = line.rstrip().split(":", 1)
-                            block_values = " >-"
-                            block_var = yamldoc.entries.Entry(key, block_values, meta, is_commented)
-                            if debug: print("@\tENTROU em first level")
-                            continue
-
-                        if value.lstrip():
-                            first_level.entries.append(
-                                yamldoc.entries.Entry(key, value.lstrip(' '), meta.lstrip(), is_commented))
-                            if debug:
-                                print("@\tFound a 1st level entry and deposited it in meta.")
-                            meta = ""
-
-                        if count_indent(next_line) == 0:
-                            md.append(first_level)
-                            md.append(second_level)
-                            first_level = None
-                            second_level = None
-                            if debug: print("@\tBACK TO 0")
-
-            if second_level is not None:
-                if second_level.isBase:
-                    if line.lstrip(' ').startswith(char):
-                        meta += line.lstrip(char).rstrip() + " <br></br>"
-                        if debug:
-                            print("@\tFound a comment :" + meta)
-
-                    elif line.lstrip(" ").startswith("-") and block_var is None:
-                        if count_indent(next_line) == 0:
-                            md.append(first_level)
-                            md.append(second_level)
-                            first_level = None
-                            second_level = None
-                            if debug: print("@\tBACK TO 0")
-                        else:
-                            if debug: print("@\tLine ignored.")
-                            pass
-                    elif block_var is not None and line.lstrip().startswith("-"):
-                        block_values += "<br>  " + line.rstrip()
-                        if debug: print("@\tAdded string to values")
-                        if count_indent(next_line) == 4:
-                            second_level.entries.append(yamldoc.entries.Entry(key, block_values, meta.lstrip(), is_commented))
-                            block_var = None
-                            block_values = ""
-                            meta = ""
-                            if debug: print("@\tEnd of 2ndlvl block, continue on 2nd level")
-                            continue
-                        elif count_indent(next_line) == 2:
-                            second_level.entries.append(
-                                yamldoc.entries.Entry(key, block_values, meta.lstrip(), is_commented))
-                            md.append(second_level)
-                            second_level = None
-                            block_var = None
-                            block_values = ""
-                            meta = ""
-                            if debug: print("@\tEnd of 2ndlvl block, back to first level")
-                            continue
-                        elif count_indent(next_line) == 0:
-                            second_level.entries.append(
-                                yamldoc.entries.Entry(key, block_values, meta.lstrip(), is_commented))
-                            md.append(second_level)
-                            md.append(first_level)
-                            first_level = None
-                            second_level = None
-                            block_var = None
-                            block_values = ""
-                            meta = ""
-                            if debug: print("@\tEnd of 2ndlvl block, back to 0")
-                            continue
-                        continue
-                    else:
-                        key, value = line.lstrip().rstrip().split(":", 1)
-                        if not value.lstrip():
-                            if next_line.lstrip(" ").startswith("-") and (":" in line):
-                                try:
-                                    index = 1
-                                    while yaml_lines[l + index].lstrip(" ").startswith("-"):
-                                        values += yaml_lines[l + index].lstrip("#").rstrip() + "<br>"
-                                        index = index + 1
-                                        if debug: print("@\tList values")
-                                except IndexError:
-                                    pass
-
-                                second_level.entries.append(yamldoc.entries.Entry(key, values, meta.lstrip(), is_commented))
-                                values = "<br>"
-                                meta = ""
-                            else:
-                                second_level.entries.append(
-                                    yamldoc.entries.Entry("[" + key + "](#" + key + ")", value.lstrip(' '),
-                                                          meta.lstrip(), is_commented))
-                                if debug: print("@\tFound a 3RD LEVEL meta entry.")
-
-                        if line.rstrip().endswith(">-"):
-                            key, value = line.rstrip().split(":", 1)
-                            block_values = " >-"
-                            block_var = yamldoc.entries.Entry(key, block_values, meta, is_commented)
-                            if debug: print("@\tENTROU em second level")
-                            continue
-
-                        if value.lstrip():
-                            second_level.entries.append(
-                                yamldoc.entries.Entry(key, value.lstrip(' '), meta.lstrip(), is_commented))
-                            if debug:
-                                print("@\tFound a 2nd entry and deposited it in meta.")
-                            meta = ""
-
-                        if count_indent(next_line) == 0:
-                            md.append(first_level)
-                            md.append(second_level)
-                            first_level = None
-                            second_level = None
-                            if debug: print("@\tBACK TO 0")
-                            continue
-
-        # For some reason, it doesn't parse the last line
-        if last_line and (indent_level == 0):
-            key, value = last_line.lstrip().rstrip().split(":", 1)
-            md.append(yamldoc.entries.Entry(key, value, meta.lstrip(), is_commented))
-
-        if last_line and (indent_level != 0):
-
-            if last_line.lstrip().startswith("}"):
-                md.append(first_level)
-                md.append(second_level)
-                first_level = None
-                second_level = None
-                if debug: print("@\tEND OF DOC")
-
-            elif indent_level == 2:
-                key, value = last_line.lstrip().rstrip().split(":", 1)
-                first_level.entries.append(yamldoc.entries.Entry(key, value.lstrip(' '), meta.lstrip(), is_commented))
-                if debug: print("@\tEND OF DOC AT 1ST LEVEL")
-            elif indent_level == 4:
-                key, value = last_line.lstrip().rstrip().split(":", 1)
-                second_level.entries.append(yamldoc.entries.Entry(key, value.lstrip(' '), meta.lstrip(), is_commented))
-                if debug: print("@\tEND OF DOC AT 2ND LEVEL")
-            md.append(first_level)
-            md.append(second_level)
-            first_level = None
-            second_level = None
 
-    return md
+def count_entries(yaml, tracer):
+    '''
+    Record the size of a parsed YAML tree on a tracer: the number of
+    entries, how many sit at each depth and the bytes of comments.
+
+    Arguments:
+        yaml: List of yaml representations from parse_yaml.
+        tracer: A yamldoc.trace.Tracer.
+    '''
+    stack = [(0, yaml)]
+    while stack:
+        depth, entries = stack.pop()
+        tracer.count("entries", len(entries))
+        tracer.count(f"depth_{depth}", len(entries))
+        for value in entries:
+            tracer.count("comment_bytes", len(value.meta))
+            if value.isBase:
+                stack.append((depth + 1, value.entries))
 
 
 def key_value(line):
@@ -433,150 +625,18 @@ def parse_schema(path_to_file, debug=False):
     Parse a schema file to identify key value pairing of 
     values and their associated types.
 
+    To apply one schema to many YAML files, compile it once with
+    yamldoc.schema.compile_schema instead.
+
     Arguments:
         path_to_file: Path to schema file.
 
-    Returns: Tuple of (schema, specials) where specials are unique YAMLDOC strings for the title and description of the desired markdown. 
-    '''
-    name = "base"
-
-    indent = [0, 0]
-
-    specials = {}
-    indents = {}
-    current = {}
-
-    extras = {}
-
-    special_type_case = False
-
-    with open(path_to_file) as schema:
-        for line in [l for l in schema.readlines() if l.rstrip()]:
-            if debug: print(line)
-            indent = [indent[1], count_indent(line)]
-
-            # The base level has to start with a special name
-            # because it is not named in the schema.
-            try:
-                key, value = key_value(line)
-            except ValueError:
-                key = key_value(line)
-                value = None
-
-            # This is awkwardly placed but we have to deal
-            # with a special case where lines 
-            # start with a dash, and indicate that
-            # variables have multiple types.
-            # 
-            # If this has been observed further inside the
-            # loop, and the line does indeed start with a dash
-            if special_type_case:
-                # If the indent has decreased, then 
-                # the list of types has finished.
-                if indent[1] < indent[0]:
-                    special_type_case = False
-                    continue
-                if line.lstrip(" ").startswith("-"):
-                    value = line.lstrip(" ").lstrip("- ").rstrip()
-                    current[parent][name].append(value)
-                    continue
-                else:
-                    raise TypeError("You must specify a value for type.")
-
-            # < Deal with top level specials.
-            if key == "$schema":
-                assert value is not None
-                specials["schema"] = value
-
-            if key == "_yamldoc_title":
-                assert value is not None
-                specials[key] = value
-
-            if key == "_yamldoc_description":
-                assert value is not None
-                specials[key] = value
-
-            if key == "description":
-                assert value is not None
-                specials["description"] = value
-            # />
-
-            # Top level properties option
-            if value is None:
-                if key == "properties":
-                    current[name] = {}
-                    indents[name] = {}
-                    extras[name] = {}
-                    continue
+    Returns: Tuple of (schema, specials, extras) where specials are unique YAMLDOC strings for the title and description of the desired markdown. Schema and extras are grouped by the path of the parent object, "base" for the top level.
+    '''
+    return yamldoc.schema.compile_schema(path_to_file, debug).sections()
 
-            # Deal with increasing indent levels
-            # The actual amount of indent is not
-            # relevant (though it may be for 
-            # parsing a valid YAML document.
-            if indent[1] >= indent[0]:
-                if value is None:
-                    # If the key is properties
-                    # then we are starting a new object
-                    # definition.
-                    if key == "properties":
-                        current[name] = {}
-                        indents[name] = {}
-                        extras[name] = {}
-                        continue
-
-                    # This is a special case where
-                    # there can be multiple types
-                    # given for a particular variable.
-                    elif key == "type":
-                        current[parent][name] = []
-                        indents[parent][name] = []
-                        special_type_case = True
-                        continue
-
-
-                    # Otherwise, its the name of the
-                    # actual object.
-                    # Assign the key to be the "name"
-                    # and relegate the previous name
-                    # to the "parent".
-                    else:
-                        parent = name
-                        name = key
-                        continue
-
-                # If it's giving the type of the object
-                # then store that under the parent (meta)
-                # object along with its indentation level. 
-                if key == "type":
-                    assert value is not None
-                    if value != "object":
-                        current[parent][name] = value
-                        indents[parent][name] = indent[1]
-                    continue
-                elif key in ["plain_text", "enum"]:
-                    assert value is not None
-                    if name in extras[parent].keys():
-                        extras[parent][name][key] = value
-                        indents[parent][name] = indent[1]
-                    else:
-                        extras[parent][name] = {key: value}
-                        indents[parent][name] = indent[1]
-
-            if indent[1] < indent[0]:
-                # We're just adding another value 
-                if indent[1] == indents[parent][name]:
-                    if value is None:
-                        name = key
-                        continue
-                elif indent[1] < indents[parent][name]:
-                    if value is None:
-                        name = key
-                        continue
-
-        return current, specials, extras
-
-
-def add_type_metadata(schema, yaml, debug=False):
+
+def add_type_metadata(schema, yaml, debug=False, index=None):
     '''
     Modified a list of yaml entries in place to add type information
     from a parsed schema.
@@ -585,151 +645,258 @@ def add_type_metadata(schema, yaml, debug=False):
         schema: List of schema representations from parse_schema.
         yaml: List of yaml representations from parse_yaml.
         debug: Print debug information
+        index: (Optional) Path index of the yaml from yamldoc.entries.index_paths,
+            to share one index between several annotations.
     
     Returns: 
         Nothing.
     '''
-    # Loop over each value of the schema 
-    for name, variables in schema.items():
-        # Find the corresponding entry in the YAML.
-
-        # Special case: if the name is base in the schema
-        # these are top level variables
-        # which need to be dealt with seperately.
-        if name == "base":
-            # Look for top level entries
-            for var, var_type in variables.items():
-                for value in yaml:
-                    if not value.isBase:
-                        if var == value.key:
-                            value.type = var_type
-        else:
-            for value in yaml:
-                if value.isBase:
-                    if name == value.name:
-                        for var, var_type in variables.items():
-                            for entry in value.entries:
-                                if var == entry.key:
-                                    if debug: print(f"Setting type of {var}")
-                                    entry.type = var_type
-                                    # If we find at least one
-                                    # then we can say that
-                                    # there's a schema.
-                                    value.has_schema = True
-                                    entry.has_schema = True
-
-
-def add_extra_metadata(extras, yaml, debug=False):
+    if index is None:
+        index = yamldoc.entries.index_paths(yaml)
+
+    for parent, var, var_type in _schema_items(schema, index):
+        for entry in index.get(var, ()):
+            if debug: yamldoc.trace.debug(f"Setting type of {var}")
+            entry.type = var_type
+            # If we find at least one
+            # then we can say that
+            # there's a schema.
+            entry.has_schema = True
+            if parent is not None:
+                parent.has_schema = True
+
+
+def add_extra_metadata(extras, yaml, debug=False, index=None):
     '''
     Modified a list of yaml entries in place to add extra type information
     from a parsed schema.
 
     Arguments:
-        schema: List of schema representations from parse_schema.
+        extras: Extra information ("enum", "plain_text") from parse_schema.
         yaml: List of yaml representations from parse_yaml.
         debug: Print debug information
+        index: (Optional) Path index of the yaml from yamldoc.entries.index_paths,
+            to share one index between several annotations.
     
     Returns: 
         Nothing.
     '''
-    # Loop over each value of the schema 
-    for name, variables in extras.items():
-        # Find the corresponding entry in the YAML.
+    if index is None:
+        index = yamldoc.entries.index_paths(yaml)
+
+    for _, var, meta in _schema_items(extras, index):
+        for entry in index.get(var, ()):
+            if debug: yamldoc.trace.debug(f"Setting extras of {var}")
+            for key, v in meta.items():
+                setattr(entry, key, v)
+
+
+def _schema_items(schema, index):
+    '''
+    Resolve the variables of a parsed schema to full key paths.
+
+    Schema sections are named by the path of the object they describe,
+    with "base" for the top level. A section named after a nested object
+    that is not a full path applies to every object with that name.
 
-        # Special case: if the name is base in the schema
-        # these are top level variables
-        # which need to be dealt with seperately.
+    Yields:
+        Tuples of (parent MetaEntry or None, path of the variable, value).
+    '''
+    by_name = None
+    for name, variables in schema.items():
         if name == "base":
-            # Look for top level entries
-            for var, meta in variables.items():
-                for value in yaml:
-                    if not value.isBase:
-                        if var == value.key:
-                            for key, v in meta.items():
-                                value.key = value
-        else:
-            for value in yaml:
-                if value.isBase:
-                    if name == value.name:
-                        for var, meta in variables.items():
-                            for entry in value.entries:
-                                if var == entry.key:
-                                    if debug: print(f"Setting type of {var}")
-                                    for key, v in meta.items():
-                                        setattr(entry, key, v)
+            for var, value in variables.items():
+                yield None, var, value
+            continue
 
+        parents = [(name, meta_entry) for meta_entry in index.get(name, ()) if meta_entry.isBase]
+        if not parents:
+            if by_name is None:
+                by_name = _by_name(index)
+            parents = by_name.get(name, ())
+        for path, meta_entry in parents:
+            for var, value in variables.items():
+                yield meta_entry, path + "." + var, value
 
-def main(yaml_path, char="#'", debug=False, schema_path=None, title="Configuration Parameters Reference",
-         description="Any information about this page goes here."):
+
+def _by_name(index):
     '''
-    Takes a given YAML file and optionally an associated schema, parsing each for their key value pairings and reports the results as a markdown document.
+    Group the objects of a path index by their own name rather than
+    their full path.
+    '''
+    by_name = {}
+    for path, values in index.items():
+        for value in values:
+            if value.isBase:
+                by_name.setdefault(value.name, []).append((path, value))
+    return by_name
+
+
+def document(yaml_path, out=None, char="#'", debug=False, schema_path=None, title="Configuration Parameters Reference",
+             description="Any information about this page goes here.", cache=None, format="markdown", jobs=None,
+             validate=False, backend="python", split=False):
+    '''
+    Takes a given YAML file and optionally an associated schema, parsing each for their key value pairings and writes the results as a markdown document.
 
     Arguments:
         yaml_path: Path to YAML file.
-        schema_path: Path to schema file. 
+        out: A text stream or a path to write to. When not given, the markdown is returned instead. A dictionary from output formats to streams or paths renders every format in one walk of the tree.
         char: Special character to identify comments to be included in YAMLDOC documentation.
         debug: Print debug information
+        schema_path: Path to schema file, or a schema compiled with yamldoc.schema.compile_schema.
         title: Title of markdown generated.
         description: Description given below the title in markdown.
+        cache: (Optional) A yamldoc.cache.Cache to reuse parse results from.
+        format: Output format, one of yamldoc.render.RENDERERS.
+        jobs: (Optional) Number of processes used to parse a large file, see parse_yaml.
+        validate: Check the values against the schema and the comments once the output is written, see yamldoc.validate.
+        backend: How the YAML is read, one of BACKENDS.
+        split: Write markdown split into one page per top level section and an index page, to the directory given as out, see yamldoc.render.render_pages.
 
     Returns: 
-        Nothing, prints to stdout.
+        The markdown when out is not given, the list of pages written with split, otherwise nothing.
+
+    Raises:
+        yamldoc.validate.ValidationError: With validate, when some values do not conform.
     '''
+    schema = None
+    with yamldoc.trace.span("parse"):
+        if cache is not None:
+            yaml = cache.parse_yaml(yaml_path, char, debug, jobs, backend)
+        else:
+            yaml = parse_yaml(yaml_path, char, debug, jobs=jobs, backend=backend)
+
     # If a schema has been specified, add the
     # type information to the rest of the 
     # variables.
     if schema_path is not None:
-        schema, specials, _ = parse_schema(schema_path, debug)
-        yaml = parse_yaml(yaml_path, char, debug)
+        if isinstance(schema_path, yamldoc.schema.CompiledSchema):
+            schema = schema_path
+        else:
+            with yamldoc.trace.span("schema_compile"):
+                if cache is not None:
+                    schema = cache.compile_schema(schema_path, debug)
+                else:
+                    schema = yamldoc.schema.compile_schema(schema_path, debug)
 
         # Edit the yaml in place with type information.
-        add_type_metadata(schema, yaml, debug)
+        with yamldoc.trace.span("annotate"):
+            schema.apply(yaml, debug)
 
-        if "_yamldoc_title" in specials:
-            title = specials["_yamldoc_title"]
+        if "_yamldoc_title" in schema.specials:
+            title = schema.specials["_yamldoc_title"]
 
-        if "_yamldoc_description" in specials:
-            description = specials["_yamldoc_description"]
+        if "_yamldoc_description" in schema.specials:
+            description = schema.specials["_yamldoc_description"]
 
-        # And do the printing
-        print("# " + title + "\n\n" + description + "\n")
+    with yamldoc.trace.span("render"):
+        if split:
+            result = yamldoc.render.render_pages(yaml, out, schema_path is not None, title, description)
+        elif isinstance(out, dict):
+            result = yamldoc.render.render_many(yaml, out, schema_path is not None, title, description)
+        else:
+            result = yamldoc.render.render(yaml, out, schema_path is not None, title, description, format)
 
-        # Build the table with top level yaml
-        print("| Parameter | Mandatory | Type | Default Value | Example | Information |")
-        print("| :-: | :-: | :-: | :-: | :-: | :-- |")
-        values = []
-        for value in yaml:
-            try:
-                if not value.isBase:
-                    values.append(value.to_markdown(schema=True))
-                    # print(value.to_markdown(schema=True))
-            except AttributeError:
-                pass
+    if validate:
+        with yamldoc.trace.span("validate"):
+            violations = yamldoc.validate.validate(yaml, schema)
+        if violations:
+            raise yamldoc.validate.ValidationError(violations, yaml_path if isinstance(yaml_path, str) else None)
+    return result
 
-        for v in sorted(values, key=lambda x: re.sub('[^A-Za-z]+', '', x).lower()):
-            print(v)
 
-        print("\n\n")
+def document_stream(yaml_path, out=None, char="#'", debug=False, schema_path=None, title="Configuration Parameters Reference",
+                    description="Any information about this page goes here.", format="markdown", validate=False,
+                    backend="python"):
+    '''
+    Document a stream of YAML documents separated by "---", rendering each one as soon as it has been parsed, so that only one document is held in memory and the first one is written right away. Documents are numbered in their titles and separated as the output format requires, e.g. by a horizontal rule in markdown.
 
-        for value in yaml:
-            try:
-                if value.isBase:
-                    print(value.to_markdown(schema=True))
-            except AttributeError:
-                pass
-    else:
-        print("# " + title + "\n\n" + description + "\n")
-
-        yaml = parse_yaml(yaml_path, char, debug)
-        # Build the table with top level yaml
-        print("| Key | Value | Information |")
-        print("| :-: | :-: | :-- |")
-        for value in yaml:
-            if not value.isBase:
-                print(value.to_markdown())
-
-        print("\n\n")
-
-        for value in yaml:
-            if value.isBase:
-                print(value.to_markdown())
+    Arguments:
+        yaml_path: Path to YAML file.
+        out: A text stream, a path or a dictionary from output formats to streams or paths, as for document. When not given, the output is returned instead.
+        char: Special character to identify comments to be included in YAMLDOC documentation.
+        debug: Print debug information
+        schema_path: Path to schema file, or a schema compiled with yamldoc.schema.compile_schema.
+        title: Title of markdown generated.
+        description: Description given below the title in markdown.
+        format: Output format, one of yamldoc.render.RENDERERS.
+        validate: Check the values of every document, see document.
+        backend: How the YAML is read, one of BACKENDS.
+
+    Returns:
+        The output when out is not given, otherwise nothing.
+
+    Raises:
+        yamldoc.validate.ValidationError: With validate, once every document has been written, when some values do not conform.
+    '''
+    schema = None
+    if schema_path is not None:
+        if isinstance(schema_path, yamldoc.schema.CompiledSchema):
+            schema = schema_path
+        else:
+            with yamldoc.trace.span("schema_compile"):
+                schema = yamldoc.schema.compile_schema(schema_path, debug)
+        title = schema.specials.get("_yamldoc_title", title)
+        description = schema.specials.get("_yamldoc_description", description)
+
+    buffer = None
+    if out is None:
+        buffer = io.StringIO()
+        out = buffer
+    sinks = dict(out) if isinstance(out, dict) else {format: out}
+
+    with contextlib.ExitStack() as stack:
+        for name, sink in sinks.items():
+            if isinstance(sink, str):
+                sinks[name] = stack.enter_context(open(sink, "w", buffering=yamldoc.render.BUFFER_SIZE))
+
+        documents = parse_documents(yaml_path, char, debug, backend=backend)
+        violations = []
+        number = 0
+        while True:
+            with yamldoc.trace.span("parse"):
+                yaml = next(documents, None)
+            if yaml is None:
+                break
+            number += 1
+
+            if schema is not None:
+                with yamldoc.trace.span("annotate"):
+                    schema.apply(yaml, debug)
+
+            with yamldoc.trace.span("render"):
+                if number > 1:
+                    for name, sink in sinks.items():
+                        sink.write(yamldoc.render.renderer(name).separator)
+                yamldoc.render.render_many(yaml, sinks, schema is not None, f"{title} ({number})", description)
+                for sink in sinks.values():
+                    sink.flush()
+
+            if validate:
+                with yamldoc.trace.span("validate"):
+                    violations.extend(yamldoc.validate.validate(yaml, schema))
+
+    if violations:
+        raise yamldoc.validate.ValidationError(violations, yaml_path if isinstance(yaml_path, str) else None)
+
+    if buffer is not None:
+        return buffer.getvalue()
+
+
+def main(yaml_path, char="#'", debug=False, schema_path=None, title="Configuration Parameters Reference",
+         description="Any information about this page goes here."):
+    '''
+    Takes a given YAML file and optionally an associated schema, parsing each for their key value pairings and reports the results as a markdown document.
+
+    Arguments:
+        yaml_path: Path to YAML file.
+        schema_path: Path to schema file. 
+        char: Special character to identify comments to be included in YAMLDOC documentation.
+        debug: Print debug information
+        title: Title of markdown generated.
+        description: Description given below the title in markdown.
+
+    Returns: 
+        Nothing, prints to stdout.
+    '''
+    document(yaml_path, sys.stdout, char, debug, schema_path, title, description)
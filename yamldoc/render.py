@@ -0,0 +1,723 @@
+import contextlib
+import html
+import io
+import os
+import re
+import textwrap
+
+import yamldoc.entries
+
+# Size of the buffer used when rendering straight to a file.
+BUFFER_SIZE = 1 << 16
+
+TITLE = "Configuration Parameters Reference"
+DESCRIPTION = "Any information about this page goes here."
+
+RST_SPECIAL = re.compile(r'([\\`*_|<>\[\]])')
+
+# The words a search index is keyed by.
+TERM = re.compile(r'[0-9a-z]+')
+
+# Characters dropped from headings to make their anchors.
+SLUG_SPECIAL = re.compile(r'[^\w\- ]')
+
+# Name of the page linking to the others in split output.
+INDEX_PAGE = "index"
+
+
+def rows(values, schema=False):
+    '''
+    The rows of a table in the order they are rendered: sorted by name
+    with a schema, in document order otherwise.
+
+    Arguments:
+        values: Entries and MetaEntries of one level of the tree.
+        schema: Render the columns filled in from a schema.
+    '''
+    if schema:
+        return sorted(values, key=yamldoc.entries.sort_key)
+    return values
+
+
+def walk(yaml, schema=False):
+    '''
+    Visit a parsed YAML tree once for any number of renderers: first the
+    table of top level values, then every MetaEntry in document order,
+    parents before their children.
+
+    Arguments:
+        yaml: List of yaml representations from parse_yaml.
+        schema: Render the columns filled in from a schema.
+
+    Yields:
+        Tuples of (meta_entry, path, rows), with None and "" for the top
+        level. The path is the dotted path of the MetaEntry.
+    '''
+    yield None, "", rows(yaml, schema)
+    stack = [("", iter(yaml))]
+    while stack:
+        prefix, values = stack[-1]
+        for value in values:
+            if value.isBase:
+                path = prefix + value.name
+                yield value, path, rows(value.entries, schema)
+                stack.append((path + ".", iter(value.entries)))
+                break
+        else:
+            stack.pop()
+
+
+class Renderer:
+    """
+    An output format. A renderer turns the parts of a parsed tree, as
+    visited by walk(), into chunks of text; it never changes the tree,
+    so several renderers can share one walk.
+
+    Subclasses override begin(), section() and end().
+    """
+
+    # Name of the format and extension of the files it is written to.
+    name = None
+    extension = None
+    # Written between the documents of a stream.
+    separator = ""
+
+    def __init__(self, schema=False):
+        """
+        Initialize the object.
+
+        Arguments:
+            schema: Render the columns filled in from a schema.
+        """
+        self.schema = schema
+
+    def __repr__(self):
+        """
+        Returns a print representation.
+        """
+        return f'yamldoc {self.name} renderer'
+
+    def headers(self):
+        '''
+        Names of the columns of every table.
+        '''
+        if self.schema:
+            return ["Parameter", "Mandatory", "Type", "Default", "Example", "Information"]
+        return ["Key", "Value", "Information"]
+
+    def begin(self, title, description):
+        '''
+        Yield the start of the document.
+        '''
+        return ()
+
+    def section(self, meta_entry, path, rows):
+        '''
+        Yield the table of one level of the tree.
+
+        Arguments:
+            meta_entry: The MetaEntry of the level, or None for the top.
+            path: Dotted path of the MetaEntry, "" for the top.
+            rows: Entries and MetaEntries of the level, in order.
+        '''
+        return ()
+
+    def end(self):
+        '''
+        Yield the end of the document.
+        '''
+        return ()
+
+
+class MarkdownRenderer(Renderer):
+    """
+    Markdown pipe tables, one section per MetaEntry.
+    """
+
+    name = "markdown"
+    extension = ".md"
+    separator = "---\n\n"
+    # (Optional) Where the links to MetaEntries point, by the id of the
+    # MetaEntry, for output split over several pages.
+    links = None
+
+    def begin(self, title, description):
+        yield "# " + title + "\n\n" + description + "\n\n"
+
+    def section(self, meta_entry, path, rows):
+        if meta_entry is None:
+            # Build the table with top level yaml
+            if self.schema:
+                yield "| Parameter | Mandatory | Type | Default Value | Example | Information |\n"
+                yield "| :-: | :-: | :-: | :-: | :-: | :-- |\n"
+            else:
+                yield "| Key | Value | Information |\n"
+                yield "| :-: | :-: | :-- |\n"
+            for value in rows:
+                yield self.row(value) + "\n"
+            yield "\n\n\n"
+        else:
+            yield from self.iter_section(meta_entry, rows)
+            yield "\n"
+
+    def iter_section(self, meta_entry, rows):
+        '''
+        Yield the section of a MetaEntry: its heading, comments and table.
+        '''
+        if self.schema:
+            yield f'## {meta_entry.name}\n\n{meta_entry.information(True)}\n\n'
+            yield "### Member variables:\n\n"
+
+            yield "| Parameter | Mandatory | Type | Default | Example | Information |\n"
+            yield "| :-: | :-: | :-: | :-: | :-: | :-- |\n"
+        else:
+            yield f'## `{meta_entry.name}`\n\n{meta_entry.meta}\n\n'
+            yield "### Member variables:\n\n"
+
+            yield "| Key | Value | Information |\n"
+            yield "| :-: | :-: | :-- |\n"
+
+        for entry in rows:
+            yield self.row(entry) + "\n"
+
+        yield "\n\n"
+
+    def row(self, entry):
+        '''
+        The table row of an Entry, or of the link to a MetaEntry.
+        '''
+        if entry.isBase:
+            entry = entry.link_entry(self.links.get(id(entry)) if self.links else None)
+        if self.schema:
+            key, mandatory, vartype, default, example, information = entry.cells(True)
+            cells = [key, mandatory, vartype, _markdown_lines(default), _markdown_lines(example.replace(" ", "&nbsp;")),
+                     information.replace(" ", "&nbsp;")]
+            return "| " + " | ".join(_markdown_escape(cell) for cell in cells) + " |"
+        else:
+            m = '<br />'.join(textwrap.wrap(entry.meta, width=50))
+            key = _markdown_escape(entry.key)
+            value = _markdown_escape(_markdown_lines(entry.value.replace(" ", "&nbsp;")))
+            return f'| `{key}` | `{value}` | {_markdown_escape(m.replace(" ", "&nbsp;"))} |'
+
+
+class HTMLRenderer(Renderer):
+    """
+    An HTML fragment with one table per level, ready to be embedded in a
+    page. Sections are linked to by their dotted path.
+    """
+
+    name = "html"
+    extension = ".html"
+    separator = "<hr>\n"
+
+    def begin(self, title, description):
+        yield f'<h1>{html.escape(title)}</h1>\n<p>{html.escape(description)}</p>\n'
+
+    def section(self, meta_entry, path, rows):
+        if meta_entry is not None:
+            yield f'<h2 id="{html.escape(path)}">{html.escape(meta_entry.name)}</h2>\n'
+            information = meta_entry.information(self.schema)
+            if information:
+                yield f'<p>{html.escape(information)}</p>\n'
+        yield "<table>\n<thead><tr>" + "".join(f"<th>{header}</th>" for header in self.headers()) + "</tr></thead>\n<tbody>\n"
+        prefix = path + "." if path else ""
+        for entry in rows:
+            cells = [_html_lines(cell) for cell in entry.cells(self.schema)]
+            if entry.isBase:
+                cells[0] = f'<a href="#{html.escape(prefix + entry.name)}">{cells[0]}</a>'
+            elif not self.schema:
+                cells[0] = f"<code>{cells[0]}</code>"
+                if cells[1]:
+                    cells[1] = f"<code>{cells[1]}</code>"
+            yield "<tr>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>\n"
+        yield "</tbody>\n</table>\n"
+
+
+class RSTRenderer(Renderer):
+    """
+    reStructuredText list tables. Headings are written as rubrics rather
+    than titles, so the output can be placed anywhere in a document
+    without disturbing its sections.
+    """
+
+    name = "rst"
+    extension = ".rst"
+    separator = "----\n\n"
+
+    def __init__(self, schema=False, target="yamldoc-"):
+        """
+        Initialize the object.
+
+        Arguments:
+            schema: Render the columns filled in from a schema.
+            target: Prefix of the link targets of the sections, unique
+                within a document.
+        """
+        super().__init__(schema)
+        self.target = target
+
+    def begin(self, title, description):
+        if title:
+            yield f".. rubric:: {_rst_escape(title)}\n\n"
+        if description:
+            yield f"{_rst_escape(description)}\n\n"
+
+    def section(self, meta_entry, path, rows):
+        if meta_entry is not None:
+            yield f".. rubric:: {_rst_escape(meta_entry.name)}\n   :name: {self.target}{path}\n\n"
+            information = meta_entry.information(self.schema)
+            if information:
+                yield f"{_rst_escape(information)}\n\n"
+
+        prefix = self.target + path + "." if path else self.target
+        lines = [".. list-table::", "   :header-rows: 1", ""]
+        lines += _rst_row(self.headers())
+        for value in rows:
+            cells = value.cells(self.schema)
+            if value.isBase:
+                first = f"`{_rst_escape(value.name)} <{prefix}{value.name}_>`_"
+            else:
+                first = _rst_literal(cells[0])
+            if self.schema:
+                rest = [_rst_lines(cell, _rst_escape) for cell in cells[1:]]
+            else:
+                rest = [_rst_lines(cells[1], _rst_literal), _rst_lines(cells[2], _rst_escape)]
+            lines += _rst_row([first] + rest)
+        lines.append("")
+        yield "\n".join(lines) + "\n"
+
+
+class JSONRenderer(Renderer):
+    """
+    A JSON document for search indexes and other tools, with the raw
+    values and the directives of every entry:
+
+        {"title": ..., "description": ..., "sections": [
+            {"path": "", "name": null, "description": null, "entries": [...]},
+            ...]}
+    """
+
+    name = "json"
+    extension = ".json"
+    # One line per document of a stream.
+    separator = ""
+
+    def __init__(self, schema=False):
+        """
+        Initialize the object.
+
+        Arguments:
+            schema: Render the columns filled in from a schema.
+        """
+        super().__init__(schema)
+        self._first = True
+
+    def begin(self, title, description):
+        self._first = True
+        yield f'{{"title": {_json(title)}, "description": {_json(description)}, "sections": ['
+
+    def section(self, meta_entry, path, rows):
+        prefix = path + "." if path else ""
+        section = {
+            "path": path,
+            "name": None if meta_entry is None else meta_entry.name,
+            "description": None if meta_entry is None else meta_entry.description,
+            "entries": [self.entry(value, prefix) for value in rows],
+        }
+        yield ("" if self._first else ", ") + _json(section)
+        self._first = False
+
+    def end(self):
+        yield "]}\n"
+
+    def entry(self, value, prefix=""):
+        '''
+        The JSON object of one row.
+        '''
+        if value.isBase:
+            return {
+                "path": prefix + value.name,
+                "key": value.name,
+                "section": True,
+                "description": value.description,
+                "commented": value.is_commented,
+                "origin": value.origin,
+            }
+        return {
+            "path": prefix + value.key,
+            "key": value.key,
+            "value": value.value,
+            "description": value.description,
+            "type": value.declared_type or value.type,
+            "mandatory": value.mandatory,
+            "examples": list(value.examples),
+            "enum": getattr(value, "enum", None),
+            "commented": value.is_commented,
+            "origin": value.origin,
+        }
+
+
+class IndexRenderer(Renderer):
+    """
+    A shard of a client-side search index: an inverted index from the
+    words of the key paths, comments, types and enum values of a file to
+    its entries, built during the same walk as the other formats.
+
+        {"title": ..., "entries": [[path, type, description], ...],
+         "terms": {term: [entry numbers], ...}}
+
+    Terms are lowercase words, plus every key as a whole, and are sorted
+    so that a file that did not change gives the same shard.
+    """
+
+    name = "index"
+    extension = ".index.json"
+    # One line per document of a stream.
+    separator = ""
+
+    def __init__(self, schema=False):
+        """
+        Initialize the object.
+
+        Arguments:
+            schema: Render the columns filled in from a schema.
+        """
+        super().__init__(schema)
+        self._title = None
+        self._entries = []
+        self._terms = {}
+
+    def begin(self, title, description):
+        self._title = title
+        self._entries = []
+        self._terms = {}
+        return ()
+
+    def section(self, meta_entry, path, rows):
+        prefix = path + "." if path else ""
+        for value in rows:
+            key = value.name if value.isBase else value.key
+            if value.isBase:
+                var_type = value.type
+                enum = None
+            else:
+                var_type = value.declared_type or value.type
+                enum = getattr(value, "enum", None)
+            if isinstance(var_type, list):
+                var_type = ", ".join(var_type)
+            description = value.description
+            number = len(self._entries)
+            self._entries.append([prefix + key, var_type, description])
+
+            words = {key.lower()}
+            words.update(TERM.findall(prefix.lower() + key.lower()))
+            words.update(TERM.findall(description.lower()))
+            if var_type:
+                words.update(TERM.findall(var_type.lower()))
+            if isinstance(enum, list):
+                for item in enum:
+                    words.update(TERM.findall(str(item).lower()))
+            for word in words:
+                self._terms.setdefault(word, []).append(number)
+        return ()
+
+    def end(self):
+        import json
+        terms = {term: self._terms[term] for term in sorted(self._terms)}
+        yield json.dumps({"title": self._title, "entries": self._entries, "terms": terms},
+                         ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+# The output formats by name.
+RENDERERS = {renderer.name: renderer for renderer in (MarkdownRenderer, HTMLRenderer, RSTRenderer, JSONRenderer,
+                                                      IndexRenderer)}
+
+
+def renderer(format, schema=False):
+    '''
+    Create the renderer of an output format.
+
+    Arguments:
+        format: A name from RENDERERS, or a Renderer, returned as is.
+        schema: Render the columns filled in from a schema.
+    '''
+    if isinstance(format, Renderer):
+        return format
+    try:
+        return RENDERERS[format](schema)
+    except KeyError:
+        raise ValueError(f"Unknown output format: {format}") from None
+
+
+def iter_render(renderer, yaml, title=TITLE, description=DESCRIPTION):
+    '''
+    Yield the document of one renderer piece by piece.
+
+    Arguments:
+        renderer: A Renderer.
+        yaml: List of yaml representations from parse_yaml.
+        title: Title of the document.
+        description: Description given below the title.
+    '''
+    yield from renderer.begin(title, description)
+    for meta_entry, path, values in walk(yaml, renderer.schema):
+        yield from renderer.section(meta_entry, path, values)
+    yield from renderer.end()
+
+
+def iter_markdown(yaml, schema=False, title=TITLE, description=DESCRIPTION):
+    '''
+    Yield the markdown document for a parsed YAML file piece by piece.
+
+    Arguments:
+        yaml: List of yaml representations from parse_yaml.
+        schema: Render the columns filled in from a schema.
+        title: Title of markdown generated.
+        description: Description given below the title in markdown.
+    '''
+    return iter_render(MarkdownRenderer(schema), yaml, title, description)
+
+
+def iter_header(yaml, schema=False, title=TITLE, description=DESCRIPTION):
+    '''
+    Yield the title, description and table of top level values of the
+    markdown document.
+
+    Arguments:
+        yaml: List of yaml representations from parse_yaml.
+        schema: Render the columns filled in from a schema.
+        title: Title of markdown generated.
+        description: Description given below the title in markdown.
+    '''
+    markdown = MarkdownRenderer(schema)
+    yield from markdown.begin(title, description)
+    yield from markdown.section(None, "", rows(yaml, schema))
+
+
+def iter_section(meta_entry, schema=False):
+    '''
+    Yield the section of the markdown document for one MetaEntry.
+
+    Arguments:
+        meta_entry: A MetaEntry from the parsed YAML.
+        schema: Render the columns filled in from a schema.
+    '''
+    return MarkdownRenderer(schema).section(meta_entry, meta_entry.name, rows(meta_entry.entries, schema))
+
+
+def render(yaml, out=None, schema=False, title=TITLE, description=DESCRIPTION, format="markdown"):
+    '''
+    Render a parsed YAML file as a markdown document, or in another
+    output format.
+
+    Arguments:
+        yaml: List of yaml representations from parse_yaml.
+        out: A text stream or a path to write to. When not given,
+            the document is returned instead.
+        schema: Render the columns filled in from a schema.
+        title: Title of markdown generated.
+        description: Description given below the title in markdown.
+        format: Name of the output format (see RENDERERS) or a Renderer.
+
+    Returns:
+        The document when out is not given, otherwise nothing.
+    '''
+    chunks = iter_render(renderer(format, schema), yaml, title, description)
+
+    if out is None:
+        buffer = io.StringIO()
+        buffer.writelines(chunks)
+        return buffer.getvalue()
+
+    if isinstance(out, str):
+        with open(out, "w", buffering=BUFFER_SIZE) as stream:
+            stream.writelines(chunks)
+    else:
+        out.writelines(chunks)
+
+
+def render_many(yaml, outputs, schema=False, title=TITLE, description=DESCRIPTION):
+    '''
+    Render a parsed YAML file in several output formats at once, walking
+    the tree a single time.
+
+    Arguments:
+        yaml: List of yaml representations from parse_yaml.
+        outputs: Dictionary from an output format name (or a Renderer)
+            to the text stream or path it is written to.
+        schema: Render the columns filled in from a schema.
+        title: Title of the documents.
+        description: Description given below the title.
+    '''
+    with contextlib.ExitStack() as stack:
+        sinks = []
+        for format, out in outputs.items():
+            if isinstance(out, str):
+                out = stack.enter_context(open(out, "w", buffering=BUFFER_SIZE))
+            sinks.append((renderer(format, schema), out))
+
+        for output, out in sinks:
+            out.writelines(output.begin(title, description))
+        for meta_entry, path, values in walk(yaml, schema):
+            for output, out in sinks:
+                out.writelines(output.section(meta_entry, path, values))
+        for output, out in sinks:
+            out.writelines(output.end())
+
+
+def slug(text):
+    '''
+    The anchor of a markdown heading, made as GitHub and most markdown
+    tools make it: lower case, with punctuation dropped and spaces turned
+    into dashes.
+    '''
+    return SLUG_SPECIAL.sub("", text.strip().lower()).replace(" ", "-")
+
+
+class Slugs:
+    """
+    The slugs used so far on a page or in a directory. Repeated slugs get
+    "-1", "-2", ... appended in turn, as markdown tools number repeated
+    headings, and every slug is found with a couple of dictionary lookups
+    however many share its name.
+    """
+
+    __slots__ = ("_used", "_counts")
+
+    def __init__(self):
+        """
+        Initialize the object.
+        """
+        self._used = set()
+        # The last number appended to each slug.
+        self._counts = {}
+
+    def __repr__(self):
+        """
+        Returns a print representation.
+        """
+        return f'yamldoc slugs [{len(self._used)} used]'
+
+    def add(self, text):
+        '''
+        Make the slug of a text, unique among the ones added before.
+
+        Arguments:
+            text: Heading or name the slug is made from.
+
+        Returns:
+            The slug, never empty.
+        '''
+        base = slug(text) or "section"
+        unique = base
+        if base in self._used:
+            count = self._counts.get(base, 0)
+            while unique in self._used:
+                count += 1
+                unique = f"{base}-{count}"
+            self._counts[base] = count
+        self._used.add(unique)
+        return unique
+
+
+def render_pages(yaml, out_dir, schema=False, title=TITLE, description=DESCRIPTION):
+    '''
+    Render a parsed YAML file as markdown split over several pages: an
+    index page with the title, description and table of top level
+    values, and one page per top level MetaEntry holding its section and
+    those of all its children. Links to sections point to their page,
+    or to the anchor of their heading on it, so a page is built and read
+    at the cost of its own section only.
+
+    Arguments:
+        yaml: List of yaml representations from parse_yaml.
+        out_dir: Directory the pages are written to, created if needed.
+        schema: Render the columns filled in from a schema.
+        title: Title of the index page.
+        description: Description given below the title.
+
+    Returns:
+        List of the paths written, the index page first.
+    '''
+    os.makedirs(out_dir, exist_ok=True)
+    output = MarkdownRenderer(schema)
+    names = Slugs()
+    names.add(INDEX_PAGE)
+    pages = [(value, names.add(value.name) + output.extension) for value in yaml if value.isBase]
+
+    output.links = {id(value): name for value, name in pages}
+    index = os.path.join(out_dir, INDEX_PAGE + output.extension)
+    with open(index, "w", buffering=BUFFER_SIZE) as out:
+        out.writelines(output.begin(title, description))
+        out.writelines(output.section(None, "", rows(yaml, schema)))
+    written = [index]
+
+    for meta_entry, name in pages:
+        sections = [(meta_entry, meta_entry.name, rows(meta_entry.entries, schema))]
+        children = walk(meta_entry.entries, schema)
+        next(children)
+        sections += [(value, meta_entry.name + "." + path, values) for value, path, values in children]
+
+        # Headings are numbered in the order they appear, as the anchors
+        # of the markdown tools reading the page are.
+        anchors = Slugs()
+        output.links = {}
+        for value, _, _ in sections:
+            output.links.setdefault(id(value), "#" + anchors.add(value.name))
+            anchors.add("Member variables:")
+
+        path = os.path.join(out_dir, name)
+        with open(path, "w", buffering=BUFFER_SIZE) as out:
+            out.write(f"[{title}]({INDEX_PAGE}{output.extension})\n\n")
+            for value, section_path, values in sections:
+                out.writelines(output.section(value, section_path, values))
+        written.append(path)
+    return written
+
+
+def _markdown_lines(text):
+    return text.replace("\n", "<br>")
+
+
+def _markdown_escape(cell):
+    # A pipe ends a table cell, even inside backticks.
+    return str(cell).replace("|", "\\|")
+
+
+def _html_lines(text):
+    return html.escape(str(text)).replace("\n", "<br>")
+
+
+def _rst_row(cells):
+    lines = []
+    for i, cell in enumerate(cells):
+        bullet = "   * - " if i == 0 else "     - "
+        cell_lines = cell.split("\n")
+        if len(cell_lines) > 1:
+            cell_lines = ["| " + line for line in cell_lines]
+        lines.append(bullet + cell_lines[0])
+        lines += ["       " + line for line in cell_lines[1:]]
+    return lines
+
+
+def _rst_lines(text, format):
+    return "\n".join(format(line) for line in str(text).split("\n"))
+
+
+def _rst_escape(text):
+    return RST_SPECIAL.sub(r'\\\1', str(text))
+
+
+def _rst_literal(text):
+    text = text.strip()
+    if not text:
+        return ""
+    if "``" in text:
+        return _rst_escape(text)
+    return "``" + text + "``"
+
+
+def _json(value):
+    # json is only loaded for the formats that need it.
+    import json
+    return json.dumps(value, ensure_ascii=False)
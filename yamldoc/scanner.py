@@ -0,0 +1,177 @@
+import codecs
+import mmap
+import os
+import re
+
+# Kinds of the lines returned by Source.lines.
+MARKER = "marker"
+COMMENT = "comment"
+ITEM = "item"
+KEY = "key"
+TEXT = "text"
+
+# Number of bytes decoded at a time. Only one chunk of a large input is
+# held as text at any moment.
+CHUNK_SIZE = 1 << 20
+
+# The start of a line holding a top level key: no indentation, and not
+# a comment, list item, document marker, directive or flow collection.
+TOP_LEVEL_KEY = re.compile(rb'\n(?=[^\s#\-.%{}\[\]][^\n]*:)')
+
+
+class Source:
+    """
+    The contents of a YAML input as one buffer.
+
+    Files are memory mapped, so even very large inputs are never copied
+    into memory as a whole; bytes, memoryviews and text streams are used
+    as they are.
+    """
+
+    def __init__(self, source, encoding="utf-8"):
+        """
+        Initialize the object.
+
+        Arguments:
+            source: Path to a file, bytes, a memoryview or a stream
+                opened in text or binary mode.
+            encoding: Encoding of the text.
+        """
+        self.encoding = encoding
+        self._map = None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.buffer = source
+        elif hasattr(source, "read"):
+            data = source.read()
+            self.buffer = data.encode(encoding) if isinstance(data, str) else data
+        else:
+            with open(os.fspath(source), "rb") as f:
+                try:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (ValueError, OSError):
+                    # Empty files and pipes cannot be mapped.
+                    self.buffer = f.read()
+                else:
+                    self.buffer = self._map
+
+    def __repr__(self):
+        """
+        Returns a print representation.
+        """
+        return f'YAML source of {len(self.buffer)} bytes'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        '''
+        Release the memory map, if any.
+        '''
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def lines(self, char="#'", first_line=1):
+        '''
+        Classify the lines of the buffer, skipping blank ones.
+
+        The buffer is decoded and split a chunk at a time, so the work
+        per line is a strip and a look at its first characters.
+
+        Arguments:
+            char: A character string used to identify yamldoc blocks.
+            first_line: Number of the first line of the buffer.
+
+        Yields:
+            Tuples of (kind, indent, text, line), where kind is one of
+            MARKER, COMMENT, ITEM, KEY or TEXT, indent is the number of
+            leading spaces, text is the line without surrounding
+            whitespace and line its number.
+        '''
+        decoder = codecs.getincrementaldecoder(self.encoding)()
+        size = len(self.buffer)
+        carry = ""
+        number = first_line
+        for start in range(0, size, CHUNK_SIZE):
+            end = start + CHUNK_SIZE
+            lines = (carry + decoder.decode(self.buffer[start:end], end >= size)).split("\n")
+            # The last line may continue in the next chunk.
+            carry = lines.pop()
+            yield from classify(lines, char, number)
+            number += len(lines)
+        yield from classify([carry], char, number)
+
+
+def boundaries(buffer, parts, char="#'"):
+    '''
+    Split a buffer into about the given number of parts that can be
+    parsed independently. Every part but the first starts with a top
+    level key, or with the yamldoc comments right above one, so that
+    no comment block, nested value, list or block scalar is cut in two.
+
+    Arguments:
+        buffer: The contents of a YAML file, as bytes or a memory map.
+        parts: Number of parts wanted.
+        char: A character string used to identify yamldoc blocks.
+
+    Returns:
+        Sorted list of offsets, starting with 0 and ending with the
+        length of the buffer. Inputs with few top level keys give fewer
+        parts.
+    '''
+    size = len(buffer)
+    marker = char.encode("utf-8")
+    offsets = [0]
+    for part in range(1, parts):
+        match = TOP_LEVEL_KEY.search(buffer, max(size * part // parts, offsets[-1] + 1) - 1)
+        if match is None:
+            break
+        if buffer[match.end():match.end() + len(marker)] == marker:
+            continue
+        # Take the blank lines and yamldoc comments above the key along.
+        position = match.end()
+        while position > offsets[-1] + 1:
+            start = buffer.rfind(b"\n", 0, position - 1) + 1
+            line = buffer[start:position]
+            if not (line.startswith(marker) or not line.strip()):
+                break
+            position = start
+        if position > offsets[-1]:
+            offsets.append(position)
+    offsets.append(size)
+    return offsets
+
+
+def classify(lines, char="#'", first_line=1):
+    '''
+    Classify lines of text, skipping blank ones.
+
+    Arguments:
+        lines: Lines without their line breaks.
+        char: A character string used to identify yamldoc blocks.
+        first_line: Number of the first line.
+
+    Yields:
+        Tuples of (kind, indent, text, line), as Source.lines.
+    '''
+    for number, line in enumerate(lines, first_line):
+        text = line.strip()
+        if not text:
+            continue
+        indent = len(line) - len(line.lstrip(" "))
+        first = text[0]
+        if text.startswith(char):
+            kind = MARKER
+        elif first == "#":
+            kind = COMMENT
+        elif first == "-" and (len(text) == 1 or text[1] == " "):
+            kind = ITEM
+        elif ":" in text:
+            kind = KEY
+        else:
+            kind = TEXT
+        yield kind, indent, text, number
@@ -0,0 +1,497 @@
+import functools
+import json
+import os
+import re
+from types import MappingProxyType
+
+import yamldoc.entries
+import yamldoc.parser
+import yamldoc.trace
+
+# Keys of a property that are copied onto the matching entries.
+EXTRAS = ("enum", "plain_text")
+
+# Top level keys reported as specials, and the name they are reported under.
+SPECIALS = {
+    "$schema": "schema",
+    "_yamldoc_title": "_yamldoc_title",
+    "_yamldoc_description": "_yamldoc_description",
+    "description": "description",
+}
+
+FLOW_SEQUENCE = re.compile(r'^\[(.*)\]$')
+
+# Keywords combining several subschemas. Their properties are merged and
+# their types are offered as alternatives.
+COMPOSITION = ("allOf", "anyOf", "oneOf")
+
+# Number of schema files kept loaded for $ref.
+FRAGMENT_CACHE_SIZE = 512
+
+
+class CompiledSchema:
+    """
+    An immutable, preprocessed schema that can be applied to any number
+    of parsed YAML files.
+
+    Types and extras are indexed by the full dotted path of the key they
+    describe, with "base" level keys at the top (e.g. "two.entry").
+    """
+
+    __slots__ = ("_types", "_extras", "_specials", "_files")
+
+    def __init__(self, types, extras, specials, files=()):
+        """
+        Initialize the object.
+
+        Arguments:
+            types: Dictionary from key path to the declared type, or a
+                tuple of types when several are allowed.
+            extras: Dictionary from key path to a dictionary of extras.
+            specials: Dictionary of the yamldoc specials of the schema.
+            files: Paths of the other schema files it was compiled from
+                through $ref.
+        """
+        object.__setattr__(self, "_types", dict(types))
+        # Lists such as enums are stored as tuples, so that no file can
+        # change them for the next.
+        object.__setattr__(self, "_extras", {path: MappingProxyType({key: tuple(value) if isinstance(value, list) else value
+                                                                     for key, value in extra.items()})
+                                             for path, extra in extras.items()})
+        object.__setattr__(self, "_specials", dict(specials))
+        object.__setattr__(self, "_files", tuple(files))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledSchema is immutable")
+
+    def __reduce__(self):
+        return (CompiledSchema, (self._types, {path: dict(extra) for path, extra in self._extras.items()}, self._specials,
+                                 self._files))
+
+    def __eq__(self, other):
+        if not isinstance(other, CompiledSchema):
+            return NotImplemented
+        return (self._types, self._extras, self._specials) == (other._types, other._extras, other._specials)
+
+    def __repr__(self):
+        """
+        Returns a print representation.
+        """
+        return f'Compiled schema with {len(self._types)} types and {len(self._extras)} extras'
+
+    @property
+    def types(self):
+        return MappingProxyType(self._types)
+
+    @property
+    def extras(self):
+        return MappingProxyType(self._extras)
+
+    @property
+    def specials(self):
+        return MappingProxyType(self._specials)
+
+    @property
+    def files(self):
+        """
+        Absolute paths of the schema files referenced with $ref, which
+        the compiled schema depends on besides its own file.
+        """
+        return self._files
+
+    def sections(self):
+        """
+        The schema in the format returned by parse_schema: types and
+        extras grouped by the path of their parent, "base" for the top.
+
+        Returns:
+            Tuple of (schema, specials, extras).
+        """
+        types = {path: list(var_type) if isinstance(var_type, tuple) else var_type for path, var_type in self._types.items()}
+        extras = {path: {key: list(value) if isinstance(value, tuple) else value for key, value in extra.items()}
+                  for path, extra in self._extras.items()}
+        return _group(types), dict(self._specials), _group(extras)
+
+    def apply(self, yaml, debug=False, index=None):
+        """
+        Add the types and extras of the schema to a parsed YAML tree, in
+        place.
+
+        Arguments:
+            yaml: List of yaml representations from parse_yaml.
+            debug: Print debug information
+            index: (Optional) Path index of the yaml from yamldoc.entries.index_paths.
+        """
+        if index is None:
+            index = yamldoc.entries.index_paths(yaml)
+
+        for path, var_type in self._types.items():
+            entries = index.get(path)
+            if not entries:
+                continue
+            if debug: yamldoc.trace.debug(f"Setting type of {path}")
+            if isinstance(var_type, tuple):
+                var_type = list(var_type)
+            for entry in entries:
+                entry.type = var_type
+                entry.has_schema = True
+            parent = path.rpartition(".")[0]
+            for meta_entry in index.get(parent, ()):
+                meta_entry.has_schema = True
+
+        for path, extra in self._extras.items():
+            for entry in index.get(path, ()):
+                if debug: yamldoc.trace.debug(f"Setting extras of {path}")
+                for key, value in extra.items():
+                    # Enums and the like only apply to scalars; a
+                    # mapping at the path is left to validation.
+                    if entry.isBase and key in EXTRAS:
+                        continue
+                    # Every entry gets its own copy of an enum.
+                    setattr(entry, key, list(value) if isinstance(value, tuple) else value)
+
+
+def compile_schema(source, debug=False, base=None):
+    '''
+    Compile a schema once so it can be applied to many YAML files.
+
+    References ($ref) to other files and to "#/definitions/..." pointers
+    are followed, and the subschemas of allOf, anyOf and oneOf are
+    merged. Referenced files are loaded once per process and shared by
+    every schema using them. A property referring back to one of its
+    enclosing definitions is documented without its children, while
+    references that only lead to each other raise a ValueError.
+
+    Arguments:
+        source: Path to a schema file, written in YAML or JSON, its
+            contents as bytes, or an already loaded schema dictionary.
+            References in contents and dictionaries are relative to
+            base.
+        debug: Print debug information
+        base: (Optional) Directory references in contents and
+            dictionaries are relative to, the current directory by default.
+
+    Returns:
+        A CompiledSchema.
+    '''
+    if isinstance(source, dict):
+        document = source
+        root = ""
+    elif isinstance(source, (bytes, bytearray)):
+        document = loads_schema(source.decode("utf-8"))
+        root = ""
+    else:
+        root = os.path.abspath(source)
+        document = fragment(root)
+    files = set()
+
+    types = {}
+    extras = {}
+    specials = {}
+    for key, name in SPECIALS.items():
+        if key in document:
+            specials[name] = document[key]
+
+    directory = os.path.dirname(root) if root else base or ""
+    node, ancestors = _resolve(document, document, root, directory, frozenset(), files)
+    stack = [("", node, ancestors)]
+    while stack:
+        prefix, node, ancestors = stack.pop()
+        properties = node.get("properties")
+        if not isinstance(properties, dict):
+            continue
+        for name, prop in properties.items():
+            prop, prop_ancestors = _resolve(prop, document, root, directory, ancestors, files)
+            if not isinstance(prop, dict):
+                continue
+            path = prefix + name
+            var_type = prop.get("type")
+            if isinstance(var_type, list):
+                types[path] = tuple(var_type)
+            elif var_type is not None and var_type != "object":
+                types[path] = var_type
+            extra = {key: prop[key] for key in EXTRAS if key in prop}
+            if extra:
+                extras[path] = extra
+            if debug: yamldoc.trace.debug(f"Compiled {path}")
+            if prop_ancestors is None:
+                if debug: yamldoc.trace.debug(f"{path} is recursive")
+                continue
+            stack.append((path + ".", prop, prop_ancestors))
+
+    files.discard(root)
+    return CompiledSchema(types, extras, specials, sorted(files))
+
+
+def file_stats(paths):
+    '''
+    The modification time and size of schema files, such as the files
+    of a CompiledSchema, to tell whether any of them changed since.
+
+    Arguments:
+        paths: Paths of the files.
+
+    Returns:
+        List of (path, mtime_ns, size) tuples, or (path, None) for files
+        that cannot be read.
+    '''
+    stats = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stats.append((path, None))
+        else:
+            stats.append((path, stat.st_mtime_ns, stat.st_size))
+    return stats
+
+
+def fragment(path):
+    '''
+    Load a schema file referenced with $ref. Files are loaded once per
+    process, and again only when they change on disk; the $ref inside
+    them are made absolute so they can be followed from anywhere.
+
+    Arguments:
+        path: Absolute path to the schema file.
+
+    Returns:
+        The loaded schema, shared between callers: it must not be modified.
+    '''
+    stat = os.stat(path)
+    return _fragment(path, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def _fragment(path, mtime_ns, size):
+    document = load_schema(path)
+    directory = os.path.dirname(path)
+    stack = [document]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str) and "://" not in ref:
+                file, _, pointer = ref.partition("#")
+                node["$ref"] = (os.path.normpath(os.path.join(directory, file)) if file else path) + "#" + pointer
+            stack.extend(node.values())
+    return document
+
+
+def _target(ref, document, root, directory):
+    '''
+    Find the node a $ref points to, with files relative to directory.
+
+    Returns:
+        Tuple of (node, the file and pointer identifying it).
+    '''
+    if not isinstance(ref, str) or "://" in ref:
+        raise ValueError(f"Unsupported schema reference: {ref}")
+    file, _, pointer = ref.partition("#")
+    if file:
+        file = os.path.abspath(os.path.join(directory, file))
+        if file != root:
+            document = fragment(file)
+    else:
+        file = root
+
+    node = document
+    for part in pointer.split("/")[1:]:
+        part = part.replace("~1", "/").replace("~0", "~")
+        try:
+            node = node[int(part)] if isinstance(node, list) else node[part]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise ValueError(f"Unresolvable schema reference: {ref}") from None
+    return node, (file, pointer)
+
+
+def _resolve(node, document, root, directory, ancestors, files):
+    '''
+    Follow the $ref of a schema node and merge its allOf, anyOf and
+    oneOf subschemas.
+
+    Arguments:
+        node: A node of a loaded schema.
+        document: The schema being compiled, for references without a file.
+        root: Absolute path of that schema, "" when it has none.
+        directory: Directory relative references are resolved against.
+        ancestors: References followed by the enclosing properties.
+        files: Set the referenced files are added to.
+
+    Returns:
+        Tuple of (resolved node, references followed to reach it). The
+        references are None when the node refers back to an enclosing
+        one, and its properties must not be expanded again.
+    '''
+    followed = []
+    while isinstance(node, dict) and "$ref" in node:
+        target, key = _target(node["$ref"], document, root, directory)
+        if key in followed:
+            chain = " -> ".join(f"{file}#{pointer}" for file, pointer in followed + [key])
+            raise ValueError(f"Schema reference cycle: {chain}")
+        followed.append(key)
+        files.add(key[0])
+        siblings = {k: v for k, v in node.items() if k != "$ref"}
+        if key in ancestors:
+            # A recursive structure: keep its type, not its properties.
+            node = {k: v for k, v in target.items() if k not in ("properties", "$ref") + COMPOSITION} if isinstance(target, dict) else target
+            return ({**node, **siblings} if isinstance(node, dict) else node), None
+        node = {**target, **siblings} if isinstance(target, dict) else target
+    if followed:
+        ancestors = ancestors.union(followed)
+
+    if not isinstance(node, dict) or not any(keyword in node for keyword in COMPOSITION):
+        return node, ancestors
+
+    merged = {k: v for k, v in node.items() if k not in COMPOSITION}
+    properties = dict(merged.get("properties") or {})
+    alternatives = []
+    for keyword in COMPOSITION:
+        subschemas = node.get(keyword)
+        if not isinstance(subschemas, list):
+            continue
+        for subschema in subschemas:
+            subschema, _ = _resolve(subschema, document, root, directory, ancestors, files)
+            if not isinstance(subschema, dict):
+                continue
+            for name, prop in (subschema.get("properties") or {}).items():
+                properties.setdefault(name, prop)
+            var_type = subschema.get("type")
+            for var_type in var_type if isinstance(var_type, list) else [var_type]:
+                if var_type is not None and var_type not in alternatives:
+                    alternatives.append(var_type)
+            for key in EXTRAS + ("description",):
+                if key in subschema:
+                    merged.setdefault(key, subschema[key])
+    if properties:
+        merged["properties"] = properties
+    if "type" not in merged and alternatives:
+        merged["type"] = alternatives[0] if len(alternatives) == 1 else alternatives
+    return merged, ancestors
+
+
+def load_schema(path_to_file):
+    '''
+    Load a schema file into nested dictionaries and lists. JSON schemas
+    are read with the json module; anything else is read as YAML.
+
+    Arguments:
+        path_to_file: Path to schema file.
+    '''
+    with open(path_to_file) as f:
+        text = f.read()
+
+    if path_to_file.endswith(".json"):
+        return json.loads(text)
+
+    return loads_schema(text)
+
+
+def loads_schema(text):
+    '''
+    Load a schema from its text: JSON when it starts with "{", YAML
+    otherwise.
+
+    Arguments:
+        text: Contents of the schema.
+    '''
+    if text.lstrip().startswith("{"):
+        return json.loads(text)
+
+    return load_yaml_mapping(text.splitlines())
+
+
+def load_yaml_mapping(lines):
+    '''
+    Read the block mappings and sequences of a YAML document into nested
+    dictionaries and lists. Scalars are kept as strings, with quotes
+    removed, and simple flow sequences ("[a, b]") become lists.
+
+    Arguments:
+        lines: Lines of the document.
+    '''
+    root = {}
+    stack = [(-1, root)]
+    pending = None
+
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#") or stripped in ("---", "..."):
+            continue
+
+        indent = yamldoc.parser.count_indent(line)
+        is_item = stripped == "-" or stripped.startswith("- ")
+
+        # A key with no value: a nested mapping, a sequence or null.
+        if pending is not None:
+            key_indent, parent, key = pending
+            pending = None
+            if is_item and indent >= key_indent:
+                parent[key] = []
+                stack.append((key_indent, parent[key]))
+            elif indent > key_indent:
+                parent[key] = {}
+                stack.append((key_indent, parent[key]))
+            else:
+                parent[key] = None
+
+        while stack[-1][0] > indent or (stack[-1][0] == indent and not (is_item and isinstance(stack[-1][1], list))):
+            stack.pop()
+        container = stack[-1][1]
+
+        if is_item:
+            if not isinstance(container, list):
+                continue
+            stripped = stripped[1:].strip()
+            # An item that is itself a mapping, e.g. "- $ref: a.yaml".
+            if _is_key(stripped):
+                item = {}
+                container.append(item)
+                indent += 2
+                stack.append((indent - 1, item))
+                container = item
+            else:
+                container.append(_scalar(stripped))
+                continue
+
+        if not isinstance(container, dict) or not _is_key(stripped):
+            continue
+
+        key, value = stripped.split(":", 1)
+        key = _scalar(key)
+        value = value.strip()
+        if value:
+            container[key] = _scalar(value)
+        else:
+            pending = (indent, container, key)
+
+    if pending is not None:
+        _, parent, key = pending
+        parent[key] = None
+
+    return root
+
+
+def _is_key(text):
+    key, colon, value = text.partition(":")
+    return bool(colon) and bool(key) and (not value or value[0] == " ")
+
+
+def _scalar(text):
+    text = text.strip()
+    match = FLOW_SEQUENCE.match(text)
+    if match:
+        return [_scalar(item) for item in match.group(1).split(",") if item.strip()]
+    if len(text) > 1 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    return text
+
+
+def _group(by_path):
+    sections = {}
+    for path, value in by_path.items():
+        parent, _, name = path.rpartition(".")
+        sections.setdefault(parent or "base", {})[name] = value
+    return sections
@@ -0,0 +1,350 @@
+'''
+A long running service rendering YAML documentation on request, over
+HTTP on a local port or a Unix socket.
+
+POST a JSON object to /render with the YAML as "yaml" (its text) or
+"yaml_path", and optionally the schema as "schema" or "schema_path",
+"char", "title", "description" and "format" (markdown, html, rst,
+json or index). The response is the rendered document. The $ref of a
+"schema_path" are relative to its directory, those of a "schema" to
+the --schema-root of the service.
+GET /stats reports the cache hits and misses.
+
+Usage:
+    yamldoc-serve --port 8000
+    yamldoc-serve --socket /tmp/yamldoc.sock
+    curl --unix-socket /tmp/yamldoc.sock -d '{"yaml_path": "config.yaml"}' http://localhost/render
+'''
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+
+import yamldoc
+import yamldoc.parser
+import yamldoc.render
+import yamldoc.schema
+
+TITLE = "Configuration Parameters Reference"
+DESCRIPTION = "Any information about this page goes here."
+
+# Largest request body accepted, in bytes.
+MAX_BODY = 64 * 1024 * 1024
+
+CONTENT_TYPES = {
+    "markdown": "text/markdown; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+    "rst": "text/x-rst; charset=utf-8",
+    "json": "application/json",
+    "index": "application/json",
+}
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def render(yaml, schema=None, char="#'", title=TITLE, description=DESCRIPTION, format="markdown", schema_dir=None):
+    '''
+    Render the documentation of the contents of a YAML file and its schema,
+    without reading files or printing.
+
+    Arguments:
+        yaml: Contents of the YAML file as bytes.
+        schema: (Optional) Contents of the schema file as bytes.
+        char: Special character to identify comments to be included in YAMLDOC documentation.
+        title: Title of markdown generated.
+        description: Description given below the title in markdown.
+        format: Output format, one of yamldoc.render.RENDERERS.
+        schema_dir: (Optional) Directory the $ref of the schema are
+            relative to, the current directory by default.
+
+    Returns:
+        The rendered document.
+    '''
+    return _render(yaml, schema, char, title, description, format, schema_dir)[0]
+
+
+def _render(yaml, schema, char, title, description, format, schema_dir):
+    # What the workers run: the document and the schema files it used.
+    files = ()
+    if schema is not None:
+        schema = yamldoc.schema.compile_schema(schema, base=schema_dir)
+        files = schema.files
+    document = yamldoc.parser.document(yaml, None, char, schema_path=schema, title=title, description=description,
+                                       format=format)
+    return document, files
+
+
+class RenderService:
+    """
+    Renders documentation in a pool of workers and keeps the most
+    recently used results, keyed by a hash of the inputs.
+
+    Use it as an async context manager, then call render() directly or
+    serve() to answer requests over HTTP.
+    """
+
+    def __init__(self, workers=None, max_entries=256, schema_root=None):
+        """
+        Initialize the object.
+
+        Arguments:
+            workers: Number of worker processes. Defaults to the number
+                of CPUs; 0 renders in threads of this process instead.
+            max_entries: Number of rendered documents kept.
+            schema_root: (Optional) Directory the $ref of schemas sent
+                as contents are relative to. Defaults to the current
+                directory.
+        """
+        self.workers = workers
+        self.max_entries = max_entries
+        self.schema_root = os.path.abspath(schema_root or os.curdir)
+        self.hits = 0
+        self.misses = 0
+        self._results = collections.OrderedDict()
+        self._pending = {}
+        self._executor = None
+
+    def __repr__(self):
+        """
+        Returns a print representation.
+        """
+        return f'yamldoc render service with {len(self._results)} cached documents'
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+        return False
+
+    def start(self):
+        '''
+        Start the worker pool.
+        '''
+        if self._executor is None:
+            if self.workers == 0:
+                self._executor = concurrent.futures.ThreadPoolExecutor()
+            else:
+                self._executor = concurrent.futures.ProcessPoolExecutor(self.workers)
+
+    def close(self):
+        '''
+        Stop the worker pool.
+        '''
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    @staticmethod
+    def key(yaml, schema, char, title, description, format, schema_dir=None):
+        """
+        Hash the inputs of a render. The schema files referenced with
+        $ref are checked when a result is used instead, as they are only
+        known once the schema is compiled.
+        """
+        digest = hashlib.sha256()
+        digest.update(repr((yamldoc.__version__, char, title, description, format, schema is None, schema_dir)).encode())
+        for data in (yaml, schema or b""):
+            digest.update(len(data).to_bytes(8, "little"))
+            digest.update(data)
+        return digest.digest()
+
+    async def render(self, yaml, schema=None, char="#'", title=TITLE, description=DESCRIPTION, format="markdown",
+                     schema_dir=None):
+        '''
+        Render documentation, from the cache when the same inputs were
+        rendered before and the schema files they refer to did not
+        change. Concurrent requests for the same inputs share one render.
+
+        Arguments:
+            yaml: Contents of the YAML file as bytes.
+            schema: (Optional) Contents of the schema file as bytes.
+            char: Special character to identify comments to be included in YAMLDOC documentation.
+            title: Title of markdown generated.
+            description: Description given below the title in markdown.
+            format: Output format, one of yamldoc.render.RENDERERS.
+            schema_dir: (Optional) Directory the $ref of the schema are
+                relative to. Defaults to the schema root of the service.
+
+        Returns:
+            The rendered document.
+        '''
+        if format not in yamldoc.render.RENDERERS:
+            raise ValueError(f"Unknown output format: {format}")
+        if schema_dir is None:
+            schema_dir = self.schema_root
+        key = self.key(yaml, schema, char, title, description, format, schema_dir)
+        cached = self._results.get(key)
+        if cached is not None and cached[2] == yamldoc.schema.file_stats(cached[1]):
+            self._results.move_to_end(key)
+            self.hits += 1
+            return cached[0]
+
+        future = self._pending.get(key)
+        if future is not None:
+            self.hits += 1
+            return (await asyncio.shield(future))[0]
+
+        self.misses += 1
+        self.start()
+        loop = asyncio.get_running_loop()
+        future = asyncio.ensure_future(loop.run_in_executor(self._executor, _render, yaml, schema, char, title, description,
+                                                            format, schema_dir))
+        self._pending[key] = future
+        try:
+            document, files = await asyncio.shield(future)
+        finally:
+            del self._pending[key]
+
+        self._results[key] = (document, files, yamldoc.schema.file_stats(files))
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        return document
+
+    async def handle(self, request):
+        '''
+        Render the documentation described by a request.
+
+        Arguments:
+            request: Dictionary with "yaml" or "yaml_path", and optionally
+                "schema" or "schema_path", "char", "title", "description" and "format".
+        '''
+        yaml = await self._input(request, "yaml")
+        if yaml is None:
+            raise ValueError('the request needs "yaml" or "yaml_path"')
+        schema = await self._input(request, "schema")
+        schema_dir = None
+        if "schema" not in request and "schema_path" in request:
+            schema_dir = os.path.dirname(os.path.abspath(request["schema_path"]))
+        return await self.render(yaml, schema, request.get("char", "#'"), request.get("title", TITLE),
+                                 request.get("description", DESCRIPTION), request.get("format", "markdown"), schema_dir)
+
+    async def _input(self, request, name):
+        if name in request:
+            return request[name].encode("utf-8")
+        if name + "_path" in request:
+            return await asyncio.get_running_loop().run_in_executor(None, _read, request[name + "_path"])
+        return None
+
+    async def start_server(self, host="127.0.0.1", port=8000, socket=None):
+        '''
+        Start answering HTTP requests.
+
+        Arguments:
+            host: Address to listen on.
+            port: Port to listen on.
+            socket: (Optional) Path of a Unix socket to listen on instead.
+
+        Returns:
+            The asyncio server.
+        '''
+        self.start()
+        if socket is not None:
+            return await asyncio.start_unix_server(self._connection, socket)
+        return await asyncio.start_server(self._connection, host, port)
+
+    async def serve(self, host="127.0.0.1", port=8000, socket=None):
+        '''
+        Answer HTTP requests until cancelled.
+        '''
+        server = await self.start_server(host, port, socket)
+        async with server:
+            await server.serve_forever()
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    await self._send(writer, 400, "text/plain", b"Malformed request\n", False)
+                    break
+                if length > MAX_BODY:
+                    await self._send(writer, 413, "text/plain", b"Request too large\n", False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                status, content_type, payload = await self._respond(method, target.split("?", 1)[0], body)
+                await self._send(writer, status, content_type, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method, path, body):
+        if path == "/render" and method == "POST":
+            try:
+                request = json.loads(body)
+                if not isinstance(request, dict):
+                    raise ValueError("the request must be a JSON object")
+                document = await self.handle(request)
+            except (ValueError, TypeError, AttributeError, OSError) as e:
+                return 400, "text/plain", f"{e}\n".encode()
+            except Exception as e:
+                return 500, "text/plain", f"{type(e).__name__}: {e}\n".encode()
+            content_type = CONTENT_TYPES.get(request.get("format", "markdown"), "text/plain; charset=utf-8")
+            return 200, content_type, document.encode("utf-8")
+
+        if path == "/stats" and method == "GET":
+            stats = {"hits": self.hits, "misses": self.misses, "entries": len(self._results)}
+            return 200, "application/json", json.dumps(stats).encode()
+
+        return 404, "text/plain", b"Not found\n"
+
+    @staticmethod
+    async def _send(writer, status, content_type, payload, keep_alive):
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + payload)
+        await writer.drain()
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def main():
+    ''' Run the render service from the command line.'''
+    parser = argparse.ArgumentParser(prog='yamldoc-serve', description='Serve rendered YAML documentation over HTTP.')
+    parser.add_argument('--host', default = '127.0.0.1', help = 'Address to listen on.')
+    parser.add_argument('-p', '--port', type = int, default = 8000, help = 'Port to listen on.')
+    parser.add_argument('--socket', default = None, help = '(Optional) Listen on this Unix socket instead of a port.')
+    parser.add_argument('-j', '--workers', type = int, default = None, help = 'Number of worker processes. Defaults to the number of CPUs.')
+    parser.add_argument('--cache-size', type = int, default = 256, help = 'Number of rendered documents kept in memory.')
+    parser.add_argument('--schema-root', default = None, help = '(Optional) Directory the $ref of schemas sent as contents are relative to. Defaults to the current directory.')
+    args = parser.parse_args()
+
+    async def run():
+        async with RenderService(args.workers, args.cache_size, args.schema_root) as service:
+            await service.serve(args.host, args.port, args.socket)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+'''
+Sphinx extension rendering YAML documentation inside the build.
+
+Add it to the extensions of conf.py:
+
+    extensions = [..., "yamldoc.sphinxext"]
+
+and document a file from any page:
+
+    .. yamldoc:: ../config.yaml
+       :schema: ../config.schema
+
+Parsed files are cached in the build environment, keyed by the files and
+their modification times, and are declared as dependencies of the pages
+using them, so an incremental build only re-reads the pages whose YAML
+or schema changed.
+'''
+import os
+
+from docutils import nodes
+from docutils.parsers.rst import directives
+from docutils.statemachine import StringList
+from sphinx.util.docutils import SphinxDirective
+
+import yamldoc
+import yamldoc.parser
+import yamldoc.render
+import yamldoc.schema
+
+# Bumped whenever the generated reStructuredText changes, so that trees
+# cached by an older version are never reused.
+ENV_VERSION = 3
+
+class YamldocDirective(SphinxDirective):
+    """
+    The yamldoc directive: documents the YAML file given as its argument.
+    """
+
+    required_arguments = 1
+    option_spec = {
+        "schema": directives.unchanged,
+        "char": directives.unchanged,
+        "title": directives.unchanged,
+        "description": directives.unchanged,
+    }
+
+    def run(self):
+        _, yaml_path = self.env.relfn2path(self.arguments[0])
+        schema_path = None
+        if "schema" in self.options:
+            _, schema_path = self.env.relfn2path(self.options["schema"])
+        char = self.options.get("char", "#'")
+        # Sections are linked to by name, so every directive of a page
+        # needs its own targets.
+        target = f"yamldoc-{self.env.new_serialno('yamldoc')}-"
+
+        paths = [yaml_path] if schema_path is None else [yaml_path, schema_path]
+        for path in paths:
+            self.env.note_dependency(path)
+
+        try:
+            if schema_path is not None:
+                # The files the schema refers to with $ref are
+                # dependencies of the page as well.
+                schema_path = yamldoc.schema.compile_schema(schema_path)
+                for path in schema_path.files:
+                    self.env.note_dependency(path)
+                paths += schema_path.files
+            key = (char, target, self.options.get("title"), self.options.get("description")) + tuple(
+                (path,) + _stat(path) for path in paths)
+        except (OSError, ValueError) as e:
+            raise self.error(f"yamldoc: {e}")
+
+        cache = _cache(self.env)
+        lines = cache.get(key)
+        if lines is None:
+            lines = rst_lines(yaml_path, schema_path, char, self.options.get("title"), self.options.get("description"), target)
+            cache[key] = lines
+        self.env.yamldoc_documents.setdefault(self.env.docname, set()).add(key)
+
+        container = nodes.container(classes=["yamldoc"])
+        self.state.nested_parse(StringList(lines, yaml_path), self.content_offset, container)
+        return [container]
+
+
+def rst_lines(yaml_path, schema_path=None, char="#'", title=None, description=None, target="yamldoc-"):
+    '''
+    Document a YAML file as reStructuredText with
+    yamldoc.render.RSTRenderer.
+
+    Arguments:
+        yaml_path: Path to YAML file.
+        schema_path: (Optional) Path to schema file, or a schema compiled
+            with yamldoc.schema.compile_schema.
+        char: Special character to identify comments to be included in YAMLDOC documentation.
+        title: (Optional) Title of the documentation, overriding the schema.
+        description: (Optional) Description given below the title.
+        target: Prefix of the link targets of the sections.
+
+    Returns:
+        List of lines.
+    '''
+    yaml = yamldoc.parser.parse_yaml(yaml_path, char)
+    schema = schema_path is not None
+    if schema:
+        compiled = schema_path
+        if not isinstance(compiled, yamldoc.schema.CompiledSchema):
+            compiled = yamldoc.schema.compile_schema(schema_path)
+        compiled.apply(yaml)
+        if title is None:
+            title = compiled.specials.get("_yamldoc_title")
+        if description is None:
+            description = compiled.specials.get("_yamldoc_description")
+
+    renderer = yamldoc.render.RSTRenderer(schema, target)
+    return "".join(yamldoc.render.iter_render(renderer, yaml, title, description)).split("\n")
+
+
+def _stat(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _cache(env):
+    if not hasattr(env, "yamldoc_cache"):
+        env.yamldoc_cache = {}
+        env.yamldoc_documents = {}
+    return env.yamldoc_cache
+
+
+def purge_doc(app, env, docname):
+    '''
+    Forget which cached trees a page used before it is read again.
+    The trees themselves are kept, to be reused if nothing changed.
+    '''
+    _cache(env)
+    env.yamldoc_documents.pop(docname, None)
+
+
+def merge_info(app, env, docnames, other):
+    '''
+    Collect the trees parsed by parallel reader processes.
+    '''
+    _cache(env).update(_cache(other))
+    for docname in docnames:
+        if docname in other.yamldoc_documents:
+            env.yamldoc_documents[docname] = other.yamldoc_documents[docname]
+
+
+def env_updated(app, env):
+    '''
+    Drop the cached trees no page uses anymore.
+    '''
+    cache = _cache(env)
+    used = set().union(*env.yamldoc_documents.values())
+    for key in list(cache):
+        if key not in used:
+            del cache[key]
+    return []
+
+
+def setup(app):
+    app.add_directive("yamldoc", YamldocDirective)
+    app.connect("env-purge-doc", purge_doc)
+    app.connect("env-merge-info", merge_info)
+    app.connect("env-updated", env_updated)
+    return {
+        "version": yamldoc.__version__,
+        "env_version": ENV_VERSION,
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
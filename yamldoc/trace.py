@@ -0,0 +1,267 @@
+import contextlib
+import contextvars
+import sys
+import time
+
+# tracemalloc, which loads pickle and linecache, and json are imported
+# by the tracers that record memory or write JSON, to keep them out of
+# the start of every run.
+
+_current = contextvars.ContextVar("yamldoc_tracer", default=None)
+
+
+def current():
+    '''
+    The tracer active in this context, or None.
+    '''
+    return _current.get()
+
+
+def debug(message):
+    '''
+    Print a debug message to stderr, keeping it apart from the markdown
+    written to stdout.
+
+    Arguments:
+        message: Text of the message.
+    '''
+    print("@\t" + message, file=sys.stderr)
+
+
+def span(name):
+    '''
+    Time a phase on the active tracer. Does nothing when no tracer is
+    active.
+
+    Arguments:
+        name: Name of the phase, e.g. "parse" or "render".
+    '''
+    tracer = _current.get()
+    if tracer is None:
+        return contextlib.nullcontext()
+    return tracer.span(name)
+
+
+def count(name, value=1):
+    '''
+    Add to a counter of the active tracer, if any.
+
+    Arguments:
+        name: Name of the counter.
+        value: Amount to add.
+    '''
+    tracer = _current.get()
+    if tracer is not None:
+        tracer.count(name, value)
+
+
+class Span:
+    """
+    A finished, timed phase.
+    """
+
+    __slots__ = ("name", "stack", "start", "duration", "peak_memory")
+
+    def __init__(self, name, stack, start, duration, peak_memory):
+        """
+        Initialize the object.
+
+        Arguments:
+            name: Name of the phase.
+            stack: Tuple of the names of the enclosing spans and this one.
+            start: Start time in seconds, relative to the tracer.
+            duration: Duration in seconds.
+            peak_memory: Peak traced memory in bytes, or None.
+        """
+        self.name = name
+        self.stack = stack
+        self.start = start
+        self.duration = duration
+        self.peak_memory = peak_memory
+
+    def __repr__(self):
+        """
+        Returns a print representation.
+        """
+        return f'Span [{";".join(self.stack)}] {self.duration * 1000:.3f} ms'
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "stack": list(self.stack),
+            "start": self.start,
+            "duration": self.duration,
+            "peak_memory": self.peak_memory,
+        }
+
+
+class _Frame:
+    __slots__ = ("name", "start", "child_peak")
+
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.child_peak = 0
+
+
+class Tracer:
+    """
+    Records the phases of a yamldoc run and counters about its inputs.
+
+    Use it as a context manager; every yamldoc call made inside the block
+    is recorded:
+
+        with yamldoc.trace.Tracer(memory=True) as tracer:
+            yamldoc.parser.document("config.yaml", "config.md")
+        tracer.write("profile.json")
+    """
+
+    def __init__(self, memory=False, hooks=()):
+        """
+        Initialize the object.
+
+        Arguments:
+            memory: Also record the peak memory of every span with tracemalloc.
+            hooks: Functions called with every finished Span.
+        """
+        self.memory = memory
+        self.hooks = list(hooks)
+        self.spans = []
+        self.counters = {}
+        self._stack = []
+        self._origin = None
+        self._token = None
+        self._started_tracemalloc = False
+
+    def __repr__(self):
+        """
+        Returns a print representation.
+        """
+        return f'yamldoc tracer with {len(self.spans)} spans and {len(self.counters)} counters'
+
+    def __enter__(self):
+        self._origin = time.perf_counter()
+        if self.memory:
+            import tracemalloc
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._token)
+        if self._started_tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        return False
+
+    def add_hook(self, hook):
+        '''
+        Call a function with every span finished from now on.
+
+        Arguments:
+            hook: Function taking a Span.
+        '''
+        self.hooks.append(hook)
+
+    def count(self, name, value=1):
+        '''
+        Add to a counter.
+
+        Arguments:
+            name: Name of the counter.
+            value: Amount to add.
+        '''
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextlib.contextmanager
+    def span(self, name):
+        '''
+        Time the enclosed block as a phase, nested under the spans that
+        are already open.
+
+        Arguments:
+            name: Name of the phase.
+        '''
+        if self._origin is None:
+            self._origin = time.perf_counter()
+        if self.memory:
+            import tracemalloc
+        if self.memory and self._stack:
+            # Keep the peak of the enclosing span before measuring this one.
+            parent = self._stack[-1]
+            parent.child_peak = max(parent.child_peak, tracemalloc.get_traced_memory()[1])
+        if self.memory:
+            tracemalloc.reset_peak()
+
+        frame = _Frame(name, time.perf_counter())
+        self._stack.append(frame)
+        try:
+            yield self
+        finally:
+            end = time.perf_counter()
+            self._stack.pop()
+            duration = end - frame.start
+
+            peak = None
+            if self.memory:
+                peak = max(tracemalloc.get_traced_memory()[1], frame.child_peak)
+                if self._stack:
+                    self._stack[-1].child_peak = max(self._stack[-1].child_peak, peak)
+
+            stack = tuple(f.name for f in self._stack) + (name,)
+            finished = Span(name, stack, frame.start - self._origin, duration, peak)
+            self.spans.append(finished)
+            for hook in self.hooks:
+                hook(finished)
+
+    def to_json(self):
+        '''
+        The spans and counters as a JSON serializable dictionary.
+        '''
+        return {
+            "spans": [s.to_dict() for s in self.spans],
+            "counters": dict(self.counters),
+        }
+
+    def collapsed(self):
+        '''
+        The spans in the collapsed stack format read by flame graph tools:
+        one line per stack with its self time in microseconds.
+
+        Returns:
+            List of lines.
+        '''
+        totals = {}
+        children = {}
+        for s in self.spans:
+            totals[s.stack] = totals.get(s.stack, 0.0) + s.duration
+            if len(s.stack) > 1:
+                children[s.stack[:-1]] = children.get(s.stack[:-1], 0.0) + s.duration
+        lines = []
+        for stack, total in totals.items():
+            own = max(total - children.get(stack, 0.0), 0.0)
+            lines.append(f'{";".join(stack)} {round(own * 1e6)}')
+        return lines
+
+    def write(self, path, format=None):
+        '''
+        Save the profile to a file.
+
+        Arguments:
+            path: File to write.
+            format: "json" or "collapsed". Defaults to json for paths ending
+                in .json and collapsed otherwise.
+        '''
+        if format is None:
+            format = "json" if path.endswith(".json") else "collapsed"
+        with open(path, "w") as f:
+            if format == "json":
+                import json
+                json.dump(self.to_json(), f, indent=2)
+            elif format == "collapsed":
+                f.write("\n".join(self.collapsed()) + "\n")
+            else:
+                raise ValueError(f"Unknown profile format: {format}")
@@ -0,0 +1,362 @@
+'''
+Validation of the values of a parsed YAML file against the types and
+enums of a schema, the types declared with "$" in its comments and the
+values marked as mandatory with "%yes".
+
+Every path of a schema is compiled once into a check, and checks for
+the same type and enum are shared between paths and schemas, so a tree
+is validated in a single walk with one dictionary lookup per entry.
+'''
+import collections
+import functools
+import re
+
+import yamldoc.entries
+
+# Plain scalars of the YAML core schema, with the booleans of YAML 1.1.
+NULL = re.compile(r'^(|~|null|Null|NULL)$')
+BOOLEAN = re.compile(r'^(true|True|TRUE|false|False|FALSE|yes|Yes|YES|no|No|NO|on|On|ON|off|Off|OFF)$')
+TRUE = frozenset(["true", "True", "TRUE", "yes", "Yes", "YES", "on", "On", "ON"])
+INTEGER = re.compile(r'^[-+]?([0-9][0-9_]*|0x[0-9a-fA-F_]+|0o[0-7_]+|0b[01_]+)$')
+FLOAT = re.compile(r'^([-+]?(\.[0-9]+|[0-9][0-9_]*(\.[0-9_]*)?)([eE][-+]?[0-9]+)?|[-+]?\.(inf|Inf|INF)|\.(nan|NaN|NAN))$')
+
+# The kind of value each type name accepts, for the names used by JSON
+# Schema, by "$" directives and by common shorthands.
+TYPES = {
+    "string": "string", "str": "string", "char": "char",
+    "integer": "integer", "int": "integer", "long": "integer", "short": "integer", "byte": "integer",
+    "number": "number", "float": "number", "double": "number",
+    "boolean": "boolean", "bool": "boolean",
+    "null": "null",
+    "array": "array", "list": "array",
+    "object": "object", "dict": "object", "map": "object",
+}
+
+# Number of compiled schemas kept by validator().
+CACHE_SIZE = 16
+
+
+class Violation:
+    """
+    A value that does not conform to its schema or comments.
+    """
+
+    __slots__ = ("path", "line", "message")
+
+    def __init__(self, path, line, message):
+        """
+        Initialize the object.
+
+        Arguments:
+            path: Dotted path of the key.
+            line: Number of the line of the key, or None.
+            message: What is wrong with the value.
+        """
+        self.path = path
+        self.line = line
+        self.message = message
+
+    def __repr__(self):
+        """
+        Returns a print representation.
+        """
+        return f'YAML violation [{self}]'
+
+    def __str__(self):
+        if self.line is None:
+            return f'{self.path}: {self.message}'
+        return f'line {self.line}: {self.path}: {self.message}'
+
+
+class ValidationError(ValueError):
+    """
+    Raised when a documented file does not pass validation. The output
+    has been written by then.
+    """
+
+    def __init__(self, violations, source=None):
+        """
+        Initialize the object.
+
+        Arguments:
+            violations: List of Violation.
+            source: (Optional) Name of the file, used in the message.
+        """
+        self.violations = violations
+        self.source = source
+        lines = [f"{len(violations)} value{'s' if len(violations) != 1 else ''} do not conform"]
+        for violation in violations:
+            where = violation.path if violation.line is None else f'{violation.line}: {violation.path}'
+            lines.append(f"  {source}:{where}: {violation.message}" if source else f"  {violation}")
+        super().__init__("\n".join(lines))
+
+
+class Validator:
+    """
+    The checks of a compiled schema, by key path.
+    """
+
+    def __init__(self, schema=None):
+        """
+        Initialize the object.
+
+        Arguments:
+            schema: (Optional) A yamldoc.schema.CompiledSchema. Without
+                one, only the comments of the entries are checked.
+        """
+        self.schema = schema
+        self._checks = {}
+        if schema is None:
+            return
+        for path in set(schema.types) | set(schema.extras):
+            var_type = schema.types.get(path)
+            if var_type is not None and not isinstance(var_type, tuple):
+                var_type = (var_type,)
+            enum = schema.extras.get(path, {}).get("enum")
+            if isinstance(enum, (list, tuple)):
+                enum = tuple(_canonical_item(item) for item in enum)
+            else:
+                enum = None
+            self._checks[path] = check(var_type, enum)
+
+    def __repr__(self):
+        """
+        Returns a print representation.
+        """
+        return f'yamldoc validator of {len(self._checks)} paths'
+
+    def validate(self, yaml):
+        '''
+        Check every entry of a parsed YAML tree.
+
+        Arguments:
+            yaml: List of yaml representations from parse_yaml.
+
+        Returns:
+            List of Violation, in document order.
+        '''
+        violations = []
+        checks = self._checks
+        stack = [("", iter(yaml))]
+        while stack:
+            prefix, values = stack[-1]
+            for value in values:
+                if value.isBase:
+                    path = prefix + value.name
+                    if not value.is_commented:
+                        message = checks[path](value) if path in checks else None
+                        if message is not None:
+                            violations.append(Violation(path, value.line, message))
+                    stack.append((path + ".", iter(value.entries)))
+                    break
+
+                path = prefix + value.key
+                if value.mandatory == "yes":
+                    if value.is_commented:
+                        violations.append(Violation(path, value.line, "mandatory value is commented out"))
+                        continue
+                    if kind(value) == "null":
+                        violations.append(Violation(path, value.line, "mandatory value is empty"))
+                        continue
+                if value.is_commented:
+                    continue
+                # A type declared in the comments wins over the schema.
+                if value.declared_type in yamldoc.entries.DECLARED_TYPES:
+                    message = check((value.declared_type,), None)(value)
+                    if message is None and path in checks:
+                        message = check(None, checks[path].enum)(value)
+                elif path in checks:
+                    message = checks[path](value)
+                else:
+                    continue
+                if message is not None:
+                    violations.append(Violation(path, value.line, message))
+            else:
+                stack.pop()
+        return violations
+
+
+def validator(schema=None):
+    '''
+    The Validator of a compiled schema, compiled once and kept for the
+    schemas used most recently.
+    '''
+    if schema is None:
+        return Validator()
+    cached = _validators.get(id(schema))
+    if cached is not None and cached.schema is schema:
+        _validators.move_to_end(id(schema))
+        return cached
+    cached = _validators[id(schema)] = Validator(schema)
+    while len(_validators) > CACHE_SIZE:
+        _validators.popitem(last=False)
+    return cached
+
+
+_validators = collections.OrderedDict()
+
+
+def validate(yaml, schema=None):
+    '''
+    Check the values of a parsed YAML tree.
+
+    Arguments:
+        yaml: List of yaml representations from parse_yaml.
+        schema: (Optional) A yamldoc.schema.CompiledSchema.
+
+    Returns:
+        List of Violation.
+    '''
+    return validator(schema).validate(yaml)
+
+
+@functools.lru_cache(maxsize=1024)
+def check(types, enum):
+    '''
+    The check of one path: a function of an Entry or MetaEntry returning
+    what is wrong with it, or None.
+
+    Arguments:
+        types: Tuple of the type names allowed, or None for any. Unknown
+            names accept any value.
+        enum: Tuple of the allowed values, from _canonical, or None.
+    '''
+    kinds = None
+    if types is not None:
+        kinds = set()
+        for name in types:
+            accepted = TYPES.get(name)
+            if accepted is None:
+                kinds = None
+                break
+            kinds.add(accepted)
+
+    def run(value):
+        found = kind(value)
+        if kinds is not None and not _accepts(kinds, found, value):
+            expected = " or ".join(types)
+            return f"expected {expected}, found {found}"
+        if enum is not None and found != "object" and _canonical(value) not in enum:
+            allowed = ", ".join(_show(item) for item in enum)
+            return f"{_scalar_text(value)} is not one of {allowed}"
+        return None
+
+    run.enum = enum
+    return run
+
+
+def kind(value):
+    '''
+    The kind of a value as YAML would load it: "object", "array",
+    "string", "integer", "number", "boolean" or "null".
+
+    Arguments:
+        value: An Entry or MetaEntry.
+    '''
+    if value.isBase:
+        return "object"
+    text = _scalar_text(value)
+    if not text:
+        return "null"
+    first = text[0]
+    if first == "{":
+        return "object"
+    if first == "[" or (first == "-" and (len(text) == 1 or text[1] in " \n")):
+        return "array"
+    if first in "\"'|>":
+        return "string"
+    if NULL.match(text):
+        return "null"
+    if BOOLEAN.match(text):
+        return "boolean"
+    if INTEGER.match(text):
+        return "integer"
+    if FLOAT.match(text):
+        return "number"
+    return "string"
+
+
+def _accepts(kinds, found, value):
+    if found in kinds:
+        return True
+    if found == "integer" and "number" in kinds:
+        return True
+    # Collections of objects ("- {") are read as sections too.
+    if found == "object" and "array" in kinds and value.isBase:
+        return True
+    if found == "string" and "char" in kinds:
+        return len(_unquoted(_scalar_text(value))) == 1
+    return False
+
+
+def _scalar_text(value):
+    text = value.value
+    # A comment after a plain scalar is not part of it.
+    if text[:1] not in ("\"", "'") and " #" in text:
+        text = text.split(" #", 1)[0].rstrip()
+    return text
+
+
+def _unquoted(text):
+    if len(text) > 1 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    return text
+
+
+def _canonical(value):
+    text = _scalar_text(value)
+    found = kind(value)
+    if found == "string":
+        return ("string", _unquoted(text))
+    return _canonical_text(text, found)
+
+
+def _canonical_text(text, found):
+    if found == "null":
+        return ("null", None)
+    if found == "boolean":
+        return ("boolean", text in TRUE)
+    if found == "integer":
+        digits = text.replace("_", "")
+        prefixed = digits.lstrip("+-")[:2].lower() in ("0x", "0o", "0b")
+        return ("number", float(int(digits, 0 if prefixed else 10)))
+    if found == "number":
+        return ("number", _float(text))
+    return ("string", text)
+
+
+def _float(text):
+    # YAML writes infinity and NaN as ".inf" and ".nan", which float()
+    # only knows without the dot.
+    text = text.replace("_", "")
+    sign = text[0] if text[0] in "+-" else ""
+    digits = text[len(sign):]
+    if digits.lower() in (".inf", ".nan"):
+        return float(sign + digits[1:])
+    return float(text)
+
+
+def _show(item):
+    found, value = item
+    if found == "null":
+        return "null"
+    if found == "boolean":
+        return "true" if value else "false"
+    if found == "number" and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _canonical_item(item):
+    # Enums of JSON schemas hold loaded values, those of YAML schemas
+    # the text of plain scalars.
+    if item is None:
+        return ("null", None)
+    if isinstance(item, bool):
+        return ("boolean", item)
+    if isinstance(item, (int, float)):
+        return ("number", float(item))
+    if not isinstance(item, str):
+        return ("string", str(item))
+    found = kind(yamldoc.entries.Entry("", item, ""))
+    return ("string", item) if found in ("string", "array", "object") else _canonical_text(item, found)
@@ -0,0 +1,196 @@
+import hashlib
+import os
+import sys
+import time
+
+import yamldoc.batch
+import yamldoc.entries
+import yamldoc.parser
+import yamldoc.render
+import yamldoc.schema
+import yamldoc.trace
+
+
+def fingerprint(meta_entry, schema=False):
+    '''
+    Hash everything the markdown section of a MetaEntry is rendered
+    from: its own name and comments and the rows of its direct children.
+
+    Arguments:
+        meta_entry: A MetaEntry from the parsed YAML.
+        schema: Whether the section is rendered with schema columns.
+    '''
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((schema, meta_entry.name, meta_entry.meta)).encode())
+    for entry in meta_entry.entries:
+        if entry.isBase:
+            row = (entry.name, entry.meta, entry.is_commented, entry.type)
+        else:
+            row = (entry.key, entry.value, entry.meta, entry.is_commented, entry.type,
+                   getattr(entry, "enum", None), getattr(entry, "plain_text", None))
+        digest.update(repr(row).encode())
+    return digest.digest()
+
+
+class _Document:
+    """
+    The in-memory state of one watched YAML file.
+    """
+
+    def __init__(self, out_path):
+        self.out_path = out_path
+        self.stat = None
+        self.yaml = None
+        self.sections = {}
+
+
+class Watcher:
+    """
+    Keeps the documentation of a set of YAML files up to date as they
+    are edited.
+
+    Files are polled for changes. Only the files that changed are parsed
+    again, and only the sections whose content changed are rendered
+    again; the rest of the output is reused from the previous pass.
+    """
+
+    def __init__(self, inputs, out_dir, char="#'", schema_path=None, interval=0.1, debug=False):
+        """
+        Initialize the object.
+
+        Arguments:
+            inputs: List of files, directories or glob patterns.
+            out_dir: Directory the markdown files are written to.
+            char: Special character to identify comments to be included in YAMLDOC documentation.
+            schema_path: Path to a schema file applied to every input.
+            interval: Seconds between two polls.
+            debug: Print debug information
+        """
+        self.inputs = inputs
+        self.out_dir = out_dir
+        self.char = char
+        self.schema_path = schema_path
+        self.interval = interval
+        self.debug = debug
+        self.documents = {}
+        self.schema_stat = None
+        self.schema = None
+
+    def __repr__(self):
+        """
+        Returns a print representation.
+        """
+        return f'yamldoc watcher over {len(self.documents)} files'
+
+    def poll(self):
+        """
+        Check every input once and bring the outputs of the changed ones
+        up to date.
+
+        Returns:
+            Dictionary of the YAML files that were documented again and
+            the number of sections rendered for each.
+        """
+        if self.schema_path is not None:
+            # The schema and the files it refers to with $ref.
+            files = () if self.schema is None else self.schema.files
+            stat = [_stat(path) for path in (self.schema_path,) + files]
+            if stat != self.schema_stat:
+                try:
+                    schema = yamldoc.schema.compile_schema(self.schema_path, self.debug)
+                except Exception as e:
+                    # Editors may replace the file while saving; keep the
+                    # schema compiled last until it can be read again.
+                    print(f'yamldoc: {self.schema_path}: {type(e).__name__}: {e}', file=sys.stderr)
+                    self.schema_stat = stat
+                    if self.schema is None:
+                        return {}
+                else:
+                    self.schema = schema
+                    self.schema_stat = [_stat(path) for path in (self.schema_path,) + self.schema.files]
+                    # The types of every file may have changed.
+                    for document in self.documents.values():
+                        document.stat = None
+
+        pairs = yamldoc.batch.find_files(self.inputs, self.out_dir)
+        seen = set()
+        updated = {}
+        for yaml_path, out_path in pairs:
+            seen.add(yaml_path)
+            document = self.documents.get(yaml_path)
+            if document is None:
+                document = self.documents[yaml_path] = _Document(out_path)
+
+            stat = _stat(yaml_path)
+            if stat is None or stat == document.stat:
+                continue
+            document.stat = stat
+            try:
+                updated[yaml_path] = self.update(yaml_path, document)
+            except Exception as e:
+                print(f'yamldoc: {yaml_path}: {type(e).__name__}: {e}', file=sys.stderr)
+                continue
+            if self.debug: yamldoc.trace.debug(f"Updated {out_path} ({updated[yaml_path]} sections rendered)")
+
+        for yaml_path in set(self.documents) - seen:
+            del self.documents[yaml_path]
+
+        return updated
+
+    def update(self, yaml_path, document):
+        """
+        Parse a file again and rewrite its output, reusing the rendered
+        sections that did not change.
+
+        Returns:
+            Number of sections rendered.
+        """
+        yaml = yamldoc.parser.parse_yaml(yaml_path, self.char, self.debug)
+        title = "Configuration Parameters Reference"
+        description = "Any information about this page goes here."
+        schema = self.schema is not None
+        if schema:
+            self.schema.apply(yaml, self.debug)
+            title = self.schema.specials.get("_yamldoc_title", title)
+            description = self.schema.specials.get("_yamldoc_description", description)
+
+        chunks = list(yamldoc.render.iter_header(yaml, schema, title, description))
+        sections = {}
+        rendered = 0
+        for meta_entry in yamldoc.entries.meta_entries(yaml):
+            key = fingerprint(meta_entry, schema)
+            section = document.sections.get(key)
+            if section is None:
+                section = "".join(yamldoc.render.iter_section(meta_entry, schema))
+                rendered += 1
+            sections[key] = section
+            chunks.append(section)
+        document.yaml = yaml
+        document.sections = sections
+
+        os.makedirs(os.path.dirname(document.out_path) or ".", exist_ok=True)
+        tmp = document.out_path + ".tmp"
+        with open(tmp, "w", buffering=yamldoc.render.BUFFER_SIZE) as f:
+            f.writelines(chunks)
+        os.replace(tmp, document.out_path)
+        return rendered
+
+    def run(self):
+        """
+        Poll until interrupted. Files that fail to parse are reported on
+        stderr and picked up again once they change.
+        """
+        try:
+            while True:
+                self.poll()
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size